@@ -1,5 +1,19 @@
 from django.contrib import admin
-from .models import Bill
+from .models import (
+    ArchivedBill, ArchivedPaymentIntent, Bill, BillGroup, BillLine, DailySales, DailySalesBreakdown, PaymentIntent,
+    RenderedBillPDF, TaxRule,
+)
+
+
+class BillLineInline(admin.TabularInline):
+    """Read-only item shares of a split or merged bill"""
+    model = BillLine
+    extra = 0
+    raw_id_fields = ('order_item',)
+    readonly_fields = ('order_item', 'quantity')
+    
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Bill)
@@ -9,14 +23,17 @@ class BillAdmin(admin.ModelAdmin):
     list_display = ('id', 'table', 'order', 'total_amount', 'status', 'generated_at', 'paid_at')
     list_filter = ('status', 'generated_at')
     search_fields = ('table__table_number', 'order__id')
-    readonly_fields = ('generated_at', 'paid_at', 'subtotal', 'tax_amount', 'total_amount')
+    inlines = [BillLineInline]
+    readonly_fields = (
+        'group', 'generated_at', 'paid_at', 'subtotal', 'service_charge', 'tax_percentage', 'tax_amount', 'total_amount',
+    )
     
     fieldsets = (
         ('Bill Information', {
-            'fields': ('table', 'order', 'status')
+            'fields': ('table', 'order', 'group', 'status')
         }),
         ('Payment Details', {
-            'fields': ('subtotal', 'tax_percentage', 'tax_amount', 'total_amount')
+            'fields': ('subtotal', 'service_charge', 'tax_percentage', 'tax_amount', 'total_amount')
         }),
         ('Staff', {
             'fields': ('cashier',)
@@ -31,3 +48,117 @@ class BillAdmin(admin.ModelAdmin):
         """Recalculate totals when saving"""
         obj.calculate_totals()
         super().save_model(request, obj, form, change)
+
+
+@admin.register(PaymentIntent)
+class PaymentIntentAdmin(admin.ModelAdmin):
+    """Read-only admin for payment attempts"""
+    
+    list_display = ('id', 'bill', 'provider', 'amount', 'status', 'reference', 'created_at', 'settled_at')
+    list_filter = ('status', 'provider', 'created_at')
+    search_fields = ('bill__id', 'reference')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TaxRule)
+class TaxRuleAdmin(admin.ModelAdmin):
+    """Admin interface for tax and service-charge rules"""
+    
+    list_display = ('name', 'kind', 'category', 'rate', 'is_active', 'updated_at')
+    list_filter = ('kind', 'category', 'is_active')
+    list_editable = ('rate', 'is_active')
+    search_fields = ('name',)
+
+
+@admin.register(BillGroup)
+class BillGroupAdmin(admin.ModelAdmin):
+    """Read-only admin for split and merged bill groups"""
+    
+    list_display = ('id', 'kind', 'created_by', 'created_at')
+    list_filter = ('kind', 'created_at')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedBill)
+class ArchivedBillAdmin(admin.ModelAdmin):
+    """Read-only admin for archived bills"""
+    
+    list_display = ('id', 'table', 'order', 'group', 'total_amount', 'generated_at', 'paid_at', 'archived_at')
+    list_filter = ('generated_at',)
+    search_fields = ('id', 'table__table_number', 'order__id', 'group__id')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedPaymentIntent)
+class ArchivedPaymentIntentAdmin(admin.ModelAdmin):
+    """Read-only admin for archived payment attempts"""
+    
+    list_display = ('id', 'bill', 'provider', 'amount', 'status', 'reference', 'created_at', 'settled_at', 'archived_at')
+    list_filter = ('status', 'provider')
+    search_fields = ('bill__id', 'reference')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RenderedBillPDF)
+class RenderedBillPDFAdmin(admin.ModelAdmin):
+    """Read-only admin for the rendered bill PDF cache"""
+    
+    list_display = ('bill_id', 'content_hash', 'is_final', 'size', 'created_at', 'last_accessed')
+    list_filter = ('is_final',)
+    search_fields = ('bill_id', 'content_hash')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    """Read-only admin for the daily sales ledger"""
+    
+    list_display = ('date', 'revenue', 'tax', 'bill_count', 'average_ticket', 'is_closed', 'closed_at')
+    list_filter = ('is_closed',)
+    date_hierarchy = 'date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailySalesBreakdown)
+class DailySalesBreakdownAdmin(admin.ModelAdmin):
+    """Read-only admin for daily sales by category, waiter and hour"""
+    
+    list_display = ('date', 'dimension', 'label', 'revenue', 'count')
+    list_filter = ('dimension',)
+    date_hierarchy = 'date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,118 @@
+"""
+Hot/cold archiving of paid orders, their items, history, tickets and bills
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from orders.models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusChange, ArchivedStationTicket, Order, OrderItem,
+    OrderStatusChange, StationTicket,
+)
+from .models import ArchivedBill, ArchivedBillLine, ArchivedPaymentIntent, Bill, BillGroup, BillLine, PaymentIntent
+
+
+def _copy_rows(queryset, archive_model):
+    """Bulk insert ``queryset`` rows into ``archive_model``, matching columns by attname"""
+    attnames = [
+        field.attname for field in archive_model._meta.concrete_fields
+        if field.name != 'archived_at'
+    ]
+    archive_model.objects.bulk_create(
+        [archive_model(**row) for row in queryset.order_by().values(*attnames)]
+    )
+
+
+def _archive(order_ids, bills):
+    """
+    Move the given orders with their items, status history, station tickets,
+    ``bills`` and those bills' lines and payment intents to the archive tables.
+
+    Parents are inserted before children and deleted after them, all in one
+    transaction, so both sides stay referentially consistent at any moment.
+    """
+    lines = BillLine.objects.filter(bill__in=bills)
+    intents = PaymentIntent.objects.filter(bill__in=bills)
+    with transaction.atomic():
+        _copy_rows(Order.objects.filter(pk__in=order_ids), ArchivedOrder)
+        _copy_rows(OrderItem.objects.filter(order_id__in=order_ids), ArchivedOrderItem)
+        _copy_rows(OrderStatusChange.objects.filter(order_id__in=order_ids), ArchivedOrderStatusChange)
+        _copy_rows(StationTicket.objects.filter(order_id__in=order_ids), ArchivedStationTicket)
+        _copy_rows(bills, ArchivedBill)
+        _copy_rows(lines, ArchivedBillLine)
+        _copy_rows(intents, ArchivedPaymentIntent)
+
+        intents.delete()
+        lines.delete()
+        bills.delete()
+        OrderStatusChange.objects.filter(order_id__in=order_ids).delete()
+        StationTicket.objects.filter(order_id__in=order_ids).delete()
+        OrderItem.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(pk__in=order_ids).delete()
+
+
+def archive_order_chunk(order_ids):
+    """Archive the given orders together with their whole-order bills"""
+    _archive(order_ids, Bill.objects.filter(order_id__in=order_ids))
+
+
+def archive_group_chunk(group_ids):
+    """
+    Archive the bills of the given split/merge groups with their lines and
+    every order they cover. The groups themselves stay in the hot table.
+    """
+    order_ids = list(
+        OrderItem.objects.filter(bill_lines__bill__group_id__in=group_ids).values_list('order_id', flat=True).distinct()
+    )
+    _archive(order_ids, Bill.objects.filter(group_id__in=group_ids))
+
+
+def archivable_orders(older_than):
+    """Orders whose whole-order bill was paid before ``older_than``"""
+    return Order.objects.filter(
+        bill__status=Bill.Status.PAID,
+        bill__paid_at__lt=older_than,
+    )
+
+
+def archivable_groups(older_than):
+    """Split/merge groups whose bills were all paid before ``older_than``"""
+    bills = Bill.objects.filter(group=OuterRef('pk'))
+    return BillGroup.objects.filter(Exists(bills)).exclude(
+        Exists(bills.exclude(status=Bill.Status.PAID, paid_at__lt=older_than))
+    )
+
+
+def archive_paid_orders(days=None, chunk_size=None):
+    """
+    Archive paid orders older than ``days`` (default ARCHIVE_PAID_ORDERS_AFTER_DAYS)
+    in chunks of ``chunk_size`` orders per transaction. Returns the number archived.
+    """
+    days = settings.ARCHIVE_PAID_ORDERS_AFTER_DAYS if days is None else days
+    chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+    older_than = timezone.now() - timedelta(days=days)
+
+    archived = 0
+    while True:
+        order_ids = list(
+            archivable_orders(older_than).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not order_ids:
+            break
+        archive_order_chunk(order_ids)
+        archived += len(order_ids)
+
+    # Orders billed through split or merged bills go with their whole group
+    while True:
+        group_ids = list(
+            archivable_groups(older_than).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not group_ids:
+            return archived
+        archived += OrderItem.objects.filter(
+            bill_lines__bill__group_id__in=group_ids
+        ).values('order_id').distinct().count()
+        archive_group_chunk(group_ids)
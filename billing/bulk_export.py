@@ -0,0 +1,149 @@
+"""
+Bulk export of bill PDFs as a ZIP archive, streamed while a process pool renders
+"""
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ArchivedBill, Bill, RenderedBillPDF
+from .rendering import bill_document, document_hash, render_pdf
+
+# Bills read (and cache lookups made) per database round trip
+BATCH_SIZE = 200
+
+
+class _ZipSink(io.RawIOBase):
+    """Unseekable write target for zipfile; the exporter drains it after each entry"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def day_bounds(start, end):
+    """Aware datetimes covering the dates ``start`` to ``end`` inclusive"""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def bills_in_range(start, end):
+    """Archived then hot bills generated between the two dates, oldest first"""
+    since, until = day_bounds(start, end)
+    prefetches = {
+        ArchivedBill: [
+            'order__items__menu_item',
+            'lines__order_item__menu_item',
+            'lines__order_item__order__waiter',
+            'lines__order_item__order__table',
+        ],
+        Bill: [
+            'order__items__menu_item',
+            'lines__order_item__menu_item',
+            'lines__order_item__order__waiter',
+            'lines__order_item__order__table',
+        ],
+    }
+    for model, prefetch in prefetches.items():
+        yield from model._default_manager.filter(
+            generated_at__gte=since,
+            generated_at__lt=until,
+        ).select_related('table', 'order__waiter').prefetch_related(
+            *prefetch
+        ).order_by('generated_at', 'pk').iterator(chunk_size=BATCH_SIZE)
+
+
+def _entries(start, end):
+    """
+    ``(ZipInfo, pdf bytes or None, document)`` per bill; the bytes come from
+    the render cache when the bill's current content has been rendered before.
+    """
+    bills = bills_in_range(start, end)
+    while batch := list(islice(bills, BATCH_SIZE)):
+        documents = [
+            bill_document(bill, items=bill.order.items.all() if bill.order_id else bill.lines.all())
+            for bill in batch
+        ]
+        hashes = [document_hash(document) for document in documents]
+        cached = RenderedBillPDF.objects.in_bulk(hashes, field_name='content_hash')
+        
+        for bill, document, content_hash in zip(batch, documents, hashes):
+            info = zipfile.ZipInfo(
+                f"bill_{bill.pk}_{bill.table.table_number}.pdf",
+                date_time=timezone.localtime(bill.generated_at).timetuple()[:6],
+            )
+            pdf = None
+            if content_hash in cached:
+                try:
+                    with cached[content_hash].file.open('rb') as stored:
+                        pdf = stored.read()
+                except OSError:
+                    # Evicted between the lookup and the read; render it instead
+                    pdf = None
+            yield info, pdf, document
+
+
+def export_zip(start, end, workers=None):
+    """
+    Yield a ZIP archive of every bill PDF generated between ``start`` and
+    ``end`` (dates, inclusive) in chunks, as entries become available.
+
+    Cache misses are rendered in a pool of ``workers`` processes (default
+    BILL_EXPORT_WORKERS, else one per CPU) with at most two renders queued per
+    worker, so neither the archive nor the pending PDFs pile up in memory.
+    Fresh renders are not added to the cache, so a large export does not
+    evict the entries cashiers are reprinting.
+    """
+    workers = workers or settings.BILL_EXPORT_WORKERS or os.cpu_count() or 1
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED)
+    # spawn: forking a threaded server process is unsafe, and render_pdf needs no Django state
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    pending = {}
+    
+    def write_finished(futures):
+        for future in futures:
+            archive.writestr(pending.pop(future), future.result())
+        return sink.drain()
+    
+    try:
+        for info, pdf, document in _entries(start, end):
+            if pdf is not None:
+                archive.writestr(info, pdf)
+                yield sink.drain()
+                continue
+            
+            pending[pool.submit(render_pdf, document)] = info
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield write_finished(done)
+        
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield write_finished(done)
+        
+        archive.close()
+        yield sink.drain()
+    finally:
+        # Also reached when the client disconnects and the generator is closed
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,146 @@
+"""
+Streaming CSV/JSONL exports of bills, orders and order items for accounting
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from itertools import chain
+
+from django.core.exceptions import FieldDoesNotExist
+
+from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .bulk_export import day_bounds
+from .models import ArchivedBill, Bill
+
+# Rows fetched per database round trip (a server-side cursor where supported)
+CHUNK_SIZE = 2000
+# Encoded bytes gathered before a piece of the response goes out
+FLUSH_BYTES = 64 * 1024
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# dataset -> (hot model, archive model, date filtered on, [(column, field)])
+DATASETS = {
+    'bills': (Bill, ArchivedBill, 'generated_at', [
+        ('id', 'id'),
+        ('order_id', 'order_id'),
+        ('group_id', 'group_id'),
+        ('table', 'table__table_number'),
+        ('cashier', 'cashier__username'),
+        ('status', 'status'),
+        ('subtotal', 'subtotal'),
+        ('service_charge', 'service_charge'),
+        ('tax_percentage', 'tax_percentage'),
+        ('tax_amount', 'tax_amount'),
+        ('total_amount', 'total_amount'),
+        ('generated_at', 'generated_at'),
+        ('paid_at', 'paid_at'),
+    ]),
+    'orders': (Order, ArchivedOrder, 'created_at', [
+        ('id', 'id'),
+        ('table', 'table__table_number'),
+        ('waiter', 'waiter__username'),
+        ('status', 'status'),
+        ('total_amount', 'total_amount'),
+        ('item_count', 'item_count'),
+        ('notes', 'notes'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ]),
+    'order_items': (OrderItem, ArchivedOrderItem, 'order__created_at', [
+        ('id', 'id'),
+        ('order_id', 'order_id'),
+        ('menu_item_id', 'menu_item_id'),
+        ('menu_item', 'menu_item__name'),
+        ('category', 'menu_item__category'),
+        ('quantity', 'quantity'),
+        ('price_at_order', 'price_at_order'),
+        ('order_created_at', 'order__created_at'),
+    ]),
+}
+
+
+def _has_field(model, path):
+    try:
+        model._meta.get_field(path.split('__')[0])
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def dataset_rows(dataset, start, end):
+    """
+    Value tuples of ``dataset`` for the dates ``start`` to ``end``, archived
+    rows first, each table oldest first. Rows are fetched in chunks, so
+    memory use does not grow with the range. Columns an archive table does
+    not have come out as None.
+    """
+    hot, archive, date_field, columns = DATASETS[dataset]
+    since, until = day_bounds(start, end)
+    for model in (archive, hot):
+        fields = [field for _, field in columns if _has_field(model, field)]
+        rows = model._default_manager.filter(**{
+            f'{date_field}__gte': since,
+            f'{date_field}__lt': until,
+        }).order_by(date_field, 'pk').values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+        for row in rows:
+            values = dict(zip(fields, row))
+            yield tuple(values.get(field) for _, field in columns)
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _csv_lines(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in chain([header], rows):
+        writer.writerow([_plain(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _jsonl_lines(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, (_plain(value) for value in row)))) + '\n'
+
+
+def export_stream(dataset, start, end, fmt='csv', compress=False):
+    """
+    Bytes of the export, in pieces of about FLUSH_BYTES, gzipped on the fly
+    if ``compress``. ``dataset`` and ``fmt`` must be keys of DATASETS and
+    FORMATS.
+    """
+    header = [column for column, _ in DATASETS[dataset][3]]
+    encode = {'csv': _csv_lines, 'jsonl': _jsonl_lines}[fmt]
+    gzip = zlib.compressobj(wbits=31) if compress else None
+
+    def pieces():
+        pending, size = [], 0
+        for line in encode(header, dataset_rows(dataset, start, end)):
+            data = line.encode()
+            pending.append(data)
+            size += len(data)
+            if size >= FLUSH_BYTES:
+                yield b''.join(pending)
+                pending, size = [], 0
+        yield b''.join(pending)
+
+    for piece in pieces():
+        piece = gzip.compress(piece) if gzip else piece
+        if piece:
+            yield piece
+    if gzip:
+        yield gzip.flush()
@@ -0,0 +1,204 @@
+"""
+Daily sales ledger: incremental updates as bills are generated and paid, frozen at end of day
+"""
+import logging
+import operator
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from functools import reduce
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+
+from menu.models import MenuItem
+from orders.models import ArchivedOrderItem, OrderItem
+from .models import ArchivedBill, ArchivedBillLine, Bill, BillLine, DailySales, DailySalesBreakdown
+
+logger = logging.getLogger(__name__)
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _item_sales(queryset, prefix, key):
+    """Item revenue and quantity of ``queryset`` grouped by ``prefix + key``"""
+    subtotal = ExpressionWrapper(F('quantity') * F(f'{prefix}price_at_order'), output_field=MONEY)
+    return queryset.order_by().values(group=F(f'{prefix}{key}')).annotate(
+        revenue=Sum(subtotal),
+        count=Sum('quantity'),
+    ).values_list('group', 'revenue', 'count')
+
+
+def _bill_items(bill):
+    """``(queryset, prefix)`` of the items charged on one bill"""
+    if bill.order_id is None:
+        return [(BillLine.objects.filter(bill_id=bill.pk), 'order_item__')]
+    return [(OrderItem.objects.filter(order_id=bill.order_id), '')]
+
+
+def _day_items(day):
+    """``(queryset, prefix)`` of the items charged on every bill paid on ``day``"""
+    paid = {'status': Bill.Status.PAID, 'paid_at__date': day}
+    return [
+        (OrderItem.objects.filter(**{f'order__bill__{name}': value for name, value in paid.items()}), ''),
+        (ArchivedOrderItem.objects.filter(**{f'order__bill__{name}': value for name, value in paid.items()}), ''),
+        (BillLine.objects.filter(**{f'bill__{name}': value for name, value in paid.items()}), 'order_item__'),
+        (ArchivedBillLine.objects.filter(**{f'bill__{name}': value for name, value in paid.items()}), 'order_item__'),
+    ]
+
+
+def _item_breakdown(sources):
+    """``{(dimension, key): [label, revenue, count]}`` by category and waiter"""
+    rows = defaultdict(lambda: ['', Decimal('0.00'), 0])
+    for queryset, prefix in sources:
+        for dimension, key in (
+            (DailySalesBreakdown.Dimension.CATEGORY, 'menu_item__category'),
+            (DailySalesBreakdown.Dimension.WAITER, 'order__waiter_id'),
+        ):
+            for group, revenue, count in _item_sales(queryset, prefix, key):
+                row = rows[dimension, str(group)]
+                row[1] += revenue or 0
+                row[2] += count or 0
+
+    category_names = dict(MenuItem.Category.choices)
+    waiter_names = dict(get_user_model().objects.filter(
+        pk__in=[key for dimension, key in rows if dimension == DailySalesBreakdown.Dimension.WAITER]
+    ).values_list('pk', 'username'))
+    for (dimension, key), row in rows.items():
+        if dimension == DailySalesBreakdown.Dimension.CATEGORY:
+            row[0] = category_names.get(key, key)
+        else:
+            row[0] = waiter_names.get(int(key), '') if key.isdigit() else ''
+    return rows
+
+
+def _hour_key(hour):
+    return (DailySalesBreakdown.Dimension.HOUR, f'{hour:02d}')
+
+
+def record_generated(generated_at, count=1):
+    """Count ``count`` new bills on their day's ledger row with one UPDATE; closed days are never changed"""
+    day = timezone.localdate(generated_at)
+    with transaction.atomic():
+        DailySales.objects.get_or_create(date=day)
+        return DailySales.objects.filter(date=day, is_closed=False).update(
+            generated_count=F('generated_count') + count,
+            updated_at=timezone.now(),
+        ) == 1
+
+
+def record_payment(bill):
+    """
+    Add a paid bill to its day's ledger rows: one UPDATE for the day totals
+    and one for all of its breakdown rows. Closed days are never changed.
+    """
+    day = timezone.localdate(bill.paid_at)
+    rows = _item_breakdown(_bill_items(bill))
+    hour = timezone.localtime(bill.paid_at).hour
+    rows[_hour_key(hour)] = [f'{hour:02d}:00', bill.total_amount, 1]
+
+    with transaction.atomic():
+        DailySales.objects.get_or_create(date=day)
+        updated = DailySales.objects.filter(date=day, is_closed=False).update(
+            revenue=F('revenue') + bill.total_amount,
+            tax=F('tax') + bill.tax_amount,
+            bill_count=F('bill_count') + 1,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            logger.warning("Bill #%s was paid on closed sales day %s", bill.pk, day)
+            return False
+
+        # Make sure every row exists, then add to all of them at once
+        DailySalesBreakdown.objects.bulk_create(
+            [
+                DailySalesBreakdown(date=day, dimension=dimension, key=key, label=label)
+                for (dimension, key), (label, _, _) in rows.items()
+            ],
+            ignore_conflicts=True,
+        )
+        matches = [(Q(dimension=dimension, key=key), row) for (dimension, key), row in rows.items()]
+        DailySalesBreakdown.objects.filter(date=day).filter(
+            reduce(operator.or_, [match for match, _ in matches])
+        ).update(
+            revenue=F('revenue') + Case(
+                *[When(match, then=Value(row[1])) for match, row in matches], default=Value(0), output_field=MONEY
+            ),
+            count=F('count') + Case(
+                *[When(match, then=Value(row[2])) for match, row in matches], default=Value(0), output_field=IntegerField()
+            ),
+        )
+    return True
+
+
+def close_day(day):
+    """
+    Recompute ``day`` from its paid bills (hot and archived) and freeze it.
+    Already closed days are returned unchanged.
+    """
+    with transaction.atomic():
+        entry, _ = DailySales.objects.select_for_update().get_or_create(date=day)
+        if entry.is_closed:
+            return entry
+
+        totals = Bill.objects.combined_aggregate(
+            {'status': Bill.Status.PAID, 'paid_at__date': day},
+            revenue=Sum('total_amount'),
+            tax=Sum('tax_amount'),
+            bills=Count('id'),
+        )
+        rows = _item_breakdown(_day_items(day))
+        for model in (Bill, ArchivedBill):
+            for hour, revenue, count in model.objects.filter(
+                status=Bill.Status.PAID, paid_at__date=day
+            ).order_by().values(hour=ExtractHour('paid_at')).annotate(
+                revenue=Sum('total_amount'),
+                count=Count('id'),
+            ).values_list('hour', 'revenue', 'count'):
+                row = rows[_hour_key(hour)]
+                row[0] = f'{hour:02d}:00'
+                row[1] += revenue
+                row[2] += count
+
+        DailySalesBreakdown.objects.filter(date=day).delete()
+        DailySalesBreakdown.objects.bulk_create([
+            DailySalesBreakdown(date=day, dimension=dimension, key=key, label=label, revenue=revenue, count=count)
+            for (dimension, key), (label, revenue, count) in rows.items()
+        ])
+
+        entry.revenue = totals['revenue'] or 0
+        entry.tax = totals['tax'] or 0
+        entry.bill_count = totals['bills'] or 0
+        entry.generated_count = Bill.objects.combined_aggregate(
+            {'generated_at__date': day}, bills=Count('id')
+        )['bills'] or 0
+        entry.is_closed = True
+        entry.closed_at = timezone.now()
+        entry.save()
+    return entry
+
+
+def close_days(since=None):
+    """
+    Close every day from ``since`` (default: yesterday) through yesterday,
+    plus any earlier day still open. Returns the closed dates.
+    """
+    yesterday = timezone.localdate() - timedelta(days=1)
+    day = since or yesterday
+    days = set(DailySales.objects.filter(is_closed=False, date__lt=day).values_list('date', flat=True))
+    while day <= yesterday:
+        days.add(day)
+        day += timedelta(days=1)
+
+    for day in sorted(days):
+        close_day(day)
+    return sorted(days)
+
+
+def today_sales():
+    """Today's ledger row, unsaved and empty if nothing was paid yet"""
+    day = timezone.localdate()
+    return DailySales.objects.filter(date=day).first() or DailySales(date=day)
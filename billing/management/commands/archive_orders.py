@@ -0,0 +1,29 @@
+"""
+Management command to move old paid orders, items and bills to the archive tables
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from billing.archive import archive_paid_orders
+
+
+class Command(BaseCommand):
+    help = 'Archive paid orders (with their items and bills) older than a given age'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ARCHIVE_PAID_ORDERS_AFTER_DAYS,
+            help=f'Archive orders paid more than this many days ago (default: {settings.ARCHIVE_PAID_ORDERS_AFTER_DAYS})',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.ARCHIVE_CHUNK_SIZE,
+            help=f'Orders moved per transaction (default: {settings.ARCHIVE_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_paid_orders(days=options['days'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'[OK] Archived {archived} paid orders'))
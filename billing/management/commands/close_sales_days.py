@@ -0,0 +1,29 @@
+"""
+Management command to close (and backfill) days of the daily sales ledger
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from billing.ledger import close_days
+
+
+class Command(BaseCommand):
+    help = 'Freeze the daily sales ledger for yesterday, or for every day since a given date'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='First day to close, as YYYY-MM-DD (default: yesterday)',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = parse_date(options['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError(f"Invalid date: {options['since']}")
+        days = close_days(since=since)
+        self.stdout.write(self.style.SUCCESS(f'[OK] Closed {len(days)} sales day(s)'))
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0001_initial'),
+        ('orders', '0002_order_total_amount_item_count'),
+        ('tables', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['-generated_at', '-id'], name='bills_generated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['status', '-generated_at', '-id'], name='bills_status_generated_idx'),
+        ),
+    ]
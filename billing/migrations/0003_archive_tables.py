@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_keyset_indexes'),
+        ('orders', '0004_archive_tables'),
+        ('tables', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBill',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('tax_percentage', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('tax_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('NOT_GENERATED', 'Not Generated'), ('PENDING_PAYMENT', 'Pending Payment'), ('PAID', 'Paid')], max_length=20)),
+                ('generated_at', models.DateTimeField(db_index=True)),
+                ('paid_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('cashier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_bills', to=settings.AUTH_USER_MODEL)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='bill', to='orders.archivedorder')),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bills', to='tables.table')),
+            ],
+            options={
+                'verbose_name': 'Archived Bill',
+                'verbose_name_plural': 'Archived Bills',
+                'db_table': 'bills_archive',
+                'ordering': ['-generated_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0003_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedBillPDF',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('bill_id', models.BigIntegerField(db_index=True)),
+                ('is_final', models.BooleanField(default=False, help_text='Rendered from a paid bill, which never changes')),
+                ('file', models.FileField(upload_to='bill_pdfs/')),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Rendered Bill PDF',
+                'verbose_name_plural': 'Rendered Bill PDFs',
+                'db_table': 'rendered_bill_pdfs',
+            },
+        ),
+    ]
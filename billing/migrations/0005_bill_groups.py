@@ -0,0 +1,61 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:31
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_rendered_bill_pdfs'),
+        ('orders', '0007_station_tickets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bill',
+            name='order',
+            field=models.OneToOneField(blank=True, help_text='Whole-order bill; empty for split or merged bills, which list BillLines', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bill', to='orders.order'),
+        ),
+        migrations.CreateModel(
+            name='BillGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SPLIT', 'Split'), ('MERGE', 'Merge')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bill_groups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Bill Group',
+                'verbose_name_plural': 'Bill Groups',
+                'db_table': 'bill_groups',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='bill',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bills', to='billing.billgroup'),
+        ),
+        migrations.CreateModel(
+            name='BillLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='billing.bill')),
+                ('order_item', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='bill_lines', to='orders.orderitem')),
+            ],
+            options={
+                'verbose_name': 'Bill Line',
+                'verbose_name_plural': 'Bill Lines',
+                'db_table': 'bill_lines',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='billline',
+            constraint=models.UniqueConstraint(fields=('bill', 'order_item'), name='bill_line_unique'),
+        ),
+    ]
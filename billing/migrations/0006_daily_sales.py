@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0005_bill_groups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('tax', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('bill_count', models.PositiveIntegerField(default=0)),
+                ('is_closed', models.BooleanField(default=False)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Sales',
+                'verbose_name_plural': 'Daily Sales',
+                'db_table': 'daily_sales',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesBreakdown',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('dimension', models.CharField(choices=[('CATEGORY', 'Menu Category'), ('WAITER', 'Waiter'), ('HOUR', 'Hour')], max_length=10)),
+                ('key', models.CharField(help_text='Category value, waiter id or hour', max_length=50)),
+                ('label', models.CharField(blank=True, max_length=150)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Item sales before tax; bill totals for the hour breakdown', max_digits=12)),
+                ('count', models.PositiveIntegerField(default=0, help_text='Items sold; bills paid for the hour breakdown')),
+            ],
+            options={
+                'verbose_name': 'Daily Sales Breakdown',
+                'verbose_name_plural': 'Daily Sales Breakdowns',
+                'db_table': 'daily_sales_breakdowns',
+                'ordering': ['-date', 'dimension', '-revenue'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesbreakdown',
+            constraint=models.UniqueConstraint(fields=('date', 'dimension', 'key'), name='daily_sales_breakdown_unique'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:36
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def create_default_tax_rule(apps, schema_editor):
+    """Keep taxing every category at the previously hardcoded 5%"""
+    TaxRule = apps.get_model('billing', 'TaxRule')
+    TaxRule.objects.create(name='Tax', kind='TAX', category='', rate=Decimal('5.00'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_daily_sales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaxRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('TAX', 'Tax'), ('SERVICE_CHARGE', 'Service Charge')], default='TAX', max_length=20)),
+                ('category', models.CharField(blank=True, choices=[('STARTER', 'Starter'), ('MAIN', 'Main Course'), ('DRINKS', 'Drinks'), ('DESSERT', 'Dessert')], help_text='Leave empty to apply to every category', max_length=20)),
+                ('rate', models.DecimalField(decimal_places=2, help_text='Percentage of the item amount', max_digits=5, validators=[django.core.validators.MinValueValidator(Decimal('0.00')), django.core.validators.MaxValueValidator(Decimal('100.00'))])),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tax Rule',
+                'verbose_name_plural': 'Tax Rules',
+                'db_table': 'tax_rules',
+                'ordering': ['kind', 'category', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedbill',
+            name='service_charge',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='bill',
+            name='service_charge',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='bill',
+            name='tax_percentage',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Effective tax rate over the subtotal, from the category TaxRules', max_digits=5, validators=[django.core.validators.MinValueValidator(Decimal('0.00')), django.core.validators.MaxValueValidator(Decimal('100.00'))]),
+        ),
+        migrations.RunPython(create_default_tax_rule, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0008_payment_intents'),
+        ('orders', '0009_archive_history_tickets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedbill',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_bills', to='billing.billgroup'),
+        ),
+        migrations.AlterField(
+            model_name='archivedbill',
+            name='order',
+            field=models.OneToOneField(blank=True, help_text='Whole-order bill; empty for split or merged bills, which list ArchivedBillLines', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bill', to='orders.archivedorder'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedBillLine',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='billing.archivedbill')),
+                ('order_item', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='bill_lines', to='orders.archivedorderitem')),
+            ],
+            options={
+                'verbose_name': 'Archived Bill Line',
+                'verbose_name_plural': 'Archived Bill Lines',
+                'db_table': 'bill_lines_archive',
+            },
+        ),
+    ]
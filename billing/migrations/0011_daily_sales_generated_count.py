@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:12
+
+from django.db import migrations, models
+
+
+def count_generated_bills(apps, schema_editor):
+    """Fill the new count for ledger days that already exist"""
+    DailySales = apps.get_model('billing', 'DailySales')
+    Bill = apps.get_model('billing', 'Bill')
+    ArchivedBill = apps.get_model('billing', 'ArchivedBill')
+    for entry in DailySales.objects.all():
+        entry.generated_count = sum(
+            model.objects.filter(generated_at__date=entry.date).count() for model in (Bill, ArchivedBill)
+        )
+        entry.save(update_fields=['generated_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0010_archive_payment_intents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysales',
+            name='generated_count',
+            field=models.PositiveIntegerField(default=0, help_text='Bills generated that day, paid or not'),
+        ),
+        migrations.AlterField(
+            model_name='dailysales',
+            name='bill_count',
+            field=models.PositiveIntegerField(default=0, help_text='Bills paid that day'),
+        ),
+        migrations.RunPython(count_generated_bills, migrations.RunPython.noop),
+    ]
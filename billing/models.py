@@ -1,14 +1,113 @@
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 from decimal import Decimal
 from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from django.core.files.base import ContentFile
+
+from menu.models import MenuItem
+from orders.managers import HotColdManager
+
+
+# Bill columns derived from the items and the TaxRules
+AMOUNT_FIELDS = ['subtotal', 'service_charge', 'tax_percentage', 'tax_amount', 'total_amount']
+
+# quantity * the order item's price snapshot, for aggregates over BillLine
+LINE_SUBTOTAL = ExpressionWrapper(
+    F('quantity') * F('order_item__price_at_order'),
+    output_field=DecimalField(max_digits=10, decimal_places=2)
+)
+
+
+class TaxRuleQuerySet(models.QuerySet):
+    """Tax rule queries that keep the compiled rate table's version current (see billing.tax)"""
+    
+    def update(self, **kwargs):
+        """Bulk updates bump ``updated_at`` like save() does"""
+        from django.utils import timezone
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+
+class TaxRule(models.Model):
+    """
+    A tax or service-charge percentage, for one menu category or (with no
+    category) for all of them. Active rules of the same kind add up; a
+    category's own rules of a kind replace the all-category ones.
+    """
+    
+    class Kind(models.TextChoices):
+        TAX = 'TAX', 'Tax'
+        SERVICE_CHARGE = 'SERVICE_CHARGE', 'Service Charge'
+    
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20, choices=Kind.choices, default=Kind.TAX)
+    category = models.CharField(
+        max_length=20,
+        choices=MenuItem.Category.choices,
+        blank=True,
+        help_text="Leave empty to apply to every category"
+    )
+    rate = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.00')), MaxValueValidator(Decimal('100.00'))],
+        help_text="Percentage of the item amount"
+    )
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = TaxRuleQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'tax_rules'
+        ordering = ['kind', 'category', 'name']
+        verbose_name = 'Tax Rule'
+        verbose_name_plural = 'Tax Rules'
+    
+    def __str__(self):
+        return f"{self.name} ({self.rate}% {self.get_category_display() or 'all categories'})"
+
+
+class BillGroup(models.Model):
+    """Bills created together by splitting one order or merging several"""
+    
+    class Kind(models.TextChoices):
+        SPLIT = 'SPLIT', 'Split'
+        MERGE = 'MERGE', 'Merge'
+    
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bill_groups'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'bill_groups'
+        ordering = ['-created_at']
+        verbose_name = 'Bill Group'
+        verbose_name_plural = 'Bill Groups'
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk}"
+    
+    def table_ids(self):
+        """Ids of the tables whose orders the group's bills cover"""
+        return BillLine.objects.filter(bill__group=self).values('order_item__order__table_id').distinct()
+    
+    def release_tables(self):
+        """
+        Free the covered tables once no bill of the group is still pending,
+        in one conditional UPDATE. Returns how many tables moved.
+        """
+        from tables.models import Table
+        if self.bills.filter(status=Bill.Status.PENDING_PAYMENT).exists():
+            return 0
+        return Table.transition_many(self.table_ids(), Table.Status.AVAILABLE)
 
 
 class Bill(models.Model):
@@ -20,7 +119,21 @@ class Bill(models.Model):
         PAID = 'PAID', 'Paid'
     
     table = models.ForeignKey('tables.Table', on_delete=models.CASCADE, related_name='bills')
-    order = models.OneToOneField('orders.Order', on_delete=models.CASCADE, related_name='bill')
+    order = models.OneToOneField(
+        'orders.Order',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='bill',
+        help_text="Whole-order bill; empty for split or merged bills, which list BillLines"
+    )
+    group = models.ForeignKey(
+        BillGroup,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='bills'
+    )
     cashier = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -29,11 +142,13 @@ class Bill(models.Model):
         related_name='processed_bills'
     )
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    service_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     tax_percentage = models.DecimalField(
         max_digits=5,
         decimal_places=2,
-        default=Decimal('5.00'),
-        validators=[MinValueValidator(Decimal('0.00')), MaxValueValidator(Decimal('100.00'))]
+        default=Decimal('0.00'),
+        validators=[MinValueValidator(Decimal('0.00')), MaxValueValidator(Decimal('100.00'))],
+        help_text="Effective tax rate over the subtotal, from the category TaxRules"
     )
     tax_amount = models.DecimalField(max_digits=10, decimal_places=2)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -46,9 +161,16 @@ class Bill(models.Model):
     generated_at = models.DateTimeField(auto_now_add=True)
     paid_at = models.DateTimeField(null=True, blank=True)
     
+    objects = HotColdManager('billing.ArchivedBill')
+    
     class Meta:
         db_table = 'bills'
         ordering = ['-generated_at']
+        indexes = [
+            # Keyset pagination seeks on (generated_at, id), optionally after a filter
+            models.Index(fields=['-generated_at', '-id'], name='bills_generated_id_idx'),
+            models.Index(fields=['status', '-generated_at', '-id'], name='bills_status_generated_idx'),
+        ]
         verbose_name = 'Bill'
         verbose_name_plural = 'Bills'
     
@@ -56,91 +178,388 @@ class Bill(models.Model):
         return f"Bill #{self.pk} - Table {self.table.table_number}"
     
     def calculate_totals(self):
-        """Calculate subtotal, tax, and total"""
-        self.subtotal = self.order.calculate_total()
-        self.tax_amount = (self.subtotal * self.tax_percentage) / Decimal('100.00')
-        self.total_amount = self.subtotal + self.tax_amount
+        """Calculate subtotal, service charge, tax and total from the TaxRules"""
+        if self.order_id is None and self.pk is not None:
+            Bill.refresh_line_totals(Bill.objects.filter(pk=self.pk))
+            self.refresh_from_db(fields=AMOUNT_FIELDS)
+            return
+        from .tax import order_amounts
+        for field, value in order_amounts([self.order_id])[self.order_id].items():
+            setattr(self, field, value)
         self.save()
     
+    @classmethod
+    def refresh_line_totals(cls, queryset):
+        """Recompute split/merged bill amounts from one grouped aggregate of their BillLines"""
+        from .tax import line_bill_amounts
+        bills = list(queryset.only('pk'))
+        amounts = line_bill_amounts([bill.pk for bill in bills])
+        for bill in bills:
+            for field, value in amounts[bill.pk].items():
+                setattr(bill, field, value)
+        return cls.objects.bulk_update(bills, AMOUNT_FIELDS)
+    
+    def line_items(self):
+        """Billed items: the order's items, or the BillLines of a split or merged bill"""
+        if self.order_id is None:
+            return self.lines.select_related(
+                'order_item__menu_item', 'order_item__order__waiter', 'order_item__order__table'
+            )
+        return self.order.items.select_related('menu_item')
+    
     def mark_as_paid(self, cashier=None):
-        """Mark bill as paid and reset table"""
+        """
+        Mark bill as paid and reset table. The status changes with one
+        conditional UPDATE, so a bill settled twice (two terminals, a retried
+        callback) is only paid and counted once. Returns True if this call
+        paid it.
+        """
+        from django.db import transaction
         from django.utils import timezone
-        self.status = self.Status.PAID
-        self.paid_at = timezone.now()
+        from .ledger import record_payment
+        
+        changes = {'status': self.Status.PAID, 'paid_at': timezone.now()}
         if cashier:
-            self.cashier = cashier
-        self.save()
+            changes['cashier'] = cashier
         
-        # Reset table to available
-        self.table.mark_as_available()
+        with transaction.atomic():
+            if not Bill.objects.filter(pk=self.pk, status=self.Status.PENDING_PAYMENT).update(**changes):
+                return False
+            for field, value in changes.items():
+                setattr(self, field, value)
+            
+            record_payment(self)
+            
+            # Reset table(s) to available; a split or merged bill waits for the rest of its group
+            if self.group_id:
+                self.group.release_tables()
+            else:
+                self.table.mark_as_available()
+        
+        # The paid bill is final; store its PDF before anyone asks for it
+        from .pdf_cache import schedule_render
+        schedule_render(self.pk)
+        return True
     
     def save(self, *args, **kwargs):
         """Override save to update table status"""
         is_new = self.pk is None
-        if is_new and not self.subtotal:
+        if is_new and not self.subtotal and self.order_id:
             self.calculate_totals()
         
         super().save(*args, **kwargs)
         
         if is_new:
             self.table.request_bill()
+            
+            from .ledger import record_generated
+            record_generated(self.generated_at)
+            
+            from .pdf_cache import schedule_render
+            schedule_render(self.pk)
     
     def export_to_pdf(self):
-        """Generate PDF bill"""
+        """Generate PDF bill (uncached; downloads go through billing.pdf_cache)"""
+        from .rendering import bill_document, render_pdf
+        return BytesIO(render_pdf(bill_document(self)))
+
+
+class BillLine(models.Model):
+    """Quantity of one order item charged on a split or merged bill"""
+    
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name='lines')
+    order_item = models.ForeignKey('orders.OrderItem', on_delete=models.PROTECT, related_name='bill_lines')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    
+    class Meta:
+        db_table = 'bill_lines'
+        constraints = [
+            models.UniqueConstraint(fields=['bill', 'order_item'], name='bill_line_unique'),
+        ]
+        verbose_name = 'Bill Line'
+        verbose_name_plural = 'Bill Lines'
+    
+    def __str__(self):
+        return f"{self.quantity}x {self.order_item.menu_item.name}"
+    
+    # Same shape as OrderItem, so bill views and renderers can list either
+    @property
+    def menu_item(self):
+        return self.order_item.menu_item
+    
+    @property
+    def price_at_order(self):
+        return self.order_item.price_at_order
+    
+    @property
+    def subtotal(self):
+        return self.quantity * self.order_item.price_at_order
+
+
+class PaymentIntent(models.Model):
+    """One attempt to collect a bill's total through a payment provider"""
+    
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        PROCESSING = 'PROCESSING', 'Processing'
+        SUCCEEDED = 'SUCCEEDED', 'Succeeded'
+        FAILED = 'FAILED', 'Failed'
+    
+    # Allowed status changes (from -> to)
+    TRANSITIONS = {
+        Status.PENDING: [Status.PROCESSING, Status.FAILED],
+        Status.PROCESSING: [Status.SUCCEEDED, Status.FAILED],
+    }
+    
+    OPEN_STATUSES = [Status.PENDING, Status.PROCESSING]
+    
+    # Protected so payment records are never lost with their bill; archiving moves them
+    bill = models.ForeignKey(Bill, on_delete=models.PROTECT, related_name='payment_intents')
+    provider = models.CharField(max_length=20, help_text="Key in PAYMENT_PROVIDERS")
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    reference = models.CharField(max_length=100, blank=True, help_text="Provider's transaction reference")
+    error = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='payment_intents'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    settled_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'payment_intents'
+        ordering = ['-created_at']
+        constraints = [
+            # One payment in flight per bill, so a double-submitted form cannot charge twice
+            models.UniqueConstraint(
+                fields=['bill'],
+                condition=models.Q(status__in=['PENDING', 'PROCESSING']),
+                name='payment_intent_one_open',
+            ),
+        ]
+        verbose_name = 'Payment Intent'
+        verbose_name_plural = 'Payment Intents'
+    
+    def __str__(self):
+        return f"Payment #{self.pk} for Bill #{self.bill_id} ({self.status})"
+    
+    @classmethod
+    def transition(cls, pk, status, **fields):
+        """Move an intent to ``status`` with one conditional UPDATE; True if this call won"""
         from django.utils import timezone
-        
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Title
-        title = Paragraph(f"<b>Restaurant Bill</b>", styles['Title'])
-        elements.append(title)
-        elements.append(Spacer(1, 0.2*inch))
-        
-        # Bill details
-        bill_info = Paragraph(f"""
-            <b>Bill #:</b> {self.pk}<br/>
-            <b>Table:</b> {self.table.table_number}<br/>
-            <b>Date:</b> {self.generated_at.strftime('%Y-%m-%d %H:%M')}<br/>
-            <b>Waiter:</b> {self.order.waiter.get_full_name() or self.order.waiter.username}
-        """, styles['Normal'])
-        elements.append(bill_info)
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Items table
-        data = [['Item', 'Qty', 'Price', 'Subtotal']]
-        for item in self.order.items.all():
-            data.append([
-                item.menu_item.name,
-                str(item.quantity),
-                f"₹{item.price_at_order:.2f}",
-                f"₹{item.subtotal:.2f}"
-            ])
-        
-        # Totals
-        data.append(['', '', 'Subtotal:', f"₹{self.subtotal:.2f}"])
-        data.append(['', '', f'Tax ({self.tax_percentage}%):', f"₹{self.tax_amount:.2f}"])
-        data.append(['', '', 'Total:', f"₹{self.total_amount:.2f}"])
-        
-        table = Table(data, colWidths=[3*inch, 1*inch, 1.5*inch, 1.5*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('GRID', (0, 0), (-1, -4), 1, colors.black),
-            ('LINEABOVE', (2, -3), (-1, -3), 1, colors.black),
-            ('LINEABOVE', (2, -1), (-1, -1), 2, colors.black),
-            ('FONTNAME', (2, -1), (-1, -1), 'Helvetica-Bold'),
-        ]))
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        return buffer
+        sources = [source for source, targets in cls.TRANSITIONS.items() if status in targets]
+        return bool(sources) and cls.objects.filter(pk=pk, status__in=sources).update(
+            status=status,
+            updated_at=timezone.now(),
+            **fields,
+        ) == 1
+    
+    @property
+    def is_open(self):
+        return self.status in self.OPEN_STATUSES
+
+
+class ArchivedBill(models.Model):
+    """Paid bill moved out of the hot ``bills`` table together with its order"""
+    
+    id = models.BigIntegerField(primary_key=True)
+    table = models.ForeignKey('tables.Table', on_delete=models.CASCADE, related_name='archived_bills')
+    order = models.OneToOneField(
+        'orders.ArchivedOrder',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='bill',
+        help_text="Whole-order bill; empty for split or merged bills, which list ArchivedBillLines"
+    )
+    # Groups are small and stay in the hot table
+    group = models.ForeignKey(
+        BillGroup,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='archived_bills'
+    )
+    cashier = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_bills'
+    )
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    service_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tax_percentage = models.DecimalField(max_digits=5, decimal_places=2)
+    tax_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Bill.Status.choices)
+    generated_at = models.DateTimeField(db_index=True)
+    paid_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'bills_archive'
+        ordering = ['-generated_at']
+        verbose_name = 'Archived Bill'
+        verbose_name_plural = 'Archived Bills'
+    
+    def __str__(self):
+        return f"Archived Bill #{self.pk}"
+    
+    def line_items(self):
+        """Billed items: the order's items, or the lines of a split or merged bill"""
+        if self.order_id is None:
+            return self.lines.select_related(
+                'order_item__menu_item', 'order_item__order__waiter', 'order_item__order__table'
+            )
+        return self.order.items.select_related('menu_item')
+
+
+class ArchivedPaymentIntent(models.Model):
+    """Payment attempt moved to the archive together with its bill (keeps its original id)"""
+    
+    id = models.BigIntegerField(primary_key=True)
+    bill = models.ForeignKey(ArchivedBill, on_delete=models.CASCADE, related_name='payment_intents')
+    provider = models.CharField(max_length=20)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=PaymentIntent.Status.choices)
+    reference = models.CharField(max_length=100, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_payment_intents'
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    settled_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'payment_intents_archive'
+        ordering = ['-created_at']
+        verbose_name = 'Archived Payment Intent'
+        verbose_name_plural = 'Archived Payment Intents'
+    
+    def __str__(self):
+        return f"Archived Payment #{self.pk} for Bill #{self.bill_id} ({self.status})"
+
+
+class ArchivedBillLine(models.Model):
+    """Line of an archived split or merged bill (keeps its original id)"""
+    
+    id = models.BigIntegerField(primary_key=True)
+    bill = models.ForeignKey(ArchivedBill, on_delete=models.CASCADE, related_name='lines')
+    order_item = models.ForeignKey('orders.ArchivedOrderItem', on_delete=models.PROTECT, related_name='bill_lines')
+    quantity = models.PositiveIntegerField()
+    
+    class Meta:
+        db_table = 'bill_lines_archive'
+        verbose_name = 'Archived Bill Line'
+        verbose_name_plural = 'Archived Bill Lines'
+    
+    def __str__(self):
+        return f"{self.quantity}x {self.order_item.menu_item.name}"
+    
+    # Same shape as BillLine
+    @property
+    def menu_item(self):
+        return self.order_item.menu_item
+    
+    @property
+    def price_at_order(self):
+        return self.order_item.price_at_order
+    
+    @property
+    def subtotal(self):
+        return self.quantity * self.order_item.price_at_order
+
+
+class DailySales(models.Model):
+    """
+    Sales ledger row for one business day (by payment date). The open day is
+    kept up to date as bills are generated and paid; the end-of-day close
+    recomputes it from the bills and freezes it.
+    """
+    
+    date = models.DateField(unique=True)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    bill_count = models.PositiveIntegerField(default=0, help_text="Bills paid that day")
+    generated_count = models.PositiveIntegerField(default=0, help_text="Bills generated that day, paid or not")
+    is_closed = models.BooleanField(default=False)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'daily_sales'
+        ordering = ['-date']
+        verbose_name = 'Daily Sales'
+        verbose_name_plural = 'Daily Sales'
+    
+    def __str__(self):
+        return f"Sales {self.date}"
+    
+    @property
+    def average_ticket(self):
+        return self.revenue / self.bill_count if self.bill_count else Decimal('0.00')
+
+
+class DailySalesBreakdown(models.Model):
+    """One day's sales for a menu category, waiter or hour of payment"""
+    
+    class Dimension(models.TextChoices):
+        CATEGORY = 'CATEGORY', 'Menu Category'
+        WAITER = 'WAITER', 'Waiter'
+        HOUR = 'HOUR', 'Hour'
+    
+    date = models.DateField()
+    dimension = models.CharField(max_length=10, choices=Dimension.choices)
+    key = models.CharField(max_length=50, help_text="Category value, waiter id or hour")
+    label = models.CharField(max_length=150, blank=True)
+    revenue = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Item sales before tax; bill totals for the hour breakdown"
+    )
+    count = models.PositiveIntegerField(default=0, help_text="Items sold; bills paid for the hour breakdown")
+    
+    class Meta:
+        db_table = 'daily_sales_breakdowns'
+        ordering = ['-date', 'dimension', '-revenue']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'dimension', 'key'], name='daily_sales_breakdown_unique'),
+        ]
+        verbose_name = 'Daily Sales Breakdown'
+        verbose_name_plural = 'Daily Sales Breakdowns'
+    
+    def __str__(self):
+        return f"{self.date} {self.dimension} {self.label}"
+
+
+class RenderedBillPDF(models.Model):
+    """A rendered bill PDF in file storage, addressed by the hash of its content"""
+    
+    content_hash = models.CharField(max_length=64, unique=True)
+    bill_id = models.BigIntegerField(db_index=True)
+    is_final = models.BooleanField(default=False, help_text="Rendered from a paid bill, which never changes")
+    file = models.FileField(upload_to='bill_pdfs/')
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'rendered_bill_pdfs'
+        verbose_name = 'Rendered Bill PDF'
+        verbose_name_plural = 'Rendered Bill PDFs'
+    
+    def __str__(self):
+        return f"PDF of Bill #{self.bill_id} ({self.content_hash[:12]})"
@@ -0,0 +1,179 @@
+"""
+Payment providers and the settlement pipeline for PaymentIntents
+"""
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Bill, PaymentIntent
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentDeclined(Exception):
+    """The provider refused the payment; the message is shown to the cashier"""
+
+
+class PaymentProvider:
+    """
+    Collects a PaymentIntent's amount. ``settle()`` returns the provider's
+    transaction reference or raises PaymentDeclined; it may block, so only
+    providers with ``settles_inline`` run inside the request.
+    """
+    label = ''
+    settles_inline = False
+
+    def settle(self, intent):
+        raise NotImplementedError
+
+
+class CashProvider(PaymentProvider):
+    """Cash counted at the till"""
+    label = 'Cash'
+    settles_inline = True
+
+    def settle(self, intent):
+        return f'CASH-{intent.pk}'
+
+
+class StubCardProvider(PaymentProvider):
+    """Local stand-in for a card terminal: approves after PAYMENT_STUB_SETTLE_SECONDS"""
+    label = 'Card'
+
+    def settle(self, intent):
+        time.sleep(settings.PAYMENT_STUB_SETTLE_SECONDS)
+        return f'STUB-{uuid.uuid4().hex[:12].upper()}'
+
+
+def get_provider(name):
+    try:
+        path = settings.PAYMENT_PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown payment provider: {name}")
+    return import_string(path)()
+
+
+def provider_choices():
+    """``[(key, label)]`` of the configured providers"""
+    return [(name, get_provider(name).label or name.title()) for name in settings.PAYMENT_PROVIDERS]
+
+
+def start_payment(bill, provider, cashier=None):
+    """
+    Open a PaymentIntent for the bill's total. Inline providers (cash)
+    settle before this returns; the others settle on a worker once the
+    intent is committed. If the bill already has a payment in flight, that
+    intent is returned instead, unless it has been stuck longer than
+    PAYMENT_INTENT_TIMEOUT_SECONDS. Raises ValueError for a paid bill or an
+    unknown provider.
+    """
+    backend = get_provider(provider)
+    if bill.status == Bill.Status.PAID:
+        raise ValueError("This bill is already paid")
+
+    intent = _create_intent(bill, provider, cashier)
+    if intent is None and expire_stale(bill=bill):
+        # The attempt in the way was stale (lost worker, silent terminal); this one replaces it
+        intent = _create_intent(bill, provider, cashier)
+    if intent is None:
+        return PaymentIntent.objects.get(bill=bill, status__in=PaymentIntent.OPEN_STATUSES)
+
+    if backend.settles_inline:
+        settle(intent.pk)
+    else:
+        transaction.on_commit(lambda: _enqueue_settlement(intent.pk))
+    intent.refresh_from_db()
+    return intent
+
+
+def _create_intent(bill, provider, cashier):
+    """A new pending intent, or None if the bill already has one open"""
+    try:
+        with transaction.atomic():
+            return PaymentIntent.objects.create(
+                bill=bill,
+                provider=provider,
+                amount=bill.total_amount,
+                created_by=cashier,
+            )
+    except IntegrityError:
+        return None
+
+
+def expire_stale(now=None, bill=None):
+    """
+    Fail open intents (of ``bill``, or of every bill) that have not moved
+    for PAYMENT_INTENT_TIMEOUT_SECONDS, in one conditional UPDATE, so their
+    bills can be paid again. Returns how many were failed.
+    """
+    now = now or timezone.now()
+    stale = PaymentIntent.objects.filter(
+        status__in=PaymentIntent.OPEN_STATUSES,
+        updated_at__lt=now - timedelta(seconds=settings.PAYMENT_INTENT_TIMEOUT_SECONDS),
+    )
+    if bill is not None:
+        stale = stale.filter(bill=bill)
+    return stale.update(
+        status=PaymentIntent.Status.FAILED,
+        error="Payment timed out, please retry",
+        updated_at=now,
+    )
+
+
+def _enqueue_settlement(intent_id):
+    from notifications.tasks import settle_payment
+    try:
+        settle_payment.apply_async((intent_id,), retry=False)
+    except Exception:
+        logger.exception("Could not queue settlement of payment intent #%s", intent_id)
+        PaymentIntent.transition(intent_id, PaymentIntent.Status.FAILED, error="Payment service unavailable, please retry")
+
+
+def settle(intent_id):
+    """
+    Run the provider for a pending intent and record the outcome. Only the
+    caller that moves the intent to PROCESSING settles it, so a redelivered
+    task does nothing. Returns True if the payment succeeded, False if it
+    failed and None if the intent was not pending.
+    """
+    if not PaymentIntent.transition(intent_id, PaymentIntent.Status.PROCESSING):
+        return None
+
+    intent = PaymentIntent.objects.select_related('bill', 'created_by').get(pk=intent_id)
+    try:
+        reference = get_provider(intent.provider).settle(intent)
+    except PaymentDeclined as e:
+        PaymentIntent.transition(intent_id, PaymentIntent.Status.FAILED, error=str(e)[:255])
+        return False
+    except Exception:
+        logger.exception("Settlement of payment intent #%s failed", intent_id)
+        PaymentIntent.transition(intent_id, PaymentIntent.Status.FAILED, error="Payment could not be completed")
+        return False
+
+    payment_succeeded(intent, reference)
+    return True
+
+
+def payment_succeeded(intent, reference):
+    """
+    Settlement callback: record the intent as succeeded, then pay the bill
+    and free its table(s), all in one transaction.
+    """
+    with transaction.atomic():
+        if not PaymentIntent.transition(
+            intent.pk, PaymentIntent.Status.SUCCEEDED, reference=reference, settled_at=timezone.now()
+        ):
+            # Timed out while the provider was still working; the bill stays open
+            logger.warning("Payment intent #%s settled after it timed out; refund reference %s", intent.pk, reference)
+            return False
+        if not intent.bill.mark_as_paid(cashier=intent.created_by):
+            # Paid some other way meanwhile; the money collected here must go back
+            logger.warning("Bill #%s was already paid; refund payment intent #%s", intent.bill_id, intent.pk)
+            PaymentIntent.objects.filter(pk=intent.pk).update(error="Bill was already paid; refund this payment")
+    return True
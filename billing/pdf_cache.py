@@ -0,0 +1,109 @@
+"""
+Content-addressed cache of rendered bill PDFs with size-bounded LRU eviction
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Bill, RenderedBillPDF
+from .rendering import bill_document, document_hash, render_pdf
+
+logger = logging.getLogger(__name__)
+
+# Hits refresh last_accessed at most this often, so reprints do not write on every request
+TOUCH_INTERVAL = timedelta(minutes=1)
+
+
+def touch(entry):
+    """Mark a cache hit for LRU purposes"""
+    now = timezone.now()
+    if entry.last_accessed < now - TOUCH_INTERVAL:
+        RenderedBillPDF.objects.filter(pk=entry.pk).update(last_accessed=now)
+        entry.last_accessed = now
+    return entry
+
+
+def get_or_render(bill):
+    """
+    The cached PDF for ``bill``, rendering and storing it on a miss.
+
+    Paid bills never change, so once rendered they are found by bill id
+    without rebuilding the document. Other bills are looked up by the hash
+    of their current content; any change (items, tax, totals) misses and
+    renders a new entry, and the stale one ages out through eviction.
+    """
+    is_final = bill.status == Bill.Status.PAID
+    if is_final:
+        entry = RenderedBillPDF.objects.filter(bill_id=bill.pk, is_final=True).first()
+        if entry is not None:
+            return touch(entry)
+    
+    document = bill_document(bill)
+    content_hash = document_hash(document)
+    entry = RenderedBillPDF.objects.filter(content_hash=content_hash).first()
+    if entry is not None:
+        if is_final and not entry.is_final:
+            RenderedBillPDF.objects.filter(pk=entry.pk).update(is_final=True)
+            entry.is_final = True
+        return touch(entry)
+    
+    pdf = render_pdf(document)
+    entry = RenderedBillPDF(
+        content_hash=content_hash,
+        bill_id=bill.pk,
+        is_final=is_final,
+        size=len(pdf),
+        last_accessed=timezone.now(),
+    )
+    entry.file.save(f'{content_hash}.pdf', ContentFile(pdf), save=False)
+    try:
+        with transaction.atomic():
+            entry.save()
+    except IntegrityError:
+        # A concurrent request stored the same render first; keep theirs
+        entry.file.delete(save=False)
+        return RenderedBillPDF.objects.get(content_hash=content_hash)
+    
+    evict()
+    return entry
+
+
+def schedule_render(bill_id):
+    """Pre-render the bill's PDF on a worker once the current transaction commits"""
+    transaction.on_commit(lambda: _enqueue_render(bill_id))
+
+
+def _enqueue_render(bill_id):
+    from notifications.tasks import render_bill_pdf
+    try:
+        render_bill_pdf.apply_async((bill_id,), retry=False)
+    except Exception:
+        # No broker: the first download renders inline instead
+        logger.exception("Could not queue PDF render for bill #%s", bill_id)
+
+
+def evict(max_bytes=None):
+    """
+    Delete least recently used entries (files and rows) until the cache fits
+    in ``max_bytes`` (default BILL_PDF_CACHE_MAX_BYTES). Returns the number removed.
+    """
+    max_bytes = settings.BILL_PDF_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    excess = (RenderedBillPDF.objects.aggregate(total=Sum('size'))['total'] or 0) - max_bytes
+    removed = 0
+    while excess > 0:
+        victims = list(RenderedBillPDF.objects.order_by('last_accessed', 'pk')[:100])
+        if not victims:
+            break
+        for entry in victims:
+            if excess <= 0:
+                break
+            entry.file.delete(save=False)
+            entry.delete()
+            excess -= entry.size
+            removed += 1
+    return removed
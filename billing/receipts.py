@@ -0,0 +1,89 @@
+"""
+Thermal-printer receipts (80mm, 48 columns) as plain text or ESC/POS bytes
+"""
+import textwrap
+
+# Characters per line in Font A on an 80mm printer
+RECEIPT_WIDTH = 48
+
+# ESC/POS commands
+ESC_INIT = b'\x1b@'
+ESC_ALIGN_LEFT = b'\x1ba\x00'
+ESC_ALIGN_CENTER = b'\x1ba\x01'
+ESC_BOLD_ON = b'\x1bE\x01'
+ESC_BOLD_OFF = b'\x1bE\x00'
+GS_DOUBLE_SIZE = b'\x1d!\x11'
+GS_NORMAL_SIZE = b'\x1d!\x00'
+ESC_FEED_4 = b'\x1bd\x04'
+GS_PARTIAL_CUT = b'\x1dV\x01'
+
+# Printer code page PC437 has no rupee sign
+CURRENCY = 'Rs.'
+ENCODING = 'cp437'
+
+
+def _columns(left, right, width):
+    """``left`` and ``right`` on one line, padded apart to ``width``"""
+    return f"{left} {right:>{max(width - len(left) - 1, 0)}}"
+
+
+def _item_lines(name, quantity, price, subtotal, width):
+    """Item row: the name wraps on its own column, numbers align right on the first line"""
+    numbers = f"{quantity:>4} {price:>9} {subtotal:>10}"
+    name_width = width - len(numbers) - 1
+    wrapped = textwrap.wrap(name, name_width) or ['']
+    lines = [f"{wrapped[0]:<{name_width}} {numbers}"]
+    lines.extend(f"  {part}" for part in textwrap.wrap(' '.join(wrapped[1:]), name_width - 2))
+    return lines
+
+
+def receipt_sections(document, width=RECEIPT_WIDTH):
+    """
+    ``(header, body, total)`` line lists for a bill document (see
+    billing.rendering.bill_document), so each output format can style them.
+    """
+    rule = '-' * width
+    header = ['RESTAURANT BILL']
+    
+    body = [
+        rule,
+        _columns(f"Bill #: {document['number']}", document['date'], width),
+        _columns(f"Table: {document['table']}", f"Waiter: {document['waiter']}" if document['waiter'] else '', width),
+        rule,
+        _columns('Item', f"{'Qty':>4} {'Price':>9} {'Subtotal':>10}", width),
+    ]
+    for name, quantity, price, subtotal in document['items']:
+        body.extend(_item_lines(name, quantity, price, subtotal, width))
+    body.extend([rule, _columns('Subtotal:', f"{CURRENCY} {document['subtotal']}", width)])
+    if document['service_charge']:
+        body.append(_columns('Service charge:', f"{CURRENCY} {document['service_charge']}", width))
+    body.append(_columns(f"Tax ({document['tax_percentage']}%):", f"{CURRENCY} {document['tax_amount']}", width))
+    
+    total = [_columns('TOTAL:', f"{CURRENCY} {document['total_amount']}", width)]
+    return header, body, total
+
+
+def render_text(document, width=RECEIPT_WIDTH):
+    """Plain-text receipt, one printer line per text line"""
+    header, body, total = receipt_sections(document, width)
+    lines = [line.center(width).rstrip() for line in header] + body + total
+    lines.extend(['-' * width, 'Thank you! Please visit again.'.center(width).rstrip()])
+    return '\n'.join(lines) + '\n'
+
+
+def render_escpos(document, width=RECEIPT_WIDTH):
+    """Raw ESC/POS job: bold double-size title, body, bold total, then feed and cut"""
+    header, body, total = receipt_sections(document, width)
+    
+    def encode(lines):
+        return ''.join(f"{line}\n" for line in lines).encode(ENCODING, errors='replace')
+    
+    return b''.join([
+        ESC_INIT,
+        ESC_ALIGN_CENTER, ESC_BOLD_ON, GS_DOUBLE_SIZE, encode(header), GS_NORMAL_SIZE, ESC_BOLD_OFF,
+        ESC_ALIGN_LEFT, encode(body),
+        ESC_BOLD_ON, encode(total), ESC_BOLD_OFF,
+        encode(['-' * width]),
+        ESC_ALIGN_CENTER, encode(['Thank you! Please visit again.']),
+        ESC_FEED_4, GS_PARTIAL_CUT,
+    ])
@@ -0,0 +1,115 @@
+"""
+Bill documents: the printable content of a bill as plain data, and renderers for it
+"""
+import hashlib
+import json
+from io import BytesIO
+
+# Bump when the PDF layout changes so previously cached renders stop matching
+RENDER_VERSION = 2
+
+
+def _waiter_name(waiter):
+    return (waiter.get_full_name() or waiter.username) if waiter else ''
+
+
+def bill_document(bill, items=None):
+    """
+    Everything a rendered bill shows, as JSON-serializable data. Works for
+    Bill and ArchivedBill. Reads the order's waiter and items (one query
+    each unless already loaded); pass prefetched ``items`` (see
+    ``line_items()``) to skip the latter.
+    """
+    items = list(bill.line_items() if items is None else items)
+    if bill.order_id is None:
+        # Split or merged bill: its lines may span several orders and tables
+        orders = {line.order_item.order_id: line.order_item.order for line in items}.values()
+        tables = sorted({order.table.table_number for order in orders}) or [bill.table.table_number]
+        waiters = sorted({_waiter_name(order.waiter) for order in orders} - {''})
+    else:
+        tables = [bill.table.table_number]
+        waiters = [_waiter_name(bill.order.waiter)]
+    return {
+        'number': bill.pk,
+        'table': ' + '.join(tables),
+        'date': bill.generated_at.strftime('%Y-%m-%d %H:%M'),
+        'waiter': ', '.join(waiters),
+        'items': [
+            [item.menu_item.name, item.quantity, f"{item.price_at_order:.2f}", f"{item.subtotal:.2f}"]
+            for item in sorted(items, key=lambda item: item.pk)
+        ],
+        'subtotal': f"{bill.subtotal:.2f}",
+        'service_charge': f"{bill.service_charge:.2f}" if bill.service_charge else None,
+        'tax_percentage': str(bill.tax_percentage),
+        'tax_amount': f"{bill.tax_amount:.2f}",
+        'total_amount': f"{bill.total_amount:.2f}",
+    }
+
+
+def document_hash(document):
+    """Content address of a document (and of every render of it)"""
+    payload = json.dumps({'version': RENDER_VERSION, 'document': document}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render_pdf(document):
+    """Build the PDF for a bill document; returns the file contents as bytes"""
+    # ReportLab is slow to import, so only processes that actually render PDFs load it
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+    
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    # Title
+    elements.append(Paragraph("<b>Restaurant Bill</b>", styles['Title']))
+    elements.append(Spacer(1, 0.2*inch))
+    
+    # Bill details
+    bill_info = Paragraph(f"""
+        <b>Bill #:</b> {document['number']}<br/>
+        <b>Table:</b> {document['table']}<br/>
+        <b>Date:</b> {document['date']}<br/>
+        <b>Waiter:</b> {document['waiter']}
+    """, styles['Normal'])
+    elements.append(bill_info)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Items table
+    data = [['Item', 'Qty', 'Price', 'Subtotal']]
+    for name, quantity, price, subtotal in document['items']:
+        data.append([name, str(quantity), f"₹{price}", f"₹{subtotal}"])
+    
+    # Totals
+    totals = [['', '', 'Subtotal:', f"₹{document['subtotal']}"]]
+    if document['service_charge']:
+        totals.append(['', '', 'Service charge:', f"₹{document['service_charge']}"])
+    totals.append(['', '', f"Tax ({document['tax_percentage']}%):", f"₹{document['tax_amount']}"])
+    totals.append(['', '', 'Total:', f"₹{document['total_amount']}"])
+    data.extend(totals)
+    # Grid the header and items only; the totals rows follow below it
+    first_total = -len(totals)
+    
+    table = Table(data, colWidths=[3*inch, 1*inch, 1.5*inch, 1.5*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('GRID', (0, 0), (-1, first_total - 1), 1, colors.black),
+        ('LINEABOVE', (2, first_total), (-1, first_total), 1, colors.black),
+        ('LINEABOVE', (2, -1), (-1, -1), 2, colors.black),
+        ('FONTNAME', (2, -1), (-1, -1), 'Helvetica-Bold'),
+    ]))
+    elements.append(table)
+    
+    doc.build(elements)
+    return buffer.getvalue()
@@ -0,0 +1,95 @@
+"""
+Billing services: split and merged bills over BillLines
+"""
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from orders.models import Order, OrderItem
+from tables.models import Table
+from . import ledger
+from .models import Bill, BillGroup, BillLine
+from .pdf_cache import schedule_render
+
+
+def unbilled_orders():
+    """Served orders not yet covered by a whole-order bill or by bill lines"""
+    return Order.objects.filter(status=Order.Status.SERVED, bill__isnull=True).exclude(
+        Exists(BillLine.objects.filter(order_item__order=OuterRef('pk')))
+    )
+
+
+def create_bill_group(*, kind, order_ids, parts, cashier=None):
+    """
+    Bill the given served orders as ``len(parts)`` bills in one transaction.
+
+    Each part maps order item ids to the quantity charged on that bill.
+    Across the parts, every item of the orders must be charged exactly
+    once in full, so the orders end up completely billed. Bills and lines
+    go in with one bulk insert each, amounts are computed by one UPDATE
+    over the lines, and the covered tables move to BILL_REQUESTED in one
+    UPDATE. Raises ``ValidationError`` and writes nothing otherwise.
+    """
+    parts = [part for part in parts if part]
+    if not parts:
+        raise ValidationError("Assign the items to at least one bill.")
+    
+    with transaction.atomic():
+        # Locking the orders keeps two cashiers from billing the same items
+        orders = list(unbilled_orders().filter(pk__in=order_ids).select_for_update(of=('self',)).order_by('pk'))
+        if len(orders) != len(set(order_ids)):
+            raise ValidationError("Only served orders without a bill can be split or merged.")
+        
+        quantities = dict(OrderItem.objects.filter(order__in=orders).values_list('pk', 'quantity'))
+        assigned = Counter()
+        for part in parts:
+            for item_id, quantity in part.items():
+                if item_id not in quantities:
+                    raise ValidationError(f"Item {item_id} is not on the selected orders.")
+                assigned[item_id] += quantity
+        if assigned != Counter(quantities):
+            raise ValidationError("Every item must be charged exactly once across the bills.")
+        
+        group = BillGroup.objects.create(kind=kind, created_by=cashier)
+        bills = Bill.objects.bulk_create([
+            Bill(
+                group=group,
+                table_id=orders[0].table_id,
+                cashier=cashier,
+                subtotal=0,
+                tax_amount=0,
+                total_amount=0,
+            )
+            for _ in parts
+        ])
+        BillLine.objects.bulk_create([
+            BillLine(bill=bill, order_item_id=item_id, quantity=quantity)
+            for bill, part in zip(bills, parts)
+            for item_id, quantity in part.items()
+        ])
+        Bill.refresh_line_totals(Bill.objects.filter(group=group))
+        # bulk_create bypasses Bill.save, so the ledger is told here
+        ledger.record_generated(bills[0].generated_at, len(bills))
+        Table.transition_many({order.table_id for order in orders}, Table.Status.BILL_REQUESTED)
+        
+        for bill in bills:
+            schedule_render(bill.pk)
+    
+    return group
+
+
+def split_order(*, order_id, parts, cashier=None):
+    """Split one served order's items (or quantities of them) across several bills"""
+    if len(parts) < 2:
+        raise ValidationError("A split needs at least two bills.")
+    return create_bill_group(kind=BillGroup.Kind.SPLIT, order_ids=[order_id], parts=parts, cashier=cashier)
+
+
+def merge_orders(*, order_ids, cashier=None):
+    """One bill for several served orders, e.g. of pushed-together tables"""
+    if len(set(order_ids)) < 2:
+        raise ValidationError("Select at least two orders to merge.")
+    items = dict(OrderItem.objects.filter(order_id__in=order_ids).values_list('pk', 'quantity'))
+    return create_bill_group(kind=BillGroup.Kind.MERGE, order_ids=order_ids, parts=[items], cashier=cashier)
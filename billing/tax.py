@@ -0,0 +1,116 @@
+"""
+Tax and service-charge rules compiled into an in-process rate table
+"""
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Count, Max, Sum
+
+from orders.models import ITEM_SUBTOTAL, OrderItem
+from .models import LINE_SUBTOTAL, BillLine, TaxRule
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+# (version, RateTable) compiled by this process
+_compiled = (None, None)
+
+
+class RateTable:
+    """Tax and service-charge percentages per menu category"""
+
+    def __init__(self, rules):
+        defaults = defaultdict(lambda: ZERO)
+        by_category = defaultdict(lambda: defaultdict(lambda: ZERO))
+        for kind, category, rate in rules:
+            if category:
+                by_category[category][kind] += rate
+            else:
+                defaults[kind] += rate
+
+        def rates(kinds):
+            return tuple(
+                kinds[kind] if kind in kinds else defaults[kind]
+                for kind in (TaxRule.Kind.TAX, TaxRule.Kind.SERVICE_CHARGE)
+            )
+
+        self.default = rates({})
+        self.by_category = {category: rates(kinds) for category, kinds in by_category.items()}
+
+    def rates_for(self, category):
+        """``(tax %, service charge %)`` for a menu category"""
+        return self.by_category.get(category, self.default)
+
+    def amounts(self, subtotals):
+        """Bill amounts for ``{category: item subtotal}``, keyed by Bill field name"""
+        subtotal = service_charge = tax_amount = ZERO
+        for category, amount in subtotals.items():
+            tax_rate, service_rate = self.rates_for(category)
+            subtotal += amount
+            service_charge += amount * service_rate / 100
+            tax_amount += amount * tax_rate / 100
+
+        subtotal = subtotal.quantize(CENT, ROUND_HALF_UP)
+        service_charge = service_charge.quantize(CENT, ROUND_HALF_UP)
+        tax_amount = tax_amount.quantize(CENT, ROUND_HALF_UP)
+        return {
+            'subtotal': subtotal,
+            'service_charge': service_charge,
+            'tax_percentage': (tax_amount * 100 / subtotal).quantize(CENT, ROUND_HALF_UP) if subtotal else ZERO,
+            'tax_amount': tax_amount,
+            'total_amount': subtotal + service_charge + tax_amount,
+        }
+
+
+def current_version():
+    """
+    Version of the rule set, read from the rules themselves: any edit bumps
+    the latest ``updated_at`` and any deletion lowers the count. Every
+    process and worker sees the same value without a shared cache.
+
+    Rules must therefore change through the ORM: save(), delete() or a
+    queryset update(), which stamps ``updated_at`` itself (TaxRuleQuerySet).
+    Raw SQL that leaves ``updated_at`` alone is not noticed.
+    """
+    version = TaxRule.objects.aggregate(updated=Max('updated_at'), count=Count('id'))
+    return version['updated'], version['count']
+
+
+def rate_table():
+    """
+    The RateTable for the active rules. Compiled once per process and
+    rebuilt only after the rules change (one small aggregate per call).
+    """
+    global _compiled
+    # Read the version first, so rules changed meanwhile are recompiled next time
+    version = current_version()
+    compiled_version, table = _compiled
+    if table is None or compiled_version != version:
+        table = RateTable(TaxRule.objects.filter(is_active=True).values_list('kind', 'category', 'rate'))
+        _compiled = (version, table)
+    return table
+
+
+def _amounts_by(rows, keys):
+    """Apply the rate table to ``(key, category, subtotal)`` rows of a grouped aggregate"""
+    subtotals = defaultdict(dict)
+    for key, category, amount in rows:
+        subtotals[key][category] = amount or ZERO
+    table = rate_table()
+    return {key: table.amounts(subtotals[key]) for key in keys}
+
+
+def order_amounts(order_ids):
+    """``{order_id: bill amounts}`` from one grouped aggregate of the orders' items"""
+    rows = OrderItem.objects.filter(order_id__in=order_ids).order_by().values(
+        'order_id', 'menu_item__category'
+    ).annotate(amount=Sum(ITEM_SUBTOTAL)).values_list('order_id', 'menu_item__category', 'amount')
+    return _amounts_by(rows, order_ids)
+
+
+def line_bill_amounts(bill_ids):
+    """``{bill_id: bill amounts}`` from one grouped aggregate of split/merged bill lines"""
+    rows = BillLine.objects.filter(bill_id__in=bill_ids).order_by().values(
+        'bill_id', 'order_item__menu_item__category'
+    ).annotate(amount=Sum(LINE_SUBTOTAL)).values_list('bill_id', 'order_item__menu_item__category', 'amount')
+    return _amounts_by(rows, bill_ids)
@@ -1,3 +1,927 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_finished, request_started
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, connection
+from django.db.models import Count, Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import User
+from config import celery_app
+from menu.models import MenuItem
+from orders.analytics import dwell_samples
+from orders.models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusChange, ArchivedStationTicket, Order, OrderStatusChange,
+    StationTicket,
+)
+from orders.services import place_order
+from tables.models import Table
+from . import data_export, ledger, pdf_cache, rendering, tax
+from .payments import PaymentDeclined, PaymentProvider, payment_succeeded, settle, start_payment
+from .archive import archive_paid_orders
+from .models import (
+    ArchivedBill, ArchivedPaymentIntent, Bill, BillGroup, BillLine, DailySales, DailySalesBreakdown, PaymentIntent,
+    RenderedBillPDF, TaxRule,
+)
+from .receipts import GS_PARTIAL_CUT, RECEIPT_WIDTH
+from .services import merge_orders, split_order, unbilled_orders
+
+
+def asgi_get(client, path, params=None, on_body=None):
+    """
+    GET ``path`` through Django's ASGI handler with the test client's
+    session, as daphne serves it. ``on_body`` sees each body chunk as it is
+    sent. Returns ``(status, [body chunks])``.
+    """
+    cookie = '; '.join(f'{key}={morsel.value}' for key, morsel in client.cookies.items())
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': urlencode(params or {}).encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    received = []
+
+    async def receive():
+        if not received:
+            received.append(True)
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # No disconnect: wait until the handler cancels us
+        await asyncio.Event().wait()
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+        if on_body and message['type'] == 'http.response.body' and message.get('body'):
+            on_body(message['body'])
+
+    # Like the test client, keep the test transaction's connection open
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        async_to_sync(ASGIHandler())(scope, receive, send)
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+    return messages[0]['status'], [message['body'] for message in messages[1:] if message.get('body')]
+
+
+def make_bill(order, cashier=None):
+    """Create a 5% bill for an order"""
+    subtotal = order.total_amount
+    tax_amount = subtotal * Decimal('0.05')
+    return Bill.objects.create(
+        table=order.table,
+        order=order,
+        cashier=cashier,
+        subtotal=subtotal,
+        tax_amount=tax_amount,
+        total_amount=subtotal + tax_amount,
+    )
+
+
+class ArchiveTests(TestCase):
+    """Tests for moving paid orders to the archive tables"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+
+    def _paid_order(self, table_number, days_ago):
+        table = Table.objects.create(table_number=table_number, seating_capacity=4)
+        order = place_order(table=table, waiter=self.waiter, lines={self.soup.pk: 2})
+        bill = make_bill(order)
+        bill.mark_as_paid()
+        Bill.objects.filter(pk=bill.pk).update(paid_at=timezone.now() - timedelta(days=days_ago))
+        return order
+
+    def test_moves_old_paid_orders_with_items_and_bills(self):
+        old = self._paid_order('T1', days_ago=120)
+        recent = self._paid_order('T2', days_ago=1)
+
+        self.assertEqual(archive_paid_orders(days=90, chunk_size=1), 1)
+
+        self.assertEqual(list(Order.objects.values_list('pk', flat=True)), [recent.pk])
+        self.assertTrue(ArchivedOrder.objects.filter(pk=old.pk, total_amount=Decimal('20.00')).exists())
+        self.assertEqual(ArchivedOrderItem.objects.get().order_id, old.pk)
+        self.assertEqual(ArchivedBill.objects.get().order_id, old.pk)
+        self.assertFalse(Bill.objects.filter(order_id=old.pk).exists())
+
+    def test_payment_intents_move_with_the_bill(self):
+        table = Table.objects.create(table_number='T1', seating_capacity=4)
+        order = place_order(table=table, waiter=self.waiter, lines={self.soup.pk: 2})
+        bill = make_bill(order)
+        intent = start_payment(bill, 'CASH', cashier=self.waiter)
+        Bill.objects.filter(pk=bill.pk).update(paid_at=timezone.now() - timedelta(days=120))
+
+        self.assertEqual(archive_paid_orders(days=90), 1)
+
+        self.assertFalse(PaymentIntent.objects.exists())
+        archived = ArchivedPaymentIntent.objects.get()
+        self.assertEqual(
+            (archived.pk, archived.bill_id, archived.status, archived.reference, archived.created_by),
+            (intent.pk, bill.pk, PaymentIntent.Status.SUCCEEDED, f'CASH-{intent.pk}', self.waiter),
+        )
+        self.assertEqual(list(ArchivedBill.objects.get().payment_intents.all()), [archived])
+
+    def test_history_and_tickets_move_with_the_order(self):
+        old = self._paid_order('T1', days_ago=120)
+        Order.transition(old.pk, Order.Status.IN_KITCHEN)
+        history = list(OrderStatusChange.objects.filter(order=old).values_list('pk', 'to_status', 'changed_at'))
+        tickets = list(StationTicket.objects.filter(order=old).values_list('pk', 'station'))
+
+        archive_paid_orders(days=90)
+
+        self.assertFalse(OrderStatusChange.objects.filter(order_id=old.pk).exists())
+        self.assertFalse(StationTicket.objects.filter(order_id=old.pk).exists())
+        self.assertEqual(
+            list(ArchivedOrderStatusChange.objects.filter(order_id=old.pk).values_list('pk', 'to_status', 'changed_at')),
+            history,
+        )
+        self.assertEqual(list(ArchivedStationTicket.objects.filter(order_id=old.pk).values_list('pk', 'station')), tickets)
+        # Dwell times of the archived order can still be recomputed
+        samples = dwell_samples(history[0][2], timezone.now() + timedelta(seconds=1))
+        self.assertEqual([sample[:2] for sample in samples], [(old.pk, 'PLACED')])
+
+    def test_moves_old_paid_split_bills_with_their_lines(self):
+        table = Table.objects.create(table_number='T1', seating_capacity=4)
+        order = place_order(table=table, waiter=self.waiter, lines={self.soup.pk: 2})
+        Order.objects.filter(pk=order.pk).update(status=Order.Status.SERVED)
+        item_id = order.items.get().pk
+        group = split_order(order_id=order.pk, parts=[{item_id: 1}, {item_id: 1}])
+        bill_ids = list(group.bills.order_by('pk').values_list('pk', flat=True))
+        for bill in group.bills.all():
+            bill.mark_as_paid()
+        Bill.objects.filter(group=group).update(paid_at=timezone.now() - timedelta(days=120))
+
+        self.assertEqual(archive_paid_orders(days=90), 1)
+
+        self.assertFalse(Order.objects.filter(pk=order.pk).exists())
+        self.assertFalse(Bill.objects.filter(group=group).exists())
+        self.assertFalse(BillLine.objects.exists())
+        self.assertTrue(BillGroup.objects.filter(pk=group.pk).exists())
+        self.assertEqual(ArchivedOrderItem.objects.filter(order_id=order.pk).get().pk, item_id)
+        archived = list(ArchivedBill.objects.filter(group=group).order_by('pk'))
+        self.assertEqual([bill.pk for bill in archived], bill_ids)
+        self.assertEqual([bill.order_id for bill in archived], [None, None])
+        lines = list(archived[0].line_items())
+        self.assertEqual([(line.menu_item, line.quantity, line.subtotal) for line in lines], [(self.soup, 1, Decimal('10.00'))])
+
+    def test_split_bills_stay_until_every_share_is_old_and_paid(self):
+        table = Table.objects.create(table_number='T1', seating_capacity=4)
+        order = place_order(table=table, waiter=self.waiter, lines={self.soup.pk: 2})
+        Order.objects.filter(pk=order.pk).update(status=Order.Status.SERVED)
+        item_id = order.items.get().pk
+        group = split_order(order_id=order.pk, parts=[{item_id: 1}, {item_id: 1}])
+        first = group.bills.order_by('pk').first()
+        first.mark_as_paid()
+        Bill.objects.filter(pk=first.pk).update(paid_at=timezone.now() - timedelta(days=120))
+
+        self.assertEqual(archive_paid_orders(days=90), 0)
+
+        self.assertEqual(Bill.objects.filter(group=group).count(), 2)
+        self.assertEqual(BillLine.objects.count(), 2)
+        self.assertFalse(ArchivedBill.objects.exists())
+
+    def test_combined_queries_span_hot_and_archive(self):
+        self._paid_order('T1', days_ago=120)
+        self._paid_order('T2', days_ago=1)
+        archive_paid_orders(days=90)
+
+        totals = Bill.objects.combined_aggregate(
+            {'status': Bill.Status.PAID},
+            revenue=Sum('total_amount'),
+            bills=Count('id'),
+        )
+        self.assertEqual(totals, {'revenue': Decimal('42.00'), 'bills': 2})
+        self.assertEqual(Order.objects.combined_count(), 2)
+        self.assertEqual(len(Order.objects.combined('id', 'total_amount')), 2)
+
+
+class BillGenerateIdempotencyTests(TestCase):
+    """Tests for idempotency keys on bill generation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        table = Table.objects.create(table_number='T1', seating_capacity=4)
+        soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+        cls.order = place_order(table=table, waiter=cls.cashier, lines={soup.pk: 1})
+        Order.objects.filter(pk=cls.order.pk).update(status=Order.Status.SERVED)
+
+    def test_retry_returns_the_original_bill(self):
+        self.client.force_login(self.cashier)
+        data = {'order_id': self.order.pk, 'idempotency_key': 'k1'}
+        first = self.client.post('/billing/generate/', data)
+        retry = self.client.post('/billing/generate/', data)
+        bill = Bill.objects.get()
+        self.assertEqual(first['Location'], f'/billing/{bill.pk}/')
+        self.assertEqual(retry['Location'], first['Location'])
+
+    def test_second_key_for_billed_order_is_rejected(self):
+        self.client.force_login(self.cashier)
+        self.client.post('/billing/generate/', {'order_id': self.order.pk, 'idempotency_key': 'k1'})
+        response = self.client.post('/billing/generate/', {'order_id': self.order.pk, 'idempotency_key': 'k2'})
+        self.assertEqual(response['Location'], '/billing/generate/')
+        self.assertEqual(Bill.objects.count(), 1)
+
+
+class BillGenerateScreenTests(TestCase):
+    """Tests for SQL-side totals on the generate-bills screen"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+
+    def _served_order(self, number, quantity):
+        table = Table.objects.create(table_number=f'T{number}', seating_capacity=4)
+        order = place_order(table=table, waiter=self.cashier, lines={self.soup.pk: quantity})
+        Order.objects.filter(pk=order.pk).update(status=Order.Status.SERVED)
+        return order
+
+    def _screen_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/billing/generate/')
+        return response, len(ctx.captured_queries)
+
+    def test_waiting_orders_do_not_add_queries(self):
+        self.client.force_login(self.cashier)
+        self._served_order(1, 1)
+        _, one_order = self._screen_queries()
+        self._served_order(2, 2)
+        self._served_order(3, 3)
+        response, three_orders = self._screen_queries()
+        self.assertEqual(one_order, three_orders)
+        self.assertContains(response, '₹30.00')
+
+    def test_bill_subtotal_is_summed_from_items(self):
+        order = self._served_order(1, 2)
+        # A drifted stored total must not leak into the bill
+        Order.objects.filter(pk=order.pk).update(total_amount=Decimal('1.00'))
+        self.client.force_login(self.cashier)
+        self.client.post('/billing/generate/', {'order_id': order.pk})
+        self.assertEqual(Bill.objects.get(order=order).subtotal, Decimal('20.00'))
+
+
+class SplitMergeBillTests(TestCase):
+    """Tests for bills split across guests or merged across tables"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+        cls.tea = MenuItem.objects.create(name='Tea', category=MenuItem.Category.DRINKS, price=Decimal('4.00'))
+
+    def _served_order(self, number, lines):
+        table = Table.objects.create(table_number=f'T{number}', seating_capacity=4)
+        order = place_order(table=table, waiter=self.cashier, lines=lines)
+        Order.objects.filter(pk=order.pk).update(status=Order.Status.SERVED)
+        return order
+
+    def test_split_charges_each_share(self):
+        order = self._served_order(1, {self.soup.pk: 3, self.tea.pk: 1})
+        items = {item.menu_item_id: item.pk for item in order.items.all()}
+
+        group = split_order(
+            order_id=order.pk,
+            parts=[{items[self.soup.pk]: 2}, {items[self.soup.pk]: 1, items[self.tea.pk]: 1}],
+            cashier=self.cashier,
+        )
+
+        first, second = group.bills.order_by('pk')
+        self.assertEqual((first.subtotal, first.tax_amount, first.total_amount), (Decimal('20.00'), Decimal('1.00'), Decimal('21.00')))
+        self.assertEqual((second.subtotal, second.tax_amount, second.total_amount), (Decimal('14.00'), Decimal('0.70'), Decimal('14.70')))
+        self.assertEqual([line.quantity for line in second.line_items()], [1, 1])
+        self.assertFalse(unbilled_orders().filter(pk=order.pk).exists())
+        self.assertEqual(Table.objects.get(pk=order.table_id).status, Table.Status.BILL_REQUESTED)
+
+    def test_split_must_cover_every_item_once(self):
+        order = self._served_order(1, {self.soup.pk: 3})
+        item_id = order.items.get().pk
+
+        with self.assertRaises(ValidationError):
+            split_order(order_id=order.pk, parts=[{item_id: 1}, {item_id: 1}])
+        with self.assertRaises(ValidationError):
+            split_order(order_id=order.pk, parts=[{item_id: 2}, {item_id: 2}])
+
+        self.assertFalse(BillGroup.objects.exists())
+        self.assertTrue(unbilled_orders().filter(pk=order.pk).exists())
+
+    def test_merged_bill_frees_all_tables_once_paid(self):
+        first = self._served_order(1, {self.soup.pk: 1})
+        second = self._served_order(2, {self.tea.pk: 2})
+
+        bill = merge_orders(order_ids=[first.pk, second.pk], cashier=self.cashier).bills.get()
+        self.assertEqual(bill.subtotal, Decimal('18.00'))
+        self.assertEqual(unbilled_orders().count(), 0)
+
+        with CaptureQueriesContext(connection) as ctx:
+            bill.mark_as_paid(cashier=self.cashier)
+        table_updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "tables"')]
+        self.assertEqual(len(table_updates), 1)
+        self.assertEqual(
+            set(Table.objects.values_list('status', flat=True)), {Table.Status.AVAILABLE}
+        )
+
+    def test_split_view_posts_shares_per_bill(self):
+        order = self._served_order(1, {self.soup.pk: 2})
+        item_id = order.items.get().pk
+        self.client.force_login(self.cashier)
+
+        response = self.client.get(f'/billing/split/{order.pk}/', {'parts': 3})
+        self.assertContains(response, f'name="part3_{item_id}"')
+
+        self.client.post(f'/billing/split/{order.pk}/', {'parts': 2, f'part1_{item_id}': 1, f'part2_{item_id}': 1})
+        self.assertEqual(
+            sorted(Bill.objects.values_list('total_amount', flat=True)), [Decimal('10.50'), Decimal('10.50')]
+        )
+        detail = self.client.get(f'/billing/{Bill.objects.first().pk}/')
+        self.assertContains(detail, 'Soup')
+
+
+class DailySalesLedgerTests(TestCase):
+    """Tests for the incrementally maintained daily sales ledger"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        cls.waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+        cls.tea = MenuItem.objects.create(name='Tea', category=MenuItem.Category.DRINKS, price=Decimal('4.00'))
+
+    def _order(self, number, lines):
+        table = Table.objects.create(table_number=f'T{number}', seating_capacity=4)
+        return place_order(table=table, waiter=self.waiter, lines=lines)
+
+    def _breakdown(self, day):
+        return {
+            (row.dimension, row.key): (row.label, row.revenue, row.count)
+            for row in DailySalesBreakdown.objects.filter(date=day)
+        }
+
+    def test_payments_update_the_open_day(self):
+        make_bill(self._order(1, {self.soup.pk: 2, self.tea.pk: 1})).mark_as_paid()
+        split = self._order(2, {self.tea.pk: 2})
+        Order.objects.filter(pk=split.pk).update(status=Order.Status.SERVED)
+        item_id = split.items.get().pk
+        for bill in split_order(order_id=split.pk, parts=[{item_id: 1}, {item_id: 1}]).bills.all():
+            bill.mark_as_paid()
+
+        today = ledger.today_sales()
+        self.assertEqual((today.bill_count, today.revenue, today.tax), (3, Decimal('33.60'), Decimal('1.60')))
+        self.assertEqual(today.generated_count, 3)
+        self.assertEqual(today.average_ticket, Decimal('11.20'))
+        self.assertFalse(today.is_closed)
+
+        breakdown = self._breakdown(today.date)
+        self.assertEqual(breakdown[DailySalesBreakdown.Dimension.CATEGORY, 'DRINKS'], ('Drinks', Decimal('12.00'), 3))
+        self.assertEqual(breakdown[DailySalesBreakdown.Dimension.WAITER, str(self.waiter.pk)], ('waiter', Decimal('32.00'), 5))
+        hour = f'{timezone.localtime().hour:02d}'
+        self.assertEqual(breakdown[DailySalesBreakdown.Dimension.HOUR, hour][1:], (Decimal('33.60'), 3))
+
+        # Closing recomputes the same figures from the bills
+        ledger.close_day(today.date)
+        self.assertEqual(self._breakdown(today.date), breakdown)
+        closed = DailySales.objects.get(date=today.date)
+        self.assertEqual((closed.revenue, closed.generated_count), (Decimal('33.60'), 3))
+
+    def test_closed_days_are_frozen(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        bill = make_bill(self._order(1, {self.soup.pk: 1}))
+        bill.mark_as_paid()
+        Bill.objects.filter(pk=bill.pk).update(paid_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(ledger.close_days(), [yesterday])
+        closed = DailySales.objects.get(date=yesterday)
+        self.assertEqual((closed.is_closed, closed.bill_count, closed.revenue), (True, 1, Decimal('10.50')))
+
+        # A late payment dated on the closed day leaves it alone
+        late = make_bill(self._order(2, {self.soup.pk: 1}))
+        late.paid_at = timezone.now() - timedelta(days=1)
+        with self.assertLogs('billing.ledger', 'WARNING'):
+            self.assertFalse(ledger.record_payment(late))
+        self.assertEqual(DailySales.objects.get(date=yesterday).bill_count, 1)
+
+    def test_dashboards_read_the_ledger(self):
+        make_bill(self._order(1, {self.soup.pk: 2})).mark_as_paid()
+        DailySales.objects.filter(date=timezone.localdate()).update(revenue=Decimal('99.00'))
+        self.client.force_login(self.cashier)
+        self.assertContains(self.client.get('/dashboard/cashier/'), '₹99.00')
+
+
+class TaxRuleTests(TestCase):
+    """Tests for per-category tax and service-charge rules"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+        cls.tea = MenuItem.objects.create(name='Tea', category=MenuItem.Category.DRINKS, price=Decimal('4.00'))
+
+    def _add_rule(self, **fields):
+        return TaxRule.objects.create(**fields)
+
+    def _served_order(self):
+        table = Table.objects.create(table_number='T1', seating_capacity=4)
+        order = place_order(table=table, waiter=self.cashier, lines={self.soup.pk: 2, self.tea.pk: 1})
+        Order.objects.filter(pk=order.pk).update(status=Order.Status.SERVED)
+        return order
+
+    def test_bill_applies_category_rates_and_service_charge(self):
+        self._add_rule(name='Drinks VAT', category=MenuItem.Category.DRINKS, rate=Decimal('18.00'))
+        self._add_rule(name='Service', kind=TaxRule.Kind.SERVICE_CHARGE, rate=Decimal('10.00'))
+        order = self._served_order()
+
+        self.client.force_login(self.cashier)
+        self.client.post('/billing/generate/', {'order_id': order.pk})
+
+        bill = Bill.objects.get(order=order)
+        # 5% on the 20.00 of soup, 18% on the 4.00 of tea, 10% service on everything
+        self.assertEqual(
+            (bill.subtotal, bill.service_charge, bill.tax_amount, bill.total_amount, bill.tax_percentage),
+            (Decimal('24.00'), Decimal('2.40'), Decimal('1.72'), Decimal('28.12'), Decimal('7.17')),
+        )
+        receipt = self.client.get(f'/billing/{bill.pk}/receipt/').content.decode()
+        self.assertIn('Service charge:', receipt)
+
+    def test_split_bills_are_taxed_per_category(self):
+        self._add_rule(name='Drinks VAT', category=MenuItem.Category.DRINKS, rate=Decimal('18.00'))
+        order = self._served_order()
+        items = {item.menu_item_id: item.pk for item in order.items.all()}
+
+        group = split_order(order_id=order.pk, parts=[{items[self.soup.pk]: 2}, {items[self.tea.pk]: 1}])
+
+        soup_bill, tea_bill = group.bills.order_by('pk')
+        self.assertEqual((soup_bill.tax_amount, soup_bill.tax_percentage), (Decimal('1.00'), Decimal('5.00')))
+        self.assertEqual((tea_bill.tax_amount, tea_bill.total_amount), (Decimal('0.72'), Decimal('4.72')))
+
+    def test_rate_table_is_compiled_once_per_rule_change(self):
+        tax.rate_table()
+        with self.assertNumQueries(1):
+            self.assertEqual(tax.rate_table().rates_for(MenuItem.Category.DRINKS), (Decimal('5.00'), Decimal('0.00')))
+
+        rule = self._add_rule(name='Drinks VAT', category=MenuItem.Category.DRINKS, rate=Decimal('18.00'))
+        self.assertEqual(tax.rate_table().rates_for(MenuItem.Category.DRINKS), (Decimal('18.00'), Decimal('0.00')))
+        self.assertEqual(tax.rate_table().rates_for(MenuItem.Category.MAIN), (Decimal('5.00'), Decimal('0.00')))
+
+        rule.rate = Decimal('12.00')
+        rule.save()
+        self.assertEqual(tax.rate_table().rates_for(MenuItem.Category.DRINKS), (Decimal('12.00'), Decimal('0.00')))
+
+        rule.delete()
+        self.assertEqual(tax.rate_table().rates_for(MenuItem.Category.DRINKS), (Decimal('5.00'), Decimal('0.00')))
+
+    def test_rule_changes_reach_processes_without_a_shared_cache(self):
+        tax.rate_table()
+        # Another process edits the rules; this one never hears about it
+        TaxRule.objects.filter(kind=TaxRule.Kind.TAX, category='').update(
+            rate=Decimal('8.00'), updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        self.assertEqual(tax.rate_table().rates_for(MenuItem.Category.MAIN), (Decimal('8.00'), Decimal('0.00')))
+
+    def test_bulk_updates_outdate_the_rate_table(self):
+        tax.rate_table()
+        TaxRule.objects.filter(kind=TaxRule.Kind.TAX, category='').update(rate=Decimal('9.00'))
+        self.assertEqual(tax.rate_table().rates_for(MenuItem.Category.MAIN), (Decimal('9.00'), Decimal('0.00')))
+
+
+class DecliningProvider(PaymentProvider):
+    """Card terminal that turns every payment down"""
+
+    def settle(self, intent):
+        raise PaymentDeclined("Card declined")
+
+
+@override_settings(PAYMENT_STUB_SETTLE_SECONDS=0)
+class PaymentIntentTests(TestCase):
+    """Tests for payments settled through providers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+
+        self.table = Table.objects.create(table_number='T1', seating_capacity=4)
+        self.bill = make_bill(place_order(table=self.table, waiter=self.cashier, lines={self.soup.pk: 2}))
+        self.client.force_login(self.cashier)
+
+    def _pay(self, provider):
+        return self.client.post(f'/billing/{self.bill.pk}/pay/', {'provider': provider})
+
+    def test_cash_settles_in_the_request(self):
+        self._pay('CASH')
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.status, Bill.Status.PAID)
+        self.assertEqual(self.bill.cashier, self.cashier)
+        self.assertEqual(PaymentIntent.objects.get().status, PaymentIntent.Status.SUCCEEDED)
+        self.assertEqual(Table.objects.get(pk=self.table.pk).status, Table.Status.AVAILABLE)
+
+    def test_card_settles_on_a_worker_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._pay('CARD')
+        intent = PaymentIntent.objects.get()
+        self.assertEqual(Bill.objects.get(pk=self.bill.pk).status, Bill.Status.PENDING_PAYMENT)
+        self.assertContains(self.client.get(f'/billing/{self.bill.pk}/'), 'id="payment-status"')
+        status = self.client.get(f'/billing/payments/{intent.pk}/').json()
+        self.assertEqual((status['status'], status['is_open']), ('PENDING', True))
+
+        # A second submit while the first is in flight reuses its intent
+        self._pay('CARD')
+        self.assertEqual(PaymentIntent.objects.count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+        status = self.client.get(f'/billing/payments/{intent.pk}/').json()
+        self.assertEqual((status['status'], status['is_open']), ('SUCCEEDED', False))
+        self.assertEqual(Bill.objects.get(pk=self.bill.pk).status, Bill.Status.PAID)
+        self.assertTrue(PaymentIntent.objects.get().reference.startswith('STUB-'))
+
+    def test_redelivered_settlement_pays_once(self):
+        intent = start_payment(self.bill, 'CARD', cashier=self.cashier)
+        self.assertTrue(settle(intent.pk))
+        self.assertIsNone(settle(intent.pk))
+        self.assertFalse(Bill.objects.get(pk=self.bill.pk).mark_as_paid())
+        self.assertEqual(ledger.today_sales().bill_count, 1)
+
+    @override_settings(PAYMENT_PROVIDERS={'CARD': 'billing.tests.DecliningProvider'})
+    def test_declined_payment_leaves_the_bill_open(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._pay('CARD')
+        intent = PaymentIntent.objects.get()
+        self.assertEqual((intent.status, intent.error), (PaymentIntent.Status.FAILED, 'Card declined'))
+        self.assertEqual(Bill.objects.get(pk=self.bill.pk).status, Bill.Status.PENDING_PAYMENT)
+
+        # The cashier can try again once the failed attempt is closed
+        self.assertContains(self.client.get(f'/billing/{self.bill.pk}/'), 'Pay by')
+
+    def _stall(self, intent, status):
+        PaymentIntent.objects.filter(pk=intent.pk).update(
+            status=status,
+            updated_at=timezone.now() - timedelta(seconds=settings.PAYMENT_INTENT_TIMEOUT_SECONDS + 1),
+        )
+
+    def test_sweep_fails_intents_stuck_open(self):
+        from notifications.tasks import expire_stale_payments
+
+        # The settlement task is never delivered
+        with self.captureOnCommitCallbacks():
+            stuck = start_payment(self.bill, 'CARD', cashier=self.cashier)
+        other_table = Table.objects.create(table_number='T2', seating_capacity=4)
+        fresh_bill = make_bill(place_order(table=other_table, waiter=self.cashier, lines={self.soup.pk: 1}))
+        with self.captureOnCommitCallbacks():
+            fresh = start_payment(fresh_bill, 'CARD', cashier=self.cashier)
+        self._stall(stuck, PaymentIntent.Status.PENDING)
+
+        self.assertEqual(expire_stale_payments(), 'Expired 1 stale payment intents')
+
+        stuck.refresh_from_db()
+        self.assertEqual((stuck.status, stuck.error), (PaymentIntent.Status.FAILED, 'Payment timed out, please retry'))
+        self.assertEqual(PaymentIntent.objects.get(pk=fresh.pk).status, PaymentIntent.Status.PENDING)
+        self.assertContains(self.client.get(f'/billing/{self.bill.pk}/'), 'Pay by')
+        self._pay('CASH')
+        self.assertEqual(Bill.objects.get(pk=self.bill.pk).status, Bill.Status.PAID)
+
+    def test_new_attempt_supersedes_a_stale_intent(self):
+        with self.captureOnCommitCallbacks():
+            stuck = start_payment(self.bill, 'CARD', cashier=self.cashier)
+        self._stall(stuck, PaymentIntent.Status.PROCESSING)
+
+        intent = start_payment(self.bill, 'CASH', cashier=self.cashier)
+
+        self.assertNotEqual(intent.pk, stuck.pk)
+        self.assertEqual(intent.status, PaymentIntent.Status.SUCCEEDED)
+        self.assertEqual(PaymentIntent.objects.get(pk=stuck.pk).status, PaymentIntent.Status.FAILED)
+        # The terminal answering late cannot pay the bill a second time
+        with self.assertLogs('billing.payments', 'WARNING'):
+            self.assertFalse(payment_succeeded(stuck, 'STUB-LATE'))
+        self.assertEqual(ledger.today_sales().bill_count, 1)
+
+
+class BillPDFCacheTests(TestCase):
+    """Tests for the content-addressed rendered PDF cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        cls.table = Table.objects.create(table_number='T1', seating_capacity=4)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.bill = make_bill(place_order(table=self.table, waiter=self.cashier, lines={self.soup.pk: 1}))
+
+    def _download(self, **headers):
+        self.client.force_login(self.cashier)
+        return self.client.get(f'/billing/{self.bill.pk}/pdf/', headers=headers)
+
+    def test_item_grid_stops_above_the_totals(self):
+        from reportlab import platypus
+        document = rendering.bill_document(self.bill)
+        for service_charge, totals in ((None, 3), ('2.00', 4)):
+            with mock.patch.object(platypus, 'TableStyle', wraps=platypus.TableStyle) as style:
+                rendering.render_pdf(dict(document, service_charge=service_charge))
+            commands = [command[:3] for command in style.call_args.args[0]]
+            self.assertIn(('GRID', (0, 0), (-1, -totals - 1)), commands)
+            self.assertIn(('LINEABOVE', (2, -totals), (-1, -totals)), commands)
+
+    def test_same_content_is_rendered_once(self):
+        first = self._download()
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(b''.join(first.streaming_content).startswith(b'%PDF'))
+        self._download()
+        self.assertEqual(RenderedBillPDF.objects.count(), 1)
+
+        Bill.objects.filter(pk=self.bill.pk).update(tax_percentage=Decimal('10.00'))
+        self._download()
+        self.assertEqual(RenderedBillPDF.objects.count(), 2)
+
+    def test_etag_revalidation_returns_304(self):
+        etag = self._download()['ETag']
+        self.assertEqual(self._download(if_none_match=etag).status_code, 304)
+
+    def test_paid_bill_is_served_without_rebuilding(self):
+        self.bill.mark_as_paid(self.cashier)
+        entry = pdf_cache.get_or_render(self.bill)
+        self.assertTrue(entry.is_final)
+        bill = Bill.objects.get(pk=self.bill.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(pdf_cache.get_or_render(bill).pk, entry.pk)
+
+    def test_generation_and_payment_prerender_in_background(self):
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+        order = place_order(table=self.table, waiter=self.cashier, lines={self.soup.pk: 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bill = make_bill(order)
+        entry = RenderedBillPDF.objects.get(bill_id=bill.pk)
+        self.assertFalse(entry.is_final)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bill.mark_as_paid(self.cashier)
+        entry.refresh_from_db()
+        self.assertTrue(entry.is_final)
+        self.assertEqual(RenderedBillPDF.objects.filter(bill_id=bill.pk).count(), 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        old = pdf_cache.get_or_render(self.bill)
+        RenderedBillPDF.objects.filter(pk=old.pk).update(last_accessed=timezone.now() - timedelta(days=1))
+        other = make_bill(place_order(table=self.table, waiter=self.cashier, lines={self.soup.pk: 2}))
+        new = pdf_cache.get_or_render(other)
+
+        self.assertEqual(pdf_cache.evict(max_bytes=new.size), 1)
+        self.assertEqual(list(RenderedBillPDF.objects.values_list('pk', flat=True)), [new.pk])
+        self.assertFalse(old.file.storage.exists(old.file.name))
+
+
+@override_settings(BILL_EXPORT_WORKERS=2)
+class BillBulkExportTests(TestCase):
+    """Tests for the streamed ZIP export of bill PDFs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='x', role=User.Role.MANAGER)
+        cls.cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        cls.table = Table.objects.create(table_number='T1', seating_capacity=4)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def _bill(self, quantity):
+        return make_bill(place_order(table=self.table, waiter=self.cashier, lines={self.soup.pk: quantity}))
+
+    def test_zip_holds_hot_archived_and_cached_bills(self):
+        archived = self._bill(1)
+        archived.mark_as_paid(self.cashier)
+        Bill.objects.filter(pk=archived.pk).update(paid_at=timezone.now() - timedelta(days=120))
+        archive_paid_orders()
+        cached = pdf_cache.get_or_render(self._bill(2))
+        fresh = self._bill(3)
+
+        self.client.force_login(self.manager)
+        today = timezone.localdate().isoformat()
+        response = self.client.get('/billing/export/pdf/', {'start': today, 'end': today})
+        self.assertEqual(response['Content-Type'], 'application/zip')
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            names = archive.namelist()
+            self.assertEqual(sorted(names), sorted(
+                f'bill_{pk}_T1.pdf' for pk in (archived.pk, cached.bill_id, fresh.pk)
+            ))
+            with cached.file.open('rb') as stored:
+                self.assertEqual(archive.read(f'bill_{cached.bill_id}_T1.pdf'), stored.read())
+            self.assertTrue(archive.read(f'bill_{fresh.pk}_T1.pdf').startswith(b'%PDF'))
+        self.assertEqual(RenderedBillPDF.objects.count(), 1)
+
+    def test_zip_streams_under_asgi(self):
+        produced = []
+
+        def chunks(start, end):
+            for part in (b'PK-one', b'PK-two', b'PK-end'):
+                produced.append(part)
+                yield part
+
+        sent_after = []
+
+        def on_body(chunk):
+            sent_after.append(len(produced))
+
+        self.client.force_login(self.manager)
+        with mock.patch('billing.views.export_zip', chunks):
+            status, body = asgi_get(self.client, '/billing/export/pdf/', on_body=on_body)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, [b'PK-one', b'PK-two', b'PK-end'])
+        # Each piece went out before the next one was produced
+        self.assertEqual(sent_after, [1, 2, 3])
+
+    def test_zip_of_real_bills_under_asgi(self):
+        bill = self._bill(1)
+        self.client.force_login(self.manager)
+        status, body = asgi_get(self.client, '/billing/export/pdf/')
+        self.assertEqual(status, 200)
+        with zipfile.ZipFile(io.BytesIO(b''.join(body))) as archive:
+            self.assertEqual(archive.namelist(), [f'bill_{bill.pk}_T1.pdf'])
+
+    def test_only_managers_can_export(self):
+        self.client.force_login(self.cashier)
+        response = self.client.get('/billing/export/pdf/')
+        self.assertRedirects(response, '/dashboard/', fetch_redirect_response=False)
+
+
+class DataExportTests(TestCase):
+    """Tests for the streamed CSV/JSONL accounting exports"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='x', role=User.Role.MANAGER)
+        cls.cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+
+    def _bill(self, number, quantity):
+        table = Table.objects.create(table_number=f'T{number}', seating_capacity=4)
+        return make_bill(place_order(table=table, waiter=self.cashier, lines={self.soup.pk: quantity}))
+
+    def _export(self, dataset, **params):
+        self.client.force_login(self.manager)
+        today = timezone.localdate().isoformat()
+        return self.client.get(f'/billing/export/{dataset}/', {'start': today, 'end': today, **params})
+
+    def test_export_streams_under_asgi(self):
+        bills = [self._bill(number, 1) for number in range(1, 4)]
+        rows = data_export.dataset_rows
+        produced = []
+
+        def counted_rows(*args):
+            for row in rows(*args):
+                produced.append(row)
+                yield row
+
+        sent_after = []
+
+        def on_body(chunk):
+            sent_after.append(len(produced))
+
+        self.client.force_login(self.manager)
+        today = timezone.localdate().isoformat()
+        with mock.patch.object(data_export, 'FLUSH_BYTES', 1), \
+                mock.patch.object(data_export, 'dataset_rows', counted_rows):
+            status, body = asgi_get(self.client, '/billing/export/bills/', {'start': today, 'end': today}, on_body)
+
+        self.assertEqual(status, 200)
+        lines = list(csv.DictReader(io.StringIO(b''.join(body).decode())))
+        self.assertEqual([line['id'] for line in lines], [str(bill.pk) for bill in bills])
+        # The header and first rows went out before the last row was read
+        self.assertEqual(len(body), 4)
+        self.assertEqual(sent_after[:2], [0, 1])
+
+    def test_csv_covers_hot_and_archived_bills(self):
+        archived = self._bill(1, 1)
+        archived.mark_as_paid(self.cashier)
+        Bill.objects.filter(pk=archived.pk).update(paid_at=timezone.now() - timedelta(days=120))
+        archive_paid_orders()
+        hot = self._bill(2, 2)
+
+        response = self._export('bills')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['id'] for row in rows], [str(archived.pk), str(hot.pk)])
+        self.assertEqual((rows[0]['group_id'], rows[0]['table'], rows[0]['total_amount']), ('', 'T1', '10.50'))
+        self.assertEqual(rows[1]['status'], Bill.Status.PENDING_PAYMENT)
+
+    def test_gzipped_jsonl_order_items(self):
+        self._bill(1, 3)
+        response = self._export('order_items', format='jsonl', gzip='1')
+        self.assertEqual(response['Content-Disposition'].split('.')[-2:], ['jsonl', 'gz"'])
+
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        item = json.loads(lines[0])
+        self.assertEqual(len(lines), 1)
+        self.assertEqual((item['menu_item'], item['category'], item['quantity'], item['price_at_order']), ('Soup', 'STARTER', 3, '10.00'))
+
+    def test_rows_are_read_and_sent_in_chunks(self):
+        for number in range(5):
+            self._bill(number, 1)
+        with mock.patch.object(data_export, 'CHUNK_SIZE', 2), mock.patch.object(data_export, 'FLUSH_BYTES', 1):
+            pieces = list(self._export('orders').streaming_content)
+        self.assertEqual(len(pieces), 6)
+        self.assertTrue(pieces[0].startswith(b'id,table,waiter,status'))
+
+    def test_only_managers_can_export(self):
+        self.client.force_login(self.cashier)
+        response = self.client.get('/billing/export/orders/')
+        self.assertRedirects(response, '/dashboard/', fetch_redirect_response=False)
+        self.assertEqual(self._export('payroll').status_code, 404)
+
+
+class ReceiptTests(TestCase):
+    """Tests for the thermal-printer receipt formats"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        table = Table.objects.create(table_number='T1', seating_capacity=4)
+        soup = MenuItem.objects.create(
+            name='Roasted tomato and red pepper soup with basil', category=MenuItem.Category.STARTER,
+            price=Decimal('10.00'),
+        )
+        cls.bill = make_bill(place_order(table=table, waiter=cls.cashier, lines={soup.pk: 2}), cls.cashier)
+
+    def test_text_receipt_fits_the_paper(self):
+        self.client.force_login(self.cashier)
+        response = self.client.get(f'/billing/{self.bill.pk}/receipt/')
+        lines = response.content.decode().splitlines()
+        self.assertLessEqual(max(len(line) for line in lines), RECEIPT_WIDTH)
+        self.assertTrue(any(line.startswith('Roasted tomato') and line.endswith('20.00') for line in lines))
+        self.assertIn(f'TOTAL:{"Rs. 21.00":>{RECEIPT_WIDTH - 6}}', lines)
+
+    def test_escpos_job_initializes_and_cuts(self):
+        self.client.force_login(self.cashier)
+        job = self.client.get(f'/billing/{self.bill.pk}/receipt/', {'format': 'escpos'}).content
+        self.assertTrue(job.startswith(b'\x1b@'))
+        self.assertTrue(job.endswith(GS_PARTIAL_CUT))
+        self.assertIn(b'Rs. 21.00', job)
+
+    def test_reportlab_is_not_imported_at_startup(self):
+        script = (
+            "import sys, django; django.setup(); "
+            "import billing.views, billing.models, notifications.tasks; "
+            "print('reportlab' in sys.modules)"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings'},
+        )
+        self.assertEqual(result.stdout.strip(), 'False')
@@ -6,7 +6,13 @@ app_name = 'billing'
 urlpatterns = [
     path('', views.BillListView.as_view(), name='list'),
     path('generate/', views.BillGenerateView.as_view(), name='generate'),
+    path('split/<int:order_id>/', views.BillSplitView.as_view(), name='split'),
+    path('merge/', views.BillMergeView.as_view(), name='merge'),
+    path('export/pdf/', views.BillBulkExportView.as_view(), name='bulk_pdf'),
+    path('export/<str:dataset>/', views.DataExportView.as_view(), name='data_export'),
+    path('payments/<int:pk>/', views.PaymentStatusView.as_view(), name='payment_status'),
     path('<int:pk>/', views.BillDetailView.as_view(), name='detail'),
     path('<int:pk>/pay/', views.BillPaymentView.as_view(), name='pay'),
     path('<int:pk>/pdf/', views.BillPDFExportView.as_view(), name='pdf'),
+    path('<int:pk>/receipt/', views.BillReceiptExportView.as_view(), name='receipt'),
 ]
@@ -1,23 +1,42 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, DetailView, View
-from django.http import HttpResponse
-from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
+import uuid
 
-from .models import Bill
-from orders.models import Order
+from . import pdf_cache
+from .bulk_export import export_zip
+from .data_export import DATASETS, FORMATS, export_stream
+from .payments import provider_choices, start_payment
+from .receipts import render_escpos, render_text
+from .rendering import bill_document
+from .services import merge_orders, split_order, unbilled_orders
+from .tax import order_amounts
+from .models import Bill, PaymentIntent
+from orders import idempotency
+from orders.models import IdempotencyKey, Order
+from orders.pagination import KeysetPaginationMixin
+from orders.services import parse_order_lines
 from tables.models import Table
 
 
-class BillListView(LoginRequiredMixin, ListView):
-    """List all bills"""
+class BillListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
+    """List all bills (``?paging=cursor`` for keyset paging)"""
     model = Bill
     template_name = 'billing/bill_list.html'
     context_object_name = 'bills'
     paginate_by = 20
+    cursor_field = 'generated_at'
     
     def dispatch(self, request, *args, **kwargs):
         if not (request.user.is_cashier or request.user.is_manager):
@@ -48,13 +67,11 @@ class BillGenerateView(LoginRequiredMixin, View):
     
     def get(self, request):
         # Get tables with served orders that don't have bills
-        orders_needing_bills = Order.objects.filter(
-            status=Order.Status.SERVED,
-            bill__isnull=True
-        ).select_related('table', 'waiter')
+        orders_needing_bills = unbilled_orders().select_related('table', 'waiter').with_item_totals()
         
         context = {
             'orders_needing_bills': orders_needing_bills,
+            'idempotency_key': uuid.uuid4().hex,
         }
         return render(request, self.template_name, context)
     
@@ -62,33 +79,124 @@ class BillGenerateView(LoginRequiredMixin, View):
         order_id = request.POST.get('order_id')
         
         try:
-            order = Order.objects.get(id=order_id, status=Order.Status.SERVED, bill__isnull=True)
+            claim = idempotency.claim(
+                request.user,
+                IdempotencyKey.Scope.BILL_GENERATE,
+                idempotency.request_key(request),
+            )
+        except idempotency.DuplicateRequest as duplicate:
+            # Retried submission: send the cashier to the bill the first attempt created
+            if duplicate.result_id:
+                return redirect('billing:detail', pk=duplicate.result_id)
+            messages.warning(request, "This bill is still being generated.")
+            return redirect('billing:generate')
+        
+        try:
+            order = unbilled_orders().select_related('table').get(id=order_id)
             
             with transaction.atomic():
-                # Calculate bill amounts
-                from decimal import Decimal
-                subtotal = order.calculate_total()
-                tax_percentage = Decimal('5.00')  # Default 5% tax
-                tax_amount = (subtotal * tax_percentage) / Decimal('100.00')
-                total_amount = subtotal + tax_amount
+                # Lock the order so a concurrent split or merge cannot bill its items too
+                if not unbilled_orders().select_for_update(of=('self',)).filter(pk=order.pk).exists():
+                    raise Order.DoesNotExist
                 
-                # Create bill with all required fields
+                # Amounts come from one per-category aggregate of the items and the tax rules
                 bill = Bill.objects.create(
                     table=order.table,
                     order=order,
                     cashier=request.user,
-                    subtotal=subtotal,
-                    tax_percentage=tax_percentage,
-                    tax_amount=tax_amount,
-                    total_amount=total_amount,
+                    **order_amounts([order.pk])[order.pk],
                 )
+                idempotency.complete(claim, bill.pk)
             
             messages.success(request, f"Bill generated successfully for {order.table}")
             return redirect('billing:detail', pk=bill.pk)
         
-        except Order.DoesNotExist:
+        except (Order.DoesNotExist, ValueError):
+            idempotency.release(claim)
             messages.error(request, "Order not found or already has a bill")
             return redirect('billing:generate')
+        except IntegrityError:
+            # Another cashier billed the same order between our check and insert
+            idempotency.release(claim)
+            messages.error(request, "This order already has a bill")
+            return redirect('billing:generate')
+        except Exception:
+            idempotency.release(claim)
+            raise
+
+
+class BillSplitView(LoginRequiredMixin, View):
+    """Split one served order across several bills"""
+    template_name = 'billing/bill_split.html'
+    max_parts = 8
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not (request.user.is_cashier or request.user.is_manager):
+            messages.error(request, "You don't have permission to generate bills.")
+            return redirect('dashboard:home')
+        return super().dispatch(request, *args, **kwargs)
+    
+    def part_count(self, data):
+        try:
+            return min(max(int(data.get('parts', 2)), 2), self.max_parts)
+        except (TypeError, ValueError):
+            return 2
+    
+    def get(self, request, order_id):
+        order = get_object_or_404(unbilled_orders().select_related('table', 'waiter'), pk=order_id)
+        
+        context = {
+            'order': order,
+            'items': order.items.select_related('menu_item'),
+            'parts': range(1, self.part_count(request.GET) + 1),
+        }
+        return render(request, self.template_name, context)
+    
+    def post(self, request, order_id):
+        try:
+            parts = [
+                parse_order_lines(request.POST, prefix=f'part{number}_')
+                for number in range(1, self.part_count(request.POST) + 1)
+            ]
+            group = split_order(order_id=order_id, parts=parts, cashier=request.user)
+        except ValidationError as e:
+            for error in e.messages:
+                messages.error(request, error)
+            return redirect('billing:generate')
+        
+        messages.success(request, f"Order split into {group.bills.count()} bills")
+        return redirect('billing:list')
+
+
+class BillMergeView(LoginRequiredMixin, View):
+    """One bill for several served orders"""
+    template_name = 'billing/bill_merge.html'
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not (request.user.is_cashier or request.user.is_manager):
+            messages.error(request, "You don't have permission to generate bills.")
+            return redirect('dashboard:home')
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get(self, request):
+        orders = unbilled_orders().select_related('table', 'waiter').with_item_totals()
+        return render(request, self.template_name, {'orders_needing_bills': orders})
+    
+    def post(self, request):
+        try:
+            order_ids = [int(order_id) for order_id in request.POST.getlist('order_ids')]
+            group = merge_orders(order_ids=order_ids, cashier=request.user)
+        except ValueError:
+            messages.error(request, "Invalid order selection")
+            return redirect('billing:merge')
+        except ValidationError as e:
+            for error in e.messages:
+                messages.error(request, error)
+            return redirect('billing:merge')
+        
+        bill = group.bills.get()
+        messages.success(request, f"Bill generated for {len(order_ids)} merged orders")
+        return redirect('billing:detail', pk=bill.pk)
 
 
 class BillDetailView(LoginRequiredMixin, DetailView):
@@ -102,6 +210,14 @@ class BillDetailView(LoginRequiredMixin, DetailView):
             messages.error(request, "You don't have permission to view bills.")
             return redirect('dashboard:home')
         return super().dispatch(request, *args, **kwargs)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['payment_providers'] = provider_choices()
+        context['open_payment'] = self.object.payment_intents.filter(
+            status__in=PaymentIntent.OPEN_STATUSES
+        ).first()
+        return context
 
 
 class BillPaymentView(LoginRequiredMixin, View):
@@ -114,17 +230,49 @@ class BillPaymentView(LoginRequiredMixin, View):
         return super().dispatch(request, *args, **kwargs)
     
     def post(self, request, pk):
-        bill = get_object_or_404(Bill, pk=pk)
+        bill = get_object_or_404(Bill.objects.select_related('table'), pk=pk)
         
         if bill.status == Bill.Status.PAID:
             messages.warning(request, "This bill is already paid")
-        else:
-            bill.mark_as_paid(cashier=request.user)
+            return redirect('billing:detail', pk=bill.pk)
+        
+        try:
+            intent = start_payment(bill, request.POST.get('provider', 'CASH'), cashier=request.user)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('billing:detail', pk=bill.pk)
+        
+        if intent.status == PaymentIntent.Status.SUCCEEDED:
             messages.success(request, f"Payment processed successfully for {bill.table}. Table is now available.")
+        elif intent.status == PaymentIntent.Status.FAILED:
+            messages.error(request, f"Payment failed: {intent.error}")
+        else:
+            # Settles on a worker; the detail page polls PaymentStatusView
+            messages.info(request, "Waiting for the payment to settle...")
         
         return redirect('billing:detail', pk=bill.pk)
 
 
+class PaymentStatusView(LoginRequiredMixin, View):
+    """Payment intent status as JSON, polled by the bill page while a payment settles"""
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not (request.user.is_cashier or request.user.is_manager):
+            messages.error(request, "You don't have permission to process payments.")
+            return redirect('dashboard:home')
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get(self, request, pk):
+        # One primary-key lookup per poll
+        intent = PaymentIntent.objects.filter(pk=pk).values('id', 'bill_id', 'status', 'error').first()
+        if intent is None:
+            raise Http404("Payment not found")
+        intent['is_open'] = intent['status'] in PaymentIntent.OPEN_STATUSES
+        response = JsonResponse(intent)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
 class BillPDFExportView(LoginRequiredMixin, View):
     """Export bill as PDF"""
     
@@ -135,13 +283,132 @@ class BillPDFExportView(LoginRequiredMixin, View):
         return super().dispatch(request, *args, **kwargs)
     
     def get(self, request, pk):
-        bill = get_object_or_404(Bill, pk=pk)
+        bill = get_object_or_404(Bill.objects.select_related('table', 'order__waiter'), pk=pk)
         
-        # Generate PDF
-        pdf_buffer = bill.export_to_pdf()
+        # Cached render, keyed by the bill's content
+        entry = pdf_cache.get_or_render(bill)
+        etag = f'"{entry.content_hash}"'
+        last_modified = int(entry.created_at.timestamp())
         
-        # Return as download
-        response = HttpResponse(pdf_buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="bill_{bill.pk}_{bill.table.table_number}.pdf"'
+        # Repeat downloads of unchanged content get a 304
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = FileResponse(
+                entry.file.open('rb'),
+                as_attachment=True,
+                filename=f"bill_{bill.pk}_{bill.table.table_number}.pdf",
+                content_type='application/pdf',
+            )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        
+        return response
+
+
+class BillReceiptExportView(LoginRequiredMixin, View):
+    """Export bill as an 80mm thermal receipt: plain text, or ESC/POS with ``?format=escpos``"""
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not (request.user.is_cashier or request.user.is_manager):
+            messages.error(request, "You don't have permission to export bills.")
+            return redirect('dashboard:home')
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get(self, request, pk):
+        bill = get_object_or_404(Bill.objects.select_related('table', 'order__waiter'), pk=pk)
+        document = bill_document(bill)
+        
+        if request.GET.get('format') == 'escpos':
+            # Raw job for the counter printer (e.g. sent to it by the print agent)
+            response = HttpResponse(render_escpos(document), content_type='application/octet-stream')
+            response['Content-Disposition'] = f'attachment; filename="receipt_{bill.pk}.bin"'
+        else:
+            response = HttpResponse(render_text(document), content_type='text/plain; charset=utf-8')
+        
+        return response
+
+
+def export_date_range(request):
+    """``(start, end)`` dates from the query string (default: today), or ``(None, None)`` if invalid"""
+    today = timezone.localdate()
+    try:
+        start = parse_date(request.GET.get('start') or '') or today
+        end = parse_date(request.GET.get('end') or '') or start
+    except ValueError:
+        return None, None
+    if start is None or end < start:
+        return None, None
+    return start, end
+
+
+def streaming_body(request, chunks):
+    """
+    ``chunks`` (a sync generator) as a StreamingHttpResponse body.
+
+    Under ASGI, Django buffers a sync iterator completely before sending the
+    first byte, so each chunk is pulled through ``sync_to_async`` instead;
+    they all run on the request's thread, with its database connection.
+    """
+    if not isinstance(request, ASGIRequest):
+        return chunks
+    
+    pull = sync_to_async(lambda: next(chunks, None))
+    
+    async def body():
+        try:
+            while (chunk := await pull()) is not None:
+                yield chunk
+        finally:
+            # Also reached when the client disconnects
+            await sync_to_async(chunks.close)()
+    
+    return body()
+
+
+class BillBulkExportView(LoginRequiredMixin, View):
+    """Stream every bill PDF for a date range as one ZIP (managers only)"""
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_manager:
+            messages.error(request, "Only managers can export bills in bulk.")
+            return redirect('dashboard:home')
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get(self, request):
+        start, end = export_date_range(request)
+        if start is None:
+            messages.error(request, "Enter a valid date range.")
+            return redirect('billing:list')
+        
+        response = StreamingHttpResponse(streaming_body(request, export_zip(start, end)), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="bills_{start}_{end}.zip"'
+        return response
+
+
+class DataExportView(LoginRequiredMixin, View):
+    """Stream bills, orders or order items for a date range as CSV or JSONL (managers only)"""
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_manager:
+            messages.error(request, "Only managers can export accounting data.")
+            return redirect('dashboard:home')
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get(self, request, dataset):
+        fmt = request.GET.get('format', 'csv')
+        if dataset not in DATASETS or fmt not in FORMATS:
+            raise Http404("Unknown export")
+        start, end = export_date_range(request)
+        if start is None:
+            messages.error(request, "Enter a valid date range.")
+            return redirect('billing:list')
         
+        compress = request.GET.get('gzip') in ('1', 'on', 'true')
+        filename = f'{dataset}_{start}_{end}.{fmt}' + ('.gz' if compress else '')
+        response = StreamingHttpResponse(
+            streaming_body(request, export_stream(dataset, start, end, fmt=fmt, compress=compress)),
+            content_type='application/gzip' if compress else f'{FORMATS[fmt]}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
@@ -23,10 +23,34 @@ app.conf.beat_schedule = {
         'task': 'notifications.tasks.auto_close_abandoned_tables',
         'schedule': crontab(minute=0),  # Every hour
     },
+    'open-reservation-windows': {
+        'task': 'notifications.tasks.open_reservation_windows',
+        'schedule': crontab(),  # Every minute
+    },
+    'expire-stale-payments': {
+        'task': 'notifications.tasks.expire_stale_payments',
+        'schedule': crontab(),  # Every minute
+    },
     'alert-pending-bills': {
         'task': 'notifications.tasks.alert_pending_bills',
         'schedule': crontab(minute='*/15'),  # Every 15 minutes
     },
+    'compute-dwell-time-stats': {
+        'task': 'notifications.tasks.compute_dwell_time_stats',
+        'schedule': crontab(minute=5),  # Every hour, for the hour that just ended
+    },
+    'purge-idempotency-keys': {
+        'task': 'notifications.tasks.purge_idempotency_keys',
+        'schedule': crontab(minute=30),  # Every hour
+    },
+    'close-sales-day': {
+        'task': 'notifications.tasks.close_sales_day',
+        'schedule': crontab(hour=0, minute=15),  # Daily, for the day that just ended
+    },
+    'archive-paid-orders': {
+        'task': 'notifications.tasks.archive_paid_orders',
+        'schedule': crontab(hour=4, minute=0),  # Daily, after closing
+    },
 }
 
 
@@ -31,6 +31,27 @@ DATABASES = {
     )
 }
 
+# Channels - share kitchen display broadcasts across workers through Redis
+if os.environ.get('REDIS_URL'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [os.environ['REDIS_URL']],
+            },
+        },
+    }
+
+# Cache - the table board and seating versions must be seen by every web and
+# Celery worker process, so they share one Redis
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+    }
+
 # Static files (Django 5.0 format)
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STORAGES = {
@@ -31,6 +31,7 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
     # Third-party apps
     'rest_framework',
     'corsheaders',
+    'channels',
     'django_celery_beat',
     
     # Custom apps
@@ -85,6 +87,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 
 # Database
@@ -170,6 +173,70 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 50,
 }
 
+# Channels (kitchen display WebSocket)
+# In-memory layer for local development and tests; production uses Redis
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
+
+# Cache holding the table board snapshot and the seating layout version, which
+# web and Celery worker processes must share. Per-process memory for local
+# development and tests; production uses Redis
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Kitchen stations: menu category -> station that prepares it (StationTicket.Station)
+# Categories not listed go to KITCHEN_DEFAULT_STATION
+KITCHEN_DEFAULT_STATION = 'KITCHEN'
+KITCHEN_STATION_ROUTING = {
+    'DRINKS': 'BAR',
+}
+KITCHEN_STATION_EMAILS = {
+    'KITCHEN': 'kitchen@restaurant.com',
+    'BAR': 'bar@restaurant.com',
+    'PASTRY': 'pastry@restaurant.com',
+}
+
+# Rendered bill PDFs are cached in the default storage under MEDIA_ROOT/bill_pdfs/;
+# least recently used files are evicted beyond this total size
+BILL_PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Processes rendering PDFs for the bulk bill export (None: one per CPU)
+BILL_EXPORT_WORKERS = None
+
+# Payment providers offered at the till (key -> class in billing.payments);
+# providers that do not settle inline (card terminals) settle on a Celery worker
+PAYMENT_PROVIDERS = {
+    'CASH': 'billing.payments.CashProvider',
+    'CARD': 'billing.payments.StubCardProvider',
+}
+# How long the stub card terminal takes to approve a payment
+PAYMENT_STUB_SETTLE_SECONDS = 3
+# Open payment intents that have not moved for this long are failed by the
+# per-minute sweep (or by the next attempt), so a lost settlement cannot block a bill
+PAYMENT_INTENT_TIMEOUT_SECONDS = 5 * 60
+
+# The table status board is served from a snapshot in the default cache; one
+# request rebuilds it after a change while the others keep serving the old one.
+# A rebuild that takes longer than this (seconds) is taken over by the next request
+TABLE_BOARD_REBUILD_TIMEOUT = 10
+
+# Most tables at consecutive positions of a section that seating may push together
+SEATING_MAX_COMBINED_TABLES = 3
+# How long a walk-in party is expected to stay; seating skips tables booked to start within it
+SEATING_EXPECTED_DURATION_MINUTES = 90
+
+# Occupied or bill-requested tables idle this long are closed by the hourly sweep
+TABLE_AUTO_CLOSE_HOURS = 3
+
+# Longest reservation window; also bounds the overlap scans over the reservations table
+RESERVATION_MAX_DURATION_MINUTES = 4 * 60
+
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -179,6 +246,13 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# Client idempotency keys (order creation, bill generation) are kept this long
+IDEMPOTENCY_KEY_TTL_SECONDS = 24 * 60 * 60
+
+# Hot/cold archiving of paid orders, items and bills
+ARCHIVE_PAID_ORDERS_AFTER_DAYS = 90
+ARCHIVE_CHUNK_SIZE = 500
+
 # Email Configuration (for notifications)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development
 # EMAIL_HOST = 'smtp.gmail.com'
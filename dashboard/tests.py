@@ -1,3 +1,156 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import User
+from billing import ledger
+from billing.models import Bill
+from menu.models import MenuItem
+from orders.services import place_order
+from tables import board
+from tables.models import Table
+
+
+class TableStatusBoardTests(TestCase):
+    """Tests for the live table status board"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+
+    def setUp(self):
+        keys = [board.VERSION_KEY, board.SNAPSHOT_KEY]
+        cache.delete_many(keys)
+        self.addCleanup(cache.delete_many, keys)
+
+    def _seat(self, number, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            table = Table.objects.create(table_number=f'T{number:02d}', seating_capacity=4)
+            return place_order(table=table, waiter=self.waiter, lines={self.soup.pk: quantity})
+
+    def _board(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/dashboard/table-status/')
+        return response, len(ctx.captured_queries)
+
+    def test_board_query_count_is_fixed(self):
+        self.client.force_login(self.waiter)
+        self._seat(1, 1)
+        _, one_table = self._board()
+
+        for number in range(2, 81):
+            if number % 2:
+                self._seat(number, 2)
+            else:
+                with self.captureOnCommitCallbacks(execute=True):
+                    Table.objects.create(table_number=f'T{number:02d}', seating_capacity=2)
+        response, eighty_tables = self._board()
+
+        # Session, user, the annotated tables and the grouped status counts
+        self.assertEqual(eighty_tables, one_table)
+        self.assertEqual(eighty_tables, 4)
+        self.assertEqual(len(response.context['tables']), 80)
+        self.assertEqual(response.context['total_tables'], 80)
+        self.assertEqual(response.context['status_counts']['occupied'], 40)
+        self.assertEqual(response.context['status_counts']['available'], 40)
+
+    def test_tables_carry_their_current_order(self):
+        order = self._seat(1, 3)
+        Table.objects.create(table_number='T02', seating_capacity=2)
+
+        seated, empty = Table.objects.with_current_order().order_by('table_number')
+        self.assertEqual(
+            (seated.current_order_id, seated.current_waiter, seated.current_order_total),
+            (order.pk, 'waiter', Decimal('30.00')),
+        )
+        self.assertEqual(seated.current_order_id, seated.current_order.pk)
+        self.assertIsNone(empty.current_order_id)
+
+    def test_board_is_served_from_the_snapshot_until_an_order_changes(self):
+        self.client.force_login(self.waiter)
+        order = self._seat(1, 1)
+        self._board()
+
+        response, queries = self._board()
+        # Session and user only
+        self.assertEqual(queries, 2)
+        self.assertEqual(response.context['tables'][0]['current_order_status'], 'PLACED')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.move_to_kitchen()
+        response, queries = self._board()
+        self.assertEqual(queries, 4)
+        self.assertEqual(response.context['tables'][0]['current_order_status'], 'IN_KITCHEN')
+
+    def test_stale_snapshot_is_served_while_another_request_rebuilds(self):
+        self._seat(1, 1)
+        board.snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            Table.objects.create(table_number='T02', seating_capacity=2)
+
+        lock = board.LOCK_KEY.format(board.current_version())
+        cache.add(lock, 1, 10)
+        self.addCleanup(cache.delete, lock)
+        with self.assertNumQueries(0):
+            floor = board.snapshot()
+        self.assertEqual(len(floor['tables']), 1)
+
+        cache.delete(lock)
+        self.assertEqual(len(board.snapshot()['tables']), 2)
+
+    @override_settings(TABLE_BOARD_REBUILD_TIMEOUT=0.1)
+    def test_rebuild_is_taken_over_when_no_snapshot_arrives(self):
+        self._seat(1, 1)
+        lock = board.LOCK_KEY.format(board.current_version())
+        cache.add(lock, 1, 10)
+        self.addCleanup(cache.delete, lock)
+
+        self.assertEqual(len(board.snapshot()['tables']), 1)
+        self.assertIsNotNone(cache.get(board.SNAPSHOT_KEY))
+
+
+class BillStatsTests(TestCase):
+    """Tests for the bill counts on the cashier and manager dashboards"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        cls.manager = User.objects.create_user('manager', password='x', role=User.Role.MANAGER)
+        soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('10.00'))
+        now = timezone.now()
+        bills = []
+        # Still pending from yesterday, pending from today, paid today
+        for number, generated_at in enumerate([now - timedelta(days=1), now, now]):
+            table = Table.objects.create(table_number=f'T{number}', seating_capacity=4)
+            order = place_order(table=table, waiter=cls.cashier, lines={soup.pk: 1})
+            with mock.patch('django.utils.timezone.now', return_value=generated_at):
+                bills.append(Bill.objects.create(
+                    table=table,
+                    order=order,
+                    subtotal=Decimal('10.00'),
+                    tax_amount=Decimal('0.50'),
+                    total_amount=Decimal('10.50'),
+                ))
+        bills[2].mark_as_paid()
+
+    def test_cashier_counts_bills_generated_today(self):
+        self.client.force_login(self.cashier)
+        context = self.client.get('/dashboard/cashier/').context
+        self.assertEqual(context['today_bills_count'], 2)
+        self.assertEqual(context['today_paid_count'], 1)
+        self.assertEqual(context['today_bills_count'], ledger.today_sales().generated_count)
+        self.assertEqual(context['pending_bills_count'], 2)
+
+    def test_manager_counts_bills_generated_today(self):
+        self.client.force_login(self.manager)
+        context = self.client.get('/dashboard/manager/').context
+        self.assertEqual(context['today_bills_count'], 2)
+        self.assertEqual(context['today_paid_bills_count'], 1)
+        self.assertEqual(context['pending_bills_count'], 2)
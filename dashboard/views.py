@@ -6,9 +6,12 @@ from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from datetime import timedelta
 
+from tables import board
 from tables.models import Table
-from orders.models import Order
-from billing.models import Bill
+from orders.models import Order, OrderDwellStat
+from billing import ledger
+from billing.models import Bill, DailySales, DailySalesBreakdown
+from billing.services import unbilled_orders
 from accounts.decorators import role_required
 
 
@@ -35,20 +38,22 @@ class TableStatusDashboardView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Get all tables with their current status
-        tables = Table.objects.all().order_by('table_number')
+        # Shared snapshot of the floor, rebuilt only after a table or order changes
+        floor = board.snapshot()
+        counts = floor['status_counts']
         
-        # Count tables by status
         status_counts = {
-            'available': tables.filter(status=Table.Status.AVAILABLE).count(),
-            'occupied': tables.filter(status=Table.Status.OCCUPIED).count(),
-            'bill_requested': tables.filter(status=Table.Status.BILL_REQUESTED).count(),
-            'closed': tables.filter(status=Table.Status.CLOSED).count(),
+            'available': counts[Table.Status.AVAILABLE],
+            'occupied': counts[Table.Status.OCCUPIED],
+            'bill_requested': counts[Table.Status.BILL_REQUESTED],
+            'closed': counts[Table.Status.CLOSED],
+            'reserved': counts[Table.Status.RESERVED],
         }
         
-        context['tables'] = tables
+        context['tables'] = floor['tables']
         context['status_counts'] = status_counts
-        context['total_tables'] = tables.count()
+        context['snapshot_built_at'] = floor['built_at']
+        context['total_tables'] = sum(counts.values())
         
         return context
 
@@ -81,7 +86,7 @@ class WaiterDashboardView(LoginRequiredMixin, TemplateView):
         available_tables = Table.objects.filter(status=Table.Status.AVAILABLE)
         
         # Get today's orders for this waiter
-        today = timezone.now().date()
+        today = timezone.localdate()
         if user.is_manager:
             today_orders = Order.objects.filter(created_at__date=today)
         else:
@@ -115,24 +120,18 @@ class CashierDashboardView(LoginRequiredMixin, TemplateView):
         # Get tables requesting bills (served orders without bills)
         tables_needing_bills = Table.objects.filter(
             status=Table.Status.OCCUPIED,
-            orders__status=Order.Status.SERVED,
-            orders__bill__isnull=True
-        ).distinct()
-        
-        # Today's stats
-        today = timezone.now().date()
-        today_bills = Bill.objects.filter(generated_at__date=today)
-        today_paid = today_bills.filter(status=Bill.Status.PAID)
-        today_revenue = today_paid.aggregate(
-            total=Sum('total_amount')
-        )['total'] or 0
+            pk__in=unbilled_orders().values('table_id'),
+        )
+        
+        # Today's stats, kept up to date in the sales ledger as bills are generated and paid
+        today_sales = ledger.today_sales()
         
         context['pending_bills'] = pending_bills[:10]
         context['tables_needing_bills'] = tables_needing_bills
         context['pending_bills_count'] = pending_bills.count()
-        context['today_bills_count'] = today_bills.count()
-        context['today_paid_count'] = today_paid.count()
-        context['today_revenue'] = today_revenue
+        context['today_bills_count'] = today_sales.generated_count
+        context['today_paid_count'] = today_sales.bill_count
+        context['today_revenue'] = today_sales.revenue
         
         return context
 
@@ -149,7 +148,7 @@ class ManagerDashboardView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        today = timezone.now().date()
+        today = timezone.localdate()
         
         # Table statistics
         tables = Table.objects.all()
@@ -164,22 +163,37 @@ class ManagerDashboardView(LoginRequiredMixin, TemplateView):
             status__in=[Order.Status.PLACED, Order.Status.IN_KITCHEN]
         ).count()
         
-        # Today's revenue
-        today_bills = Bill.objects.filter(generated_at__date=today)
-        today_paid_bills = today_bills.filter(status=Bill.Status.PAID)
-        today_revenue = today_paid_bills.aggregate(
-            total=Sum('total_amount')
-        )['total'] or 0
-        
-        context['today_bills_count'] = today_bills.count()
-        context['today_paid_bills_count'] = today_paid_bills.count()
-        context['today_revenue'] = today_revenue
-        context['pending_bills_count'] = Bill.objects.filter(
+        # Today's revenue from the sales ledger, with the last week of closed days
+        today_sales = ledger.today_sales()
+        pending_bills_count = Bill.objects.filter(
             status=Bill.Status.PENDING_PAYMENT
         ).count()
         
+        context['today_bills_count'] = today_sales.generated_count
+        context['today_paid_bills_count'] = today_sales.bill_count
+        context['today_revenue'] = today_sales.revenue
+        context['today_average_ticket'] = today_sales.average_ticket
+        context['pending_bills_count'] = pending_bills_count
+        context['today_sales_breakdown'] = DailySalesBreakdown.objects.filter(
+            date=today_sales.date
+        ).exclude(dimension=DailySalesBreakdown.Dimension.HOUR)
+        context['sales_history'] = DailySales.objects.filter(is_closed=True)[:7]
+        
         # Recent activity
         context['recent_orders'] = Order.objects.all().order_by('-created_at')[:5]
         context['recent_bills'] = Bill.objects.all().order_by('-generated_at')[:5]
         
+        # Order dwell times, precomputed hourly by notifications.tasks.compute_dwell_time_stats
+        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        dwell_stats = list(OrderDwellStat.objects.filter(hour__gte=today_start))
+        latest_hour = max((stat.hour for stat in dwell_stats), default=None)
+        context['dwell_by_hour'] = [
+            stat for stat in dwell_stats if stat.dimension == OrderDwellStat.Dimension.ALL
+        ]
+        context['dwell_breakdown'] = [
+            stat for stat in dwell_stats
+            if stat.hour == latest_hour and stat.dimension != OrderDwellStat.Dimension.ALL
+        ]
+        context['dwell_latest_hour'] = latest_hour
+        
         return context
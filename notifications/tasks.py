@@ -5,18 +5,27 @@ from celery import shared_task
 from django.core.mail import send_mail
 from django.utils import timezone
 from django.conf import settings
-from datetime import timedelta
+from datetime import date, datetime, timedelta
 
 
 @shared_task
 def send_kitchen_notification(order_id):
-    """Send email notification to kitchen when new order is placed"""
+    """Email each station ticket of a new order to that station"""
     from orders.models import Order
+    from orders.stations import station_for_category
     
     try:
-        order = Order.objects.get(id=order_id)
-        subject = f'New Order #{order.id} - Table {order.table.table_number}'
-        message = f"""
+        order = Order.objects.select_related('table', 'waiter').prefetch_related(
+            'tickets', 'items__menu_item'
+        ).get(id=order_id)
+        
+        for ticket in order.tickets.all():
+            lines = [item for item in order.items.all() if station_for_category(item.menu_item.category) == ticket.station]
+            if not lines:
+                continue
+            
+            subject = f'New Order #{order.id} - Table {order.table.table_number} ({ticket.get_station_display()})'
+            message = f"""
         New order received!
         
         Table: {order.table.table_number}
@@ -25,20 +34,20 @@ def send_kitchen_notification(order_id):
         
         Items:
         """
-        
-        for item in order.items.all():
-            message += f"\n- {item.quantity}x {item.menu_item.name}"
-        
-        if order.notes:
-            message += f"\n\nNotes: {order.notes}"
-        
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            ['kitchen@restaurant.com'],  # Replace with actual kitchen email
-            fail_silently=False,
-        )
+            
+            for item in lines:
+                message += f"\n- {item.quantity}x {item.menu_item.name}"
+            
+            if order.notes:
+                message += f"\n\nNotes: {order.notes}"
+            
+            send_mail(
+                subject,
+                message,
+                settings.DEFAULT_FROM_EMAIL,
+                [settings.KITCHEN_STATION_EMAILS.get(ticket.station, 'kitchen@restaurant.com')],
+                fail_silently=False,
+            )
         return f"Kitchen notified for order #{order.id}"
     except Exception as e:
         return f"Error sending kitchen notification: {str(e)}"
@@ -46,22 +55,36 @@ def send_kitchen_notification(order_id):
 
 @shared_task
 def auto_close_abandoned_tables():
-    """Auto-close tables that have been inactive for more than 3 hours"""
+    """Auto-close tables inactive for TABLE_AUTO_CLOSE_HOURS and tell the manager in one email"""
     from tables.models import Table
     
-    threshold = timezone.now() - timedelta(hours=3)
-    abandoned_tables = Table.objects.filter(
-        status__in=['OCCUPIED', 'BILL_REQUESTED'],
-        last_activity__lt=threshold
-    )
+    threshold = timezone.now() - timedelta(hours=settings.TABLE_AUTO_CLOSE_HOURS)
+    closed = Table.close_abandoned(threshold)
+    
+    if closed:
+        table_list = "\n".join(f"- Table {number}" for number in sorted(closed.values()))
+        send_mail(
+            f'Auto-closed {len(closed)} Abandoned Tables',
+            f"""
+        These tables had no activity for {settings.TABLE_AUTO_CLOSE_HOURS} hours and were closed:
+        
+        {table_list}
+        """,
+            settings.DEFAULT_FROM_EMAIL,
+            ['manager@restaurant.com'],  # Replace with actual manager email
+            fail_silently=False,
+        )
     
-    count = 0
-    for table in abandoned_tables:
-        table.status = Table.Status.CLOSED
-        table.save()
-        count += 1
+    return f"Closed {len(closed)} abandoned tables"
+
+
+@shared_task
+def open_reservation_windows():
+    """Hold tables whose reservation window has opened and release no-shows"""
+    from tables.reservations import open_windows
     
-    return f"Closed {count} abandoned tables"
+    reserved, no_shows = open_windows()
+    return f"Reserved {reserved} tables, {no_shows} no-shows"
 
 
 @shared_task
@@ -100,3 +123,73 @@ def alert_pending_bills():
         return f"Alert sent for {pending_bills.count()} pending bills"
     
     return "No pending bills to alert"
+
+
+@shared_task
+def compute_dwell_time_stats(hour=None):
+    """Precompute order dwell-time percentiles for an hour (default: the previous hour)"""
+    from orders.analytics import compute_dwell_stats, hour_start
+    
+    if hour is None:
+        start = hour_start(timezone.now()) - timedelta(hours=1)
+    else:
+        start = datetime.fromisoformat(hour)
+    rows = compute_dwell_stats(start)
+    return f"Wrote {rows} dwell-time stats for {start:%Y-%m-%d %H:00}"
+
+
+@shared_task
+def purge_idempotency_keys():
+    """Delete idempotency keys older than IDEMPOTENCY_KEY_TTL_SECONDS"""
+    from orders.idempotency import purge_expired
+    
+    return f"Purged {purge_expired()} idempotency keys"
+
+
+@shared_task
+def archive_paid_orders(days=None, chunk_size=None):
+    """Move paid orders older than the configured age to the archive tables"""
+    from billing.archive import archive_paid_orders as archive
+    
+    archived = archive(days=days, chunk_size=chunk_size)
+    return f"Archived {archived} paid orders"
+
+
+@shared_task
+def render_bill_pdf(bill_id):
+    """Render and store a bill's PDF ahead of the first download"""
+    from billing.models import Bill
+    from billing.pdf_cache import get_or_render
+    
+    bill = Bill.objects.select_related('table', 'order__waiter').filter(pk=bill_id).first()
+    if bill is None:
+        return f"Bill #{bill_id} not found"
+    
+    entry = get_or_render(bill)
+    return f"PDF ready for bill #{bill_id} ({entry.size} bytes)"
+
+
+@shared_task
+def close_sales_day(since=None):
+    """Freeze the daily sales ledger for yesterday (or every day from ``since``)"""
+    from billing.ledger import close_days
+    
+    days = close_days(since=date.fromisoformat(since) if since else None)
+    return f"Closed {len(days)} sales day(s)"
+
+
+@shared_task
+def settle_payment(intent_id):
+    """Settle a payment intent with its provider, then pay the bill"""
+    from billing.payments import settle
+    
+    outcome = {True: 'succeeded', False: 'failed', None: 'was not pending'}[settle(intent_id)]
+    return f"Payment intent #{intent_id} {outcome}"
+
+
+@shared_task
+def expire_stale_payments():
+    """Fail payment intents stuck open longer than PAYMENT_INTENT_TIMEOUT_SECONDS"""
+    from billing.payments import expire_stale
+    
+    return f"Expired {expire_stale()} stale payment intents"
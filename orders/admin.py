@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusChange, Order, OrderDwellStat, OrderItem, StationTicket
 
 
 class OrderItemInline(admin.TabularInline):
@@ -17,7 +17,7 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'table', 'waiter', 'status', 'created_at', 'order_total')
     list_filter = ('status', 'created_at')
     search_fields = ('table__table_number', 'waiter__username')
-    readonly_fields = ('created_at', 'updated_at', 'order_total')
+    readonly_fields = ('created_at', 'updated_at', 'order_total', 'item_count')
     inlines = [OrderItemInline]
     
     fieldsets = (
@@ -25,7 +25,7 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ('table', 'waiter', 'status', 'notes')
         }),
         ('Total', {
-            'fields': ('order_total',)
+            'fields': ('order_total', 'item_count')
         }),
         ('Metadata', {
             'fields': ('created_at', 'updated_at'),
@@ -35,7 +35,7 @@ class OrderAdmin(admin.ModelAdmin):
     
     def order_total(self, obj):
         """Display order total"""
-        return f"₹{obj.calculate_total():.2f}"
+        return f"₹{obj.total_amount:.2f}"
     order_total.short_description = 'Total'
 
 
@@ -46,3 +46,73 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('order', 'menu_item', 'quantity', 'price_at_order', 'subtotal')
     list_filter = ('menu_item__category',)
     search_fields = ('order__id', 'menu_item__name')
+    
+    def delete_queryset(self, request, queryset):
+        """Bulk deletes bypass OrderItem.delete, so rebuild the affected order totals"""
+        order_ids = set(queryset.values_list('order_id', flat=True))
+        super().delete_queryset(request, queryset)
+        Order.rebuild_totals(Order.objects.filter(pk__in=order_ids))
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    """Read-only inline for archived order items"""
+    model = ArchivedOrderItem
+    extra = 0
+    can_delete = False
+    fields = ('menu_item', 'quantity', 'price_at_order', 'subtotal')
+    readonly_fields = fields
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedOrderStatusChangeInline(admin.TabularInline):
+    """Read-only inline for the status history of archived orders"""
+    model = ArchivedOrderStatusChange
+    extra = 0
+    can_delete = False
+    fields = ('from_status', 'to_status', 'changed_at')
+    readonly_fields = fields
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """Read-only admin for archived orders"""
+    
+    list_display = ('id', 'table', 'waiter', 'total_amount', 'created_at', 'archived_at')
+    list_filter = ('created_at',)
+    search_fields = ('id', 'table__table_number', 'waiter__username')
+    inlines = [ArchivedOrderItemInline, ArchivedOrderStatusChangeInline]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OrderDwellStat)
+class OrderDwellStatAdmin(admin.ModelAdmin):
+    """Read-only admin for hourly dwell-time percentiles"""
+    
+    list_display = ('hour', 'status', 'dimension', 'label', 'samples', 'p50_seconds', 'p90_seconds', 'p99_seconds')
+    list_filter = ('status', 'dimension', 'hour')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StationTicket)
+class StationTicketAdmin(admin.ModelAdmin):
+    """Admin interface for StationTicket model"""
+    
+    list_display = ('id', 'order', 'station', 'state', 'created_at', 'updated_at')
+    list_filter = ('station', 'state', 'created_at')
+    search_fields = ('order__id', 'order__table__table_number')
+    readonly_fields = ('created_at', 'updated_at')
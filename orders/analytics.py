@@ -0,0 +1,120 @@
+"""
+Dwell-time analytics over the order status history
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from menu.models import MenuItem
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusChange, Order, OrderDwellStat, OrderItem, OrderStatusChange,
+)
+
+# Statuses an order waits in before it is served
+TRACKED_STATUSES = [Order.Status.PLACED, Order.Status.IN_KITCHEN]
+
+# (history, items, orders) of the hot tables and of the archive
+SOURCES = [
+    (OrderStatusChange, OrderItem, Order),
+    (ArchivedOrderStatusChange, ArchivedOrderItem, ArchivedOrder),
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted, non-empty list"""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def hour_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def dwell_samples(start, end):
+    """
+    ``[(order_id, status, seconds)]`` for every tracked status an order left
+    between ``start`` and ``end``, measured from when it entered that status.
+    Archived orders count too, so old hours can still be recomputed.
+    """
+    samples = []
+    for history, _, _ in SOURCES:
+        exits = list(
+            history.objects.filter(
+                changed_at__gte=start,
+                changed_at__lt=end,
+                from_status__in=TRACKED_STATUSES,
+            ).values_list('order_id', 'from_status', 'changed_at')
+        )
+        if not exits:
+            continue
+
+        entered = {}
+        for order_id, status, changed_at in history.objects.filter(
+            order_id__in={order_id for order_id, _, _ in exits},
+            to_status__in=TRACKED_STATUSES,
+            changed_at__lt=end,
+        ).order_by('changed_at').values_list('order_id', 'to_status', 'changed_at'):
+            entered[order_id, status] = changed_at
+
+        samples.extend(
+            (order_id, status, (left_at - entered[order_id, status]).total_seconds())
+            for order_id, status, left_at in exits
+            if (order_id, status) in entered
+        )
+    return samples
+
+
+def compute_dwell_stats(hour):
+    """
+    Rebuild the OrderDwellStat rows for the hour starting at ``hour``: p50/p90/p99
+    per status for all orders, per menu category and per waiter. Returns the
+    number of rows written.
+    """
+    hour = hour_start(hour)
+    samples = dwell_samples(hour, hour + timedelta(hours=1))
+    order_ids = {order_id for order_id, _, _ in samples}
+
+    categories = defaultdict(set)
+    waiters = {}
+    for _, items, orders in SOURCES:
+        for order_id, category in items.objects.filter(order_id__in=order_ids).values_list(
+            'order_id', 'menu_item__category'
+        ).distinct():
+            categories[order_id].add(category)
+        waiters.update(orders.objects.filter(pk__in=order_ids).values_list('pk', 'waiter_id'))
+    waiter_names = dict(
+        get_user_model().objects.filter(pk__in=set(waiters.values())).values_list('pk', 'username')
+    )
+    category_names = dict(MenuItem.Category.choices)
+
+    groups = defaultdict(list)
+    for order_id, status, seconds in samples:
+        groups[status, OrderDwellStat.Dimension.ALL, '', ''].append(seconds)
+        for category in categories[order_id]:
+            groups[status, OrderDwellStat.Dimension.CATEGORY, category, category_names.get(category, category)].append(seconds)
+        waiter_id = waiters.get(order_id)
+        if waiter_id is not None:
+            groups[status, OrderDwellStat.Dimension.WAITER, str(waiter_id), waiter_names.get(waiter_id, '')].append(seconds)
+
+    stats = []
+    for (status, dimension, key, label), values in groups.items():
+        values.sort()
+        stats.append(OrderDwellStat(
+            hour=hour,
+            status=status,
+            dimension=dimension,
+            key=key,
+            label=label,
+            samples=len(values),
+            p50_seconds=round(percentile(values, 50)),
+            p90_seconds=round(percentile(values, 90)),
+            p99_seconds=round(percentile(values, 99)),
+        ))
+
+    with transaction.atomic():
+        OrderDwellStat.objects.filter(hour=hour).delete()
+        OrderDwellStat.objects.bulk_create(stats)
+    return len(stats)
@@ -0,0 +1,37 @@
+"""
+WebSocket consumers for the kitchen display and station queues
+"""
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .models import StationTicket
+from .realtime import KITCHEN_GROUP, station_group
+
+
+class KitchenDisplayConsumer(AsyncJsonWebsocketConsumer):
+    """Streams order deltas to kitchen screens (read-only), or one station's ticket deltas"""
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
+
+        station = self.scope.get('url_route', {}).get('kwargs', {}).get('station')
+        if station is None:
+            self.group_name = KITCHEN_GROUP
+        elif station in StationTicket.Station.values:
+            self.group_name = station_group(station)
+        else:
+            await self.close()
+            return
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def kitchen_event(self, message):
+        """Forward a broadcast from orders.realtime to the screen"""
+        await self.send_json({'event': message['event'], 'data': message['data']})
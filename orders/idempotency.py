@@ -0,0 +1,73 @@
+"""
+Client idempotency keys for endpoints that must not repeat their writes
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+
+class DuplicateRequest(Exception):
+    """
+    The key was already used for this user and scope. ``result_id`` is the
+    primary key the original request created, or None while it is in flight.
+    """
+
+    def __init__(self, result_id):
+        super().__init__(f"Duplicate request (result: {result_id})")
+        self.result_id = result_id
+
+
+def request_key(request):
+    """Key sent as an ``Idempotency-Key`` header or ``idempotency_key`` form field"""
+    return (request.headers.get('Idempotency-Key') or request.POST.get('idempotency_key') or '').strip()[:64]
+
+
+def expiry_threshold():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+
+
+def claim(user, scope, key):
+    """
+    Reserve ``key`` before any other work starts.
+
+    Returns the new claim, None if the client sent no key, or raises
+    DuplicateRequest if a live claim already exists. Expired claims are
+    replaced.
+    """
+    if not key:
+        return None
+
+    claims = IdempotencyKey.objects.filter(user=user, scope=scope, key=key)
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(user=user, scope=scope, key=key)
+        except IntegrityError:
+            # Only an expired claim may be replaced; then try the insert once more
+            deleted, _ = claims.filter(created_at__lt=expiry_threshold()).delete()
+            if not deleted:
+                break
+
+    raise DuplicateRequest(claims.values_list('result_id', flat=True).first())
+
+
+def complete(claim, result_id):
+    """Record the created object; call inside the transaction that created it"""
+    if claim is not None:
+        IdempotencyKey.objects.filter(pk=claim.pk).update(result_id=result_id)
+
+
+def release(claim):
+    """Forget a claim whose request failed, so the client may retry it"""
+    if claim is not None:
+        IdempotencyKey.objects.filter(pk=claim.pk).delete()
+
+
+def purge_expired():
+    """Delete claims older than IDEMPOTENCY_KEY_TTL_SECONDS; returns the count"""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expiry_threshold()).delete()
+    return deleted
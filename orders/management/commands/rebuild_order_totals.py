@@ -0,0 +1,65 @@
+"""
+Management command to rebuild or verify the stored order totals
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Subquery
+
+from orders.models import Order, item_totals_subquery
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or with --verify, check) Order.total_amount and Order.item_count from order items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report orders whose stored values disagree with their items',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of orders updated per transaction (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self.verify()
+        else:
+            self.rebuild(options['batch_size'])
+
+    def rebuild(self, batch_size):
+        max_pk = Order.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+        updated = 0
+
+        # Walk primary key ranges so each transaction stays short
+        for start in range(0, max_pk, batch_size):
+            with transaction.atomic():
+                updated += Order.rebuild_totals(
+                    Order.objects.filter(pk__gt=start, pk__lte=start + batch_size)
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'[OK] Rebuilt totals for {updated} orders'))
+
+    def verify(self):
+        rows = Order.objects.annotate(
+            expected_total=Subquery(item_totals_subquery().values('total')),
+            expected_count=Subquery(item_totals_subquery().values('count')),
+        ).values_list('pk', 'total_amount', 'item_count', 'expected_total', 'expected_count')
+
+        mismatched = 0
+        for pk, total, count, expected_total, expected_count in rows.iterator(chunk_size=2000):
+            expected_total = expected_total or 0
+            expected_count = expected_count or 0
+            if total != expected_total or count != expected_count:
+                mismatched += 1
+                self.stdout.write(
+                    f'Order #{pk}: stored {total} / {count} items, '
+                    f'expected {expected_total:.2f} / {expected_count} items'
+                )
+
+        if mismatched:
+            raise CommandError(f'{mismatched} orders have stale totals; run rebuild_order_totals to fix them')
+        self.stdout.write(self.style.SUCCESS('[OK] All order totals are consistent'))
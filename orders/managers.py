@@ -0,0 +1,53 @@
+"""
+Managers shared by models that have an archive (cold) table
+"""
+from django.apps import apps
+from django.db import models
+from django.db.models import Count, Sum
+
+
+class HotColdManager(models.Manager):
+    """
+    Default manager for a hot table whose old rows move to an archive table.
+
+    Regular queries only touch the hot table. The ``combined*`` methods read
+    both tables, for reports that span the whole history. The archive model
+    must expose the same field names as the hot model.
+    """
+
+    def __init__(self, archive_model=None):
+        super().__init__()
+        self.archive_model_label = archive_model
+
+    @property
+    def archive(self):
+        """Default manager of the archive model"""
+        # Related managers (e.g. ``group.bills``) are built without arguments
+        label = self.archive_model_label or self.model._default_manager.archive_model_label
+        return apps.get_model(label)._default_manager
+
+    def combined(self, *fields, **filters):
+        """``values(*fields)`` of matching rows from the hot and archive tables"""
+        hot = self.filter(**filters).order_by().values(*fields)
+        cold = self.archive.filter(**filters).order_by().values(*fields)
+        return hot.union(cold, all=True)
+
+    def combined_count(self, **filters):
+        return self.filter(**filters).count() + self.archive.filter(**filters).count()
+
+    def combined_aggregate(self, filters=None, **aggregates):
+        """
+        Aggregate over both tables. Only additive aggregates (Sum, Count) can be
+        combined; derive averages from them.
+        """
+        for aggregate in aggregates.values():
+            if not isinstance(aggregate, (Sum, Count)):
+                raise ValueError(f"Cannot combine {aggregate!r} across hot and archive tables")
+
+        filters = filters or {}
+        hot = self.filter(**filters).aggregate(**aggregates)
+        cold = self.archive.filter(**filters).aggregate(**aggregates)
+        return {
+            name: None if hot[name] is None and cold[name] is None else (hot[name] or 0) + (cold[name] or 0)
+            for name in aggregates
+        }
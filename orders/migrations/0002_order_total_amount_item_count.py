@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:09
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    decimal = DecimalField(max_digits=10, decimal_places=2)
+    items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+        total=Sum(ExpressionWrapper(F('quantity') * F('price_at_order'), output_field=decimal)),
+        count=Count('pk'),
+    )
+    Order.objects.update(
+        total_amount=Coalesce(Subquery(items.values('total')), Decimal('0.00'), output_field=decimal),
+        item_count=Coalesce(Subquery(items.values('count')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of item lines, maintained as items change'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of item subtotals, maintained as items change', max_digits=10),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('PLACED', 'Placed'), ('IN_KITCHEN', 'In Kitchen'), ('SERVED', 'Served')], max_length=20)),
+                ('to_status', models.CharField(choices=[('PLACED', 'Placed'), ('IN_KITCHEN', 'In Kitchen'), ('SERVED', 'Served')], max_length=20)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Order Status Change',
+                'verbose_name_plural': 'Order Status Changes',
+                'db_table': 'order_status_history',
+                'ordering': ['changed_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderDwellStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(help_text='Start of the hour in which orders left the status')),
+                ('status', models.CharField(choices=[('PLACED', 'Placed'), ('IN_KITCHEN', 'In Kitchen'), ('SERVED', 'Served')], max_length=20)),
+                ('dimension', models.CharField(choices=[('ALL', 'All Orders'), ('CATEGORY', 'Menu Category'), ('WAITER', 'Waiter')], default='ALL', max_length=10)),
+                ('key', models.CharField(blank=True, help_text='Category value or waiter id', max_length=50)),
+                ('label', models.CharField(blank=True, max_length=150)),
+                ('samples', models.PositiveIntegerField()),
+                ('p50_seconds', models.PositiveIntegerField()),
+                ('p90_seconds', models.PositiveIntegerField()),
+                ('p99_seconds', models.PositiveIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Order Dwell Stat',
+                'verbose_name_plural': 'Order Dwell Stats',
+                'db_table': 'order_dwell_stats',
+                'ordering': ['-hour', 'status', 'dimension', 'label'],
+                'indexes': [models.Index(fields=['dimension', 'hour'], name='order_dwell_dim_hour_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='orderdwellstat',
+            constraint=models.UniqueConstraint(fields=('hour', 'status', 'dimension', 'key'), name='order_dwell_stat_unique'),
+        ),
+        migrations.AddField(
+            model_name='orderstatuschange',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='orders.order'),
+        ),
+        migrations.AddIndex(
+            model_name='orderstatuschange',
+            index=models.Index(fields=['order', 'changed_at'], name='order_status_hist_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderstatuschange',
+            index=models.Index(fields=['changed_at', 'from_status'], name='order_status_hist_time_idx'),
+        ),
+    ]
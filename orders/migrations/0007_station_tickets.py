@@ -0,0 +1,60 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_open_tickets(apps, schema_editor):
+    """One ticket per station for orders still waiting to be served"""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    StationTicket = apps.get_model('orders', 'StationTicket')
+
+    open_orders = Order.objects.filter(status__in=['PLACED', 'IN_KITCHEN'])
+    created_at = dict(open_orders.values_list('pk', 'created_at'))
+    pairs = {
+        (order_id, settings.KITCHEN_STATION_ROUTING.get(category, settings.KITCHEN_DEFAULT_STATION))
+        for order_id, category in OrderItem.objects.filter(order_id__in=created_at).values_list(
+            'order_id', 'menu_item__category'
+        ).distinct()
+    }
+    StationTicket.objects.bulk_create([
+        StationTicket(order_id=order_id, station=station, created_at=created_at[order_id])
+        for order_id, station in sorted(pairs)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+        ('orders', '0006_status_history_dwell_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('station', models.CharField(choices=[('KITCHEN', 'Kitchen'), ('BAR', 'Bar'), ('PASTRY', 'Pastry')], max_length=20)),
+                ('state', models.CharField(choices=[('QUEUED', 'Queued'), ('IN_PROGRESS', 'In Progress'), ('READY', 'Ready')], default='QUEUED', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='orders.order')),
+            ],
+            options={
+                'verbose_name': 'Station Ticket',
+                'verbose_name_plural': 'Station Tickets',
+                'db_table': 'station_tickets',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['station', 'state', 'created_at'], name='station_ticket_queue_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='stationticket',
+            constraint=models.UniqueConstraint(fields=('order', 'station'), name='station_ticket_unique'),
+        ),
+        migrations.RunPython(create_open_tickets, migrations.RunPython.noop),
+    ]
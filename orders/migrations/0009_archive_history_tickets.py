@@ -0,0 +1,48 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_table_active_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedStationTicket',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('station', models.CharField(choices=[('KITCHEN', 'Kitchen'), ('BAR', 'Bar'), ('PASTRY', 'Pastry')], max_length=20)),
+                ('state', models.CharField(choices=[('QUEUED', 'Queued'), ('IN_PROGRESS', 'In Progress'), ('READY', 'Ready')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='orders.archivedorder')),
+            ],
+            options={
+                'verbose_name': 'Archived Station Ticket',
+                'verbose_name_plural': 'Archived Station Tickets',
+                'db_table': 'station_tickets_archive',
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderStatusChange',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('from_status', models.CharField(blank=True, choices=[('PLACED', 'Placed'), ('IN_KITCHEN', 'In Kitchen'), ('SERVED', 'Served')], max_length=20)),
+                ('to_status', models.CharField(choices=[('PLACED', 'Placed'), ('IN_KITCHEN', 'In Kitchen'), ('SERVED', 'Served')], max_length=20)),
+                ('changed_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='orders.archivedorder')),
+            ],
+            options={
+                'verbose_name': 'Archived Order Status Change',
+                'verbose_name_plural': 'Archived Order Status Changes',
+                'db_table': 'order_status_history_archive',
+                'ordering': ['changed_at'],
+                'indexes': [models.Index(fields=['changed_at', 'from_status'], name='order_status_arch_time_idx')],
+            },
+        ),
+    ]
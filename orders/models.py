@@ -1,8 +1,49 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.conf import settings
+from django.utils import timezone
 from decimal import Decimal
 
+from tables import board
+
+from . import realtime
+from .managers import HotColdManager
+from .stations import categories_for_station, station_for_category
+
+
+# quantity * price_at_order, usable in annotations and aggregates over OrderItem
+ITEM_SUBTOTAL = ExpressionWrapper(
+    F('quantity') * F('price_at_order'),
+    output_field=DecimalField(max_digits=10, decimal_places=2)
+)
+
+
+class OrderQuerySet(models.QuerySet):
+    """Item totals computed in SQL from the items table"""
+    
+    def with_item_totals(self):
+        """Annotate ``items_total`` and ``items_count`` with correlated subqueries (no extra queries)"""
+        return self.annotate(
+            items_total=Coalesce(
+                Subquery(item_totals_subquery().values('total')),
+                Decimal('0.00'),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+            items_count=Coalesce(Subquery(item_totals_subquery().values('count')), 0),
+        )
+    
+    def item_totals(self):
+        """
+        ``{order_id: total}`` for the orders in this queryset, in one grouped
+        query. Orders without items are absent; treat them as 0.
+        """
+        return dict(
+            OrderItem.objects.filter(order__in=self.order_by().values('pk')).order_by().values('order')
+            .annotate(total=Sum(ITEM_SUBTOTAL)).values_list('order', 'total')
+        )
+
 
 class Order(models.Model):
     """Order model for tracking table orders"""
@@ -12,6 +53,15 @@ class Order(models.Model):
         IN_KITCHEN = 'IN_KITCHEN', 'In Kitchen'
         SERVED = 'SERVED', 'Served'
     
+    # Legal status edges, applied by transition() as conditional UPDATEs
+    TRANSITIONS = {
+        Status.PLACED: [Status.IN_KITCHEN],
+        Status.IN_KITCHEN: [Status.SERVED],
+    }
+    
+    # Statuses in which items may still be added, removed or changed
+    AMENDABLE_STATUSES = [Status.PLACED, Status.IN_KITCHEN]
+    
     table = models.ForeignKey('tables.Table', on_delete=models.CASCADE, related_name='orders')
     waiter = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='orders')
     status = models.CharField(
@@ -21,39 +71,238 @@ class Order(models.Model):
         db_index=True
     )
     notes = models.TextField(blank=True)
+    total_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Sum of item subtotals, maintained as items change"
+    )
+    item_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of item lines, maintained as items change"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = HotColdManager.from_queryset(OrderQuerySet)('orders.ArchivedOrder')
+    
     class Meta:
         db_table = 'orders'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination seeks on (created_at, id), optionally after a filter
+            models.Index(fields=['-created_at', '-id'], name='orders_created_id_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='orders_status_created_idx'),
+            models.Index(fields=['waiter', '-created_at', '-id'], name='orders_waiter_created_idx'),
+            # The table board looks up each table's latest active order
+            models.Index(fields=['table', 'status', '-created_at'], name='orders_table_active_idx'),
+        ]
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
     
     def __str__(self):
         return f"Order #{self.pk} - Table {self.table.table_number}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = dict(zip(field_names, values)).get('status')
+        return instance
+    
     def calculate_total(self):
-        """Calculate total order amount"""
-        return sum(item.subtotal for item in self.items.all())
+        """Recalculate the order amount from its items with one aggregate query"""
+        return self.items.aggregate(
+            total=Coalesce(Sum(ITEM_SUBTOTAL), Decimal('0.00'), output_field=DecimalField(max_digits=10, decimal_places=2))
+        )['total']
+    
+    @classmethod
+    def apply_item_delta(cls, order_id, amount, count=0):
+        """Shift the stored total and item count of an order in one UPDATE"""
+        cls.objects.filter(pk=order_id).update(
+            total_amount=F('total_amount') + amount,
+            item_count=F('item_count') + count,
+        )
+        board.invalidate()
+    
+    @classmethod
+    def rebuild_totals(cls, queryset=None):
+        """Recompute stored totals from the items table for a queryset of orders"""
+        if queryset is None:
+            queryset = cls.objects.all()
+        board.invalidate()
+        return queryset.update(
+            total_amount=Coalesce(
+                Subquery(item_totals_subquery().values('total')),
+                Decimal('0.00'),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+            item_count=Coalesce(Subquery(item_totals_subquery().values('count')), 0),
+        )
+    
+    @classmethod
+    def transition(cls, pk, status):
+        """
+        Move an order to ``status`` with a single conditional UPDATE.
+        
+        The row only changes if it currently sits in a status with a legal
+        edge to ``status``, so concurrent terminals cannot overwrite each
+        other. Returns True if this call won the transition.
+        """
+        sources = [source for source, targets in cls.TRANSITIONS.items() if status in targets]
+        if not sources:
+            return False
+        
+        now = timezone.now()
+        previous = sources[0] if len(sources) == 1 else ''
+        with transaction.atomic():
+            won = cls.objects.filter(pk=pk, status__in=sources).update(status=status, updated_at=now) == 1
+            if won:
+                OrderStatusChange.objects.create(order_id=pk, from_status=previous, to_status=status, changed_at=now)
+        
+        if won:
+            realtime.order_status_changed(pk, status, previous or None)
+            board.invalidate()
+        return won
+    
+    @property
+    def is_amendable(self):
+        """Whether items can still change (see orders.services.amend_order)"""
+        return self.status in self.AMENDABLE_STATUSES
+    
+    @property
+    def next_statuses(self):
+        """Statuses this order can legally move to next"""
+        return self.TRANSITIONS.get(self.status, [])
+    
+    def _transition(self, status):
+        won = self.transition(self.pk, status)
+        if won:
+            self.status = self._loaded_status = status
+        return won
     
     def move_to_kitchen(self):
         """Move order to kitchen"""
-        self.status = self.Status.IN_KITCHEN
-        self.save()
+        return self._transition(self.Status.IN_KITCHEN)
     
     def mark_served(self):
         """Mark order as served"""
-        self.status = self.Status.SERVED
-        self.save()
+        return self._transition(self.Status.SERVED)
     
     def save(self, *args, **kwargs):
         """Override save to update table status"""
         is_new = self.pk is None
-        super().save(*args, **kwargs)
+        if not is_new and kwargs.get('update_fields') is None:
+            # Totals are maintained by OrderItem with relative updates, so a full
+            # save from a possibly stale instance must not overwrite them
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('total_amount', 'item_count')
+            ]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            previous_status = getattr(self, '_loaded_status', None)
+            if is_new or (previous_status and previous_status != self.status):
+                OrderStatusChange.objects.create(
+                    order_id=self.pk,
+                    from_status=previous_status or '',
+                    to_status=self.status,
+                    changed_at=self.updated_at,
+                )
         
-        if is_new and self.table.status == 'AVAILABLE':
+        if previous_status and previous_status != self.status:
+            realtime.order_status_changed(self.pk, self.status, previous_status)
+        if is_new or previous_status != self.status:
+            board.invalidate()
+        self._loaded_status = self.status
+        
+        if is_new:
+            # Conditional UPDATE: only an AVAILABLE or RESERVED table becomes occupied
+            from tables import reservations
             self.table.mark_as_occupied()
+            reservations.seat(self.table_id)
+
+
+class OrderStatusChange(models.Model):
+    """Append-only record of an order entering a status"""
+    
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_changes')
+    from_status = models.CharField(max_length=20, choices=Order.Status.choices, blank=True)
+    to_status = models.CharField(max_length=20, choices=Order.Status.choices)
+    changed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'order_status_history'
+        ordering = ['changed_at']
+        indexes = [
+            models.Index(fields=['order', 'changed_at'], name='order_status_hist_order_idx'),
+            models.Index(fields=['changed_at', 'from_status'], name='order_status_hist_time_idx'),
+        ]
+        verbose_name = 'Order Status Change'
+        verbose_name_plural = 'Order Status Changes'
+    
+    def __str__(self):
+        return f"Order #{self.order_id}: {self.from_status or '-'} → {self.to_status}"
+    
+    def save(self, *args, **kwargs):
+        """History rows are never rewritten"""
+        if not self._state.adding:
+            raise ValueError("Order status history is append-only")
+        super().save(*args, **kwargs)
+
+
+class OrderDwellStat(models.Model):
+    """Precomputed dwell-time percentiles for one hour, status and breakdown"""
+    
+    class Dimension(models.TextChoices):
+        ALL = 'ALL', 'All Orders'
+        CATEGORY = 'CATEGORY', 'Menu Category'
+        WAITER = 'WAITER', 'Waiter'
+    
+    hour = models.DateTimeField(help_text="Start of the hour in which orders left the status")
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    dimension = models.CharField(max_length=10, choices=Dimension.choices, default=Dimension.ALL)
+    key = models.CharField(max_length=50, blank=True, help_text="Category value or waiter id")
+    label = models.CharField(max_length=150, blank=True)
+    samples = models.PositiveIntegerField()
+    p50_seconds = models.PositiveIntegerField()
+    p90_seconds = models.PositiveIntegerField()
+    p99_seconds = models.PositiveIntegerField()
+    
+    class Meta:
+        db_table = 'order_dwell_stats'
+        ordering = ['-hour', 'status', 'dimension', 'label']
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'status', 'dimension', 'key'], name='order_dwell_stat_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'hour'], name='order_dwell_dim_hour_idx'),
+        ]
+        verbose_name = 'Order Dwell Stat'
+        verbose_name_plural = 'Order Dwell Stats'
+    
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} {self.status} {self.dimension} {self.label}"
+    
+    @property
+    def p50_minutes(self):
+        return self.p50_seconds / 60
+    
+    @property
+    def p90_minutes(self):
+        return self.p90_seconds / 60
+    
+    @property
+    def p99_minutes(self):
+        return self.p99_seconds / 60
+
+
+def item_totals_subquery():
+    """Per-order item total and line count, correlated on the outer order's pk"""
+    return OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+        total=Sum(ITEM_SUBTOTAL),
+        count=Count('pk'),
+    )
 
 
 class OrderItem(models.Model):
@@ -81,13 +330,291 @@ class OrderItem(models.Model):
         """Calculate subtotal for this item"""
         return self.quantity * self.price_at_order
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the stored order total currently includes for this row
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def _loaded_contribution(self):
+        """(order_id, subtotal) this row contributed when it was loaded, or None"""
+        loaded = getattr(self, '_loaded_values', {})
+        if not {'order_id', 'quantity', 'price_at_order'} <= loaded.keys():
+            return None
+        return loaded['order_id'], loaded['quantity'] * loaded['price_at_order']
+    
     def update_quantity(self, quantity):
-        """Update item quantity"""
-        self.quantity = quantity
-        self.save()
+        """Update item quantity, moving the order total by the difference only"""
+        with transaction.atomic():
+            current = OrderItem.objects.select_for_update().values_list('quantity', flat=True).get(pk=self.pk)
+            OrderItem.objects.filter(pk=self.pk).update(quantity=quantity)
+            Order.apply_item_delta(self.order_id, (quantity - current) * self.price_at_order)
+            self.quantity = quantity
+            realtime.item_changed(self)
+        self._loaded_values = {
+            'order_id': self.order_id,
+            'quantity': self.quantity,
+            'price_at_order': self.price_at_order,
+        }
     
     def save(self, *args, **kwargs):
-        """Override save to capture price snapshot"""
+        """Override save to capture price snapshot and keep the order total current"""
         if not self.price_at_order:
             self.price_at_order = self.menu_item.price
-        super().save(*args, **kwargs)
+        
+        is_new = self._state.adding
+        previous = None if is_new else self._loaded_contribution()
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            if is_new:
+                Order.apply_item_delta(self.order_id, self.subtotal, 1)
+            elif previous is None:
+                Order.rebuild_totals(Order.objects.filter(pk=self.order_id))
+            elif previous[0] != self.order_id:
+                Order.apply_item_delta(previous[0], -previous[1], -1)
+                Order.apply_item_delta(self.order_id, self.subtotal, 1)
+            elif previous[1] != self.subtotal:
+                Order.apply_item_delta(self.order_id, self.subtotal - previous[1])
+            if is_new:
+                StationTicket.ensure_open(self.order_id, station_for_category(self.menu_item.category))
+            realtime.item_changed(self)
+        
+        self._loaded_values = {
+            'order_id': self.order_id,
+            'quantity': self.quantity,
+            'price_at_order': self.price_at_order,
+        }
+    
+    def delete(self, *args, **kwargs):
+        """Override delete to keep the order total current"""
+        previous = self._loaded_contribution() or (self.order_id, self.subtotal)
+        with transaction.atomic():
+            realtime.item_changed(self, quantity=0)
+            result = super().delete(*args, **kwargs)
+            Order.apply_item_delta(previous[0], -previous[1], -1)
+        return result
+
+
+class StationTicket(models.Model):
+    """The part of an order prepared at one kitchen station"""
+    
+    class Station(models.TextChoices):
+        KITCHEN = 'KITCHEN', 'Kitchen'
+        BAR = 'BAR', 'Bar'
+        PASTRY = 'PASTRY', 'Pastry'
+    
+    class State(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        IN_PROGRESS = 'IN_PROGRESS', 'In Progress'
+        READY = 'READY', 'Ready'
+    
+    OPEN_STATES = [State.QUEUED, State.IN_PROGRESS]
+    
+    # Legal state edges, enforced by transition()
+    TRANSITIONS = {
+        State.QUEUED: [State.IN_PROGRESS, State.READY],
+        State.IN_PROGRESS: [State.READY],
+    }
+    
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='tickets')
+    station = models.CharField(max_length=20, choices=Station.choices)
+    state = models.CharField(max_length=20, choices=State.choices, default=State.QUEUED)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'station_tickets'
+        ordering = ['created_at', 'id']
+        verbose_name = 'Station Ticket'
+        verbose_name_plural = 'Station Tickets'
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'station'], name='station_ticket_unique'),
+        ]
+        indexes = [
+            # Per-station queue: WHERE station = ? AND state IN (...) ORDER BY created_at
+            models.Index(fields=['station', 'state', 'created_at'], name='station_ticket_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Order #{self.order_id} - {self.get_station_display()} ({self.get_state_display()})"
+    
+    @classmethod
+    def queue(cls, station):
+        """
+        Open tickets for ``station``, oldest first, with only the order lines
+        routed to that station prefetched as ``ticket.order.station_items``.
+        """
+        station_items = OrderItem.objects.filter(
+            menu_item__category__in=categories_for_station(station)
+        ).select_related('menu_item')
+        return cls.objects.filter(station=station, state__in=cls.OPEN_STATES).select_related(
+            'order__table'
+        ).prefetch_related(
+            models.Prefetch('order__items', queryset=station_items, to_attr='station_items')
+        ).order_by('created_at', 'id')
+    
+    @classmethod
+    def transition(cls, pk, state):
+        """Compare-and-swap the ticket to ``state``; returns True if this call won"""
+        sources = [source for source, targets in cls.TRANSITIONS.items() if state in targets]
+        if not sources:
+            return False
+        
+        won = cls.objects.filter(pk=pk, state__in=sources).update(state=state, updated_at=timezone.now()) == 1
+        if won:
+            order_id, station = cls.objects.filter(pk=pk).values_list('order_id', 'station').get()
+            realtime.ticket_state_changed(pk, order_id, station, state)
+        return won
+    
+    @classmethod
+    def discard_open(cls, order_id, stations):
+        """Delete the order's open tickets at ``stations``, which have no lines left to make"""
+        tickets = list(cls.objects.filter(
+            order_id=order_id, station__in=stations, state__in=cls.OPEN_STATES
+        ).values_list('pk', 'station'))
+        if tickets:
+            cls.objects.filter(pk__in=[pk for pk, _ in tickets]).delete()
+            for pk, station in tickets:
+                realtime.ticket_removed(pk, order_id, station)
+        return len(tickets)
+    
+    @classmethod
+    def ensure_open(cls, order_id, station):
+        """Make sure the order has an open ticket at ``station`` (for lines added later)"""
+        ticket, created = cls.objects.get_or_create(order_id=order_id, station=station)
+        if not created and ticket.state == cls.State.READY:
+            if cls.objects.filter(pk=ticket.pk, state=cls.State.READY).update(
+                state=cls.State.QUEUED, updated_at=timezone.now()
+            ):
+                realtime.ticket_state_changed(ticket.pk, order_id, station, cls.State.QUEUED)
+        return ticket
+    
+    @property
+    def next_states(self):
+        """States this ticket can legally move to next"""
+        return self.TRANSITIONS.get(self.state, [])
+
+
+class ArchivedOrder(models.Model):
+    """Paid order moved out of the hot ``orders`` table (keeps its original id)"""
+    
+    id = models.BigIntegerField(primary_key=True)
+    table = models.ForeignKey('tables.Table', on_delete=models.CASCADE, related_name='archived_orders')
+    waiter = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='archived_orders'
+    )
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    notes = models.TextField(blank=True)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    item_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField(db_index=True)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'orders_archive'
+        ordering = ['-created_at']
+        verbose_name = 'Archived Order'
+        verbose_name_plural = 'Archived Orders'
+    
+    def __str__(self):
+        return f"Archived Order #{self.pk}"
+
+
+class ArchivedOrderItem(models.Model):
+    """Item of an archived order (keeps its original id)"""
+    
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    menu_item = models.ForeignKey('menu.MenuItem', on_delete=models.PROTECT, related_name='archived_order_items')
+    quantity = models.PositiveIntegerField()
+    price_at_order = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    class Meta:
+        db_table = 'order_items_archive'
+        verbose_name = 'Archived Order Item'
+        verbose_name_plural = 'Archived Order Items'
+    
+    def __str__(self):
+        return f"{self.quantity}x {self.menu_item.name}"
+    
+    @property
+    def subtotal(self):
+        return self.quantity * self.price_at_order
+
+
+class ArchivedOrderStatusChange(models.Model):
+    """Status history row of an archived order (keeps its original id)"""
+    
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='status_changes')
+    from_status = models.CharField(max_length=20, choices=Order.Status.choices, blank=True)
+    to_status = models.CharField(max_length=20, choices=Order.Status.choices)
+    changed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'order_status_history_archive'
+        ordering = ['changed_at']
+        indexes = [
+            models.Index(fields=['changed_at', 'from_status'], name='order_status_arch_time_idx'),
+        ]
+        verbose_name = 'Archived Order Status Change'
+        verbose_name_plural = 'Archived Order Status Changes'
+    
+    def __str__(self):
+        return f"Archived Order #{self.order_id}: {self.from_status or '-'} → {self.to_status}"
+
+
+class ArchivedStationTicket(models.Model):
+    """Station ticket of an archived order (keeps its original id)"""
+    
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='tickets')
+    station = models.CharField(max_length=20, choices=StationTicket.Station.choices)
+    state = models.CharField(max_length=20, choices=StationTicket.State.choices)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'station_tickets_archive'
+        ordering = ['created_at', 'id']
+        verbose_name = 'Archived Station Ticket'
+        verbose_name_plural = 'Archived Station Tickets'
+    
+    def __str__(self):
+        return f"Archived Order #{self.order_id} - {self.get_station_display()}"
+
+
+class IdempotencyKey(models.Model):
+    """Recently used client idempotency key and the object its request created"""
+    
+    class Scope(models.TextChoices):
+        ORDER_CREATE = 'ORDER_CREATE', 'Order Create'
+        BILL_GENERATE = 'BILL_GENERATE', 'Bill Generate'
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_keys')
+    scope = models.CharField(max_length=20, choices=Scope.choices)
+    key = models.CharField(max_length=64)
+    result_id = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Primary key of the created object; empty while the request is in flight"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='idempotency_key_unique'),
+        ]
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+    
+    def __str__(self):
+        return f"{self.scope} {self.key}"
@@ -0,0 +1,115 @@
+"""
+Keyset (cursor) pagination for list views ordered newest first
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import Http404
+
+
+def encode_cursor(direction, timestamp, pk):
+    """Opaque token for the page after ('n') or before ('p') the given row key"""
+    raw = f"{direction}|{timestamp.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor(); raises ValueError for malformed tokens"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        direction, timestamp, pk = raw.split('|')
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {token!r}")
+    if direction not in ('n', 'p'):
+        raise ValueError(f"Invalid cursor: {token!r}")
+    return direction, datetime.fromisoformat(timestamp), int(pk)
+
+
+class CursorPage:
+    """One keyset page; stands in for a Paginator page in templates"""
+
+    def __init__(self, object_list, next_query=None, previous_query=None):
+        self.object_list = object_list
+        self.next_query = next_query
+        self.previous_query = previous_query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_query is not None
+
+    def has_previous(self):
+        return self.previous_query is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginationMixin:
+    """
+    Opt-in keyset pagination for ListViews, keyed on ``(cursor_field, id)``.
+
+    Requests with ``?paging=cursor`` (or a ``cursor`` token) page with a
+    ``WHERE (cursor_field, id) < (?, ?)`` seek instead of OFFSET and never
+    run the COUNT(*) behind the regular paginator. Other query parameters
+    (filters) are carried over into the next/previous links.
+    """
+    cursor_field = None
+
+    def use_cursor_paging(self):
+        return self.request.GET.get('paging') == 'cursor' or 'cursor' in self.request.GET
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cursor_paging'] = self.use_cursor_paging()
+        return context
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_paging():
+            return super().paginate_queryset(queryset, page_size)
+
+        field = self.cursor_field
+        token = self.request.GET.get('cursor')
+        direction = None
+        if token:
+            try:
+                direction, timestamp, pk = decode_cursor(token)
+            except ValueError:
+                raise Http404("Invalid cursor")
+
+        if direction == 'p':
+            # Walk forward in time from the key, then flip back to newest first
+            rows = list(
+                queryset.filter(Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'pk__gt': pk}))
+                .order_by(field, 'pk')[:page_size + 1]
+            )
+            has_more_newer, has_more_older = len(rows) > page_size, True
+            rows = rows[:page_size][::-1]
+        else:
+            if direction == 'n':
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'pk__lt': pk})
+                )
+            rows = list(queryset.order_by(f'-{field}', '-pk')[:page_size + 1])
+            has_more_newer, has_more_older = direction == 'n', len(rows) > page_size
+            rows = rows[:page_size]
+
+        page = CursorPage(
+            rows,
+            next_query=self._cursor_query('n', rows[-1]) if rows and has_more_older else None,
+            previous_query=self._cursor_query('p', rows[0]) if rows and has_more_newer else None,
+        )
+        return (None, page, rows, page.has_other_pages())
+
+    def _cursor_query(self, direction, row):
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        params['paging'] = 'cursor'
+        params['cursor'] = encode_cursor(direction, getattr(row, self.cursor_field), row.pk)
+        return params.urlencode()
@@ -0,0 +1,117 @@
+"""
+Kitchen display and station queue broadcasts over the Channels layer
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .stations import station_for_category
+
+logger = logging.getLogger(__name__)
+
+KITCHEN_GROUP = 'kitchen'
+
+
+def _send(group, message):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(group, message)
+    except Exception:
+        # Displays resync on reconnect, so a lost delta must never break a write
+        logger.exception("Could not broadcast %s to %s", message.get('event'), group)
+
+
+def broadcast_kitchen_event(event, data):
+    """Push a small JSON delta to every kitchen display once the transaction commits"""
+    message = {'type': 'kitchen.event', 'event': event, 'data': data}
+    transaction.on_commit(lambda: _send(KITCHEN_GROUP, message))
+
+
+def station_group(station):
+    """Channels group of the queue screens for one kitchen station"""
+    return f'station_{station.lower()}'
+
+
+def broadcast_station_event(station, event, data):
+    """Push a JSON delta to the screens of one station once the transaction commits"""
+    message = {'type': 'kitchen.event', 'event': event, 'data': data}
+    transaction.on_commit(lambda: _send(station_group(station), message))
+
+
+def order_created(order, items):
+    """Broadcast a new order with its items"""
+    broadcast_kitchen_event('order.created', {
+        'order_id': order.pk,
+        'table': order.table.table_number,
+        'waiter': order.waiter.username if order.waiter else None,
+        'status': order.status,
+        'notes': order.notes,
+        'created_at': order.created_at.isoformat(),
+        'items': [item_payload(item) for item in items],
+    })
+
+
+def tickets_created(order, tickets, items):
+    """Broadcast each new station ticket with only the lines routed to its station"""
+    for ticket in tickets:
+        broadcast_station_event(ticket.station, 'ticket.created', {
+            'order_id': order.pk,
+            'ticket_id': ticket.pk,
+            'table': order.table.table_number,
+            'status': ticket.state,
+            'notes': order.notes,
+            'created_at': ticket.created_at.isoformat(),
+            'items': [
+                item_payload(item) for item in items
+                if station_for_category(item.menu_item.category) == ticket.station
+            ],
+        })
+
+
+def item_changed(item, quantity=None):
+    """Broadcast a changed order line; a quantity of 0 means the line was removed"""
+    data = item_payload(item)
+    if quantity is not None:
+        data['quantity'] = quantity
+    broadcast_kitchen_event('item.changed', data)
+    broadcast_station_event(station_for_category(item.menu_item.category), 'item.changed', data)
+
+
+def ticket_state_changed(ticket_id, order_id, station, state):
+    """Broadcast a StationTicket.State transition to its station"""
+    broadcast_station_event(station, 'ticket.state', {
+        'order_id': order_id,
+        'ticket_id': ticket_id,
+        'status': state,
+    })
+
+
+def ticket_removed(ticket_id, order_id, station):
+    """Broadcast that a ticket left its station's queue with nothing left to make"""
+    broadcast_station_event(station, 'ticket.removed', {
+        'order_id': order_id,
+        'ticket_id': ticket_id,
+    })
+
+
+def order_status_changed(order_id, status, previous):
+    """Broadcast an Order.Status transition"""
+    broadcast_kitchen_event('order.status', {
+        'order_id': order_id,
+        'status': status,
+        'previous': previous,
+    })
+
+
+def item_payload(item):
+    return {
+        'order_id': item.order_id,
+        'item_id': item.pk,
+        'menu_item_id': item.menu_item_id,
+        'name': item.menu_item.name,
+        'quantity': item.quantity,
+    }
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/kitchen/', consumers.KitchenDisplayConsumer.as_asgi()),
+    path('ws/kitchen/<str:station>/', consumers.KitchenDisplayConsumer.as_asgi()),
+]
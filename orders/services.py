@@ -0,0 +1,188 @@
+"""
+Order services shared by the order views and any API endpoints
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from billing.models import Bill
+from menu.models import MenuItem
+from . import realtime
+from .models import Order, OrderItem, StationTicket
+from .stations import station_for_category
+
+
+def parse_order_lines(data, prefix='item_', keep_zero=False):
+    """
+    Collect ``{id: quantity}`` from ``item_<id>`` style form keys.
+    Zero quantities are skipped unless ``keep_zero``; repeated keys are summed.
+    """
+    lines = {}
+    for key, value in data.items():
+        if not key.startswith(prefix):
+            continue
+        try:
+            line_id = int(key[len(prefix):])
+            quantity = int(value or 0)
+        except (TypeError, ValueError):
+            raise ValidationError(f"Invalid quantity for {key}")
+        if quantity < 0:
+            raise ValidationError(f"Invalid quantity for {key}")
+        if quantity or keep_zero:
+            lines[line_id] = lines.get(line_id, 0) + quantity
+    return lines
+
+
+def resolve_menu_items(menu_item_ids):
+    """Fetch the given menu items in one query and check they can be ordered"""
+    menu_items = MenuItem.objects.only('id', 'name', 'category', 'price', 'is_available').in_bulk(menu_item_ids)
+
+    missing = [str(pk) for pk in menu_item_ids if pk not in menu_items]
+    if missing:
+        raise ValidationError(f"Unknown menu item(s): {', '.join(missing)}")
+
+    unavailable = [item.name for item in menu_items.values() if not item.is_available]
+    if unavailable:
+        raise ValidationError(f"Currently unavailable: {', '.join(sorted(unavailable))}")
+
+    return menu_items
+
+
+def place_order(*, table, waiter, lines, notes=''):
+    """
+    Create an order with all of its items.
+
+    ``lines`` maps menu item ids to quantities. Menu items are resolved and
+    validated in a single query before the transaction opens, so the write
+    transaction only holds the order insert and one bulk insert each of its
+    items and station tickets, no matter how many lines the order has.
+    Raises ``ValidationError`` if a line is invalid; nothing is written in
+    that case.
+    """
+    if not lines:
+        raise ValidationError("Add at least one menu item to the order.")
+    if any(quantity < 1 for quantity in lines.values()):
+        raise ValidationError("Quantities must be at least 1.")
+
+    menu_items = resolve_menu_items(list(lines))
+    total_amount = sum(menu_items[pk].price * quantity for pk, quantity in lines.items())
+
+    with transaction.atomic():
+        # bulk_create bypasses OrderItem.save, so the stored totals go in with the order row
+        order = Order.objects.create(
+            table=table,
+            waiter=waiter,
+            notes=notes,
+            total_amount=total_amount,
+            item_count=len(lines),
+        )
+        items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                menu_item=menu_items[menu_item_id],
+                quantity=quantity,
+                price_at_order=menu_items[menu_item_id].price,
+            )
+            for menu_item_id, quantity in lines.items()
+        ])
+        # One ticket per station the lines are routed to (KITCHEN_STATION_ROUTING)
+        stations = sorted({station_for_category(item.menu_item.category) for item in items})
+        tickets = StationTicket.objects.bulk_create([
+            StationTicket(order=order, station=station, created_at=order.created_at)
+            for station in stations
+        ])
+        realtime.order_created(order, items)
+        realtime.tickets_created(order, tickets, items)
+
+    return order
+
+
+def amend_order(*, order_id, add=None, quantities=None):
+    """
+    Apply a batch of line changes to an open order in one transaction.
+
+    ``add`` maps menu item ids to quantities to add (merged into an existing
+    line for the same menu item); ``quantities`` maps the order's item ids to
+    their new quantity, where 0 removes the line. Changed lines are written
+    with one bulk update, one bulk insert and one delete, and the stored
+    total moves by the summed deltas instead of being re-summed. Only
+    PLACED and IN_KITCHEN orders without a bill can be amended; anything
+    else raises ``ValidationError`` and nothing is written.
+    """
+    add = add or {}
+    quantities = quantities or {}
+    if not add and not quantities:
+        raise ValidationError("No changes to apply.")
+
+    menu_items = resolve_menu_items(list(add)) if add else {}
+
+    with transaction.atomic():
+        # The row lock keeps a status transition from slipping in mid-amendment
+        order = Order.objects.select_for_update().filter(pk=order_id).first()
+        if order is None:
+            raise ValidationError("Order not found.")
+        if order.status not in Order.AMENDABLE_STATUSES or Bill.objects.filter(order_id=order_id).exists():
+            raise ValidationError("This order can no longer be changed.")
+
+        lines = {item.pk: item for item in order.items.select_related('menu_item')}
+        unknown = [str(pk) for pk in quantities if pk not in lines]
+        if unknown:
+            raise ValidationError(f"Item(s) not on this order: {', '.join(unknown)}")
+
+        by_menu_item = {item.menu_item_id: item for item in lines.values()}
+        new_quantities = {pk: quantity for pk, quantity in quantities.items() if quantity != lines[pk].quantity}
+        created = []
+        for menu_item_id, quantity in add.items():
+            existing = by_menu_item.get(menu_item_id)
+            if existing is not None:
+                new_quantities[existing.pk] = new_quantities.get(existing.pk, existing.quantity) + quantity
+            else:
+                menu_item = menu_items[menu_item_id]
+                created.append(OrderItem(
+                    order=order,
+                    menu_item=menu_item,
+                    quantity=quantity,
+                    price_at_order=menu_item.price,
+                ))
+
+        removed, updated, grown = [], [], []
+        amount = sum(item.subtotal for item in created)
+        for pk, quantity in new_quantities.items():
+            item = lines[pk]
+            amount += (quantity - item.quantity) * item.price_at_order
+            if quantity == 0:
+                removed.append(item)
+            else:
+                if quantity > item.quantity:
+                    grown.append(item)
+                item.quantity = quantity
+                updated.append(item)
+
+        if updated:
+            OrderItem.objects.bulk_update(updated, ['quantity'])
+        if removed:
+            OrderItem.objects.filter(pk__in=[item.pk for item in removed]).delete()
+        if created:
+            created = OrderItem.objects.bulk_create(created)
+        if created or removed or updated:
+            Order.apply_item_delta(order_id, amount, len(created) - len(removed))
+
+        # New or larger lines reopen (or open) the ticket of the station that makes them
+        for station in sorted({station_for_category(item.menu_item.category) for item in created + grown}):
+            StationTicket.ensure_open(order_id, station)
+        # A station whose last line was removed has nothing left to make
+        if removed:
+            removed_ids = {item.pk for item in removed}
+            kept = [item for pk, item in lines.items() if pk not in removed_ids] + created
+            emptied = {station_for_category(item.menu_item.category) for item in removed} - {
+                station_for_category(item.menu_item.category) for item in kept
+            }
+            if emptied:
+                StationTicket.discard_open(order_id, emptied)
+
+        for item in removed:
+            realtime.item_changed(item, quantity=0)
+        for item in updated + created:
+            realtime.item_changed(item)
+
+    order.refresh_from_db(fields=['total_amount', 'item_count'])
+    return order
@@ -0,0 +1,16 @@
+"""
+Routing of menu categories to the kitchen stations that prepare them
+"""
+from django.conf import settings
+
+from menu.models import MenuItem
+
+
+def station_for_category(category):
+    """Station that prepares items of ``category`` (KITCHEN_STATION_ROUTING)"""
+    return settings.KITCHEN_STATION_ROUTING.get(category, settings.KITCHEN_DEFAULT_STATION)
+
+
+def categories_for_station(station):
+    """Menu categories whose items are routed to ``station``"""
+    return [category for category in MenuItem.Category.values if station_for_category(category) == station]
@@ -1,3 +1,505 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import User
+from billing.models import Bill
+from menu.models import MenuItem
+from tables.models import Table
+from .consumers import KitchenDisplayConsumer
+from .analytics import compute_dwell_stats, percentile
+from .models import IdempotencyKey, Order, OrderDwellStat, OrderItem, OrderStatusChange, StationTicket
+from .routing import websocket_urlpatterns
+from .services import amend_order, parse_order_lines, place_order
+
+
+class PlaceOrderTests(TestCase):
+    """Tests for the batched order ingest service"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        cls.menu_items = MenuItem.objects.bulk_create([
+            MenuItem(name=f'Dish {i}', category=MenuItem.Category.MAIN, price=Decimal('10.00') + i)
+            for i in range(12)
+        ])
+
+    def _place(self, table_number, menu_items):
+        table = Table.objects.create(table_number=table_number, seating_capacity=4)
+        lines = {item.pk: 2 for item in menu_items}
+        with CaptureQueriesContext(connection) as ctx:
+            order = place_order(table=table, waiter=self.waiter, lines=lines)
+        return order, len(ctx.captured_queries)
+
+    def test_query_count_is_independent_of_line_count(self):
+        _, one_line = self._place('T1', self.menu_items[:1])
+        _, twelve_lines = self._place('T2', self.menu_items)
+        self.assertEqual(one_line, twelve_lines)
+
+    def test_items_snapshot_prices(self):
+        order, _ = self._place('T1', self.menu_items[:3])
+        items = OrderItem.objects.filter(order=order).order_by('menu_item_id')
+        self.assertEqual(
+            [(item.menu_item_id, item.quantity, item.price_at_order) for item in items],
+            [(item.pk, 2, item.price) for item in self.menu_items[:3]],
+        )
+        order.table.refresh_from_db()
+        self.assertEqual(order.table.status, Table.Status.OCCUPIED)
+
+    def test_unavailable_item_writes_nothing(self):
+        MenuItem.objects.filter(pk=self.menu_items[0].pk).update(is_available=False)
+        table = Table.objects.create(table_number='T1', seating_capacity=4)
+        with self.assertRaises(ValidationError):
+            place_order(table=table, waiter=self.waiter, lines={self.menu_items[0].pk: 1})
+        self.assertFalse(Order.objects.exists())
+
+    def test_parse_order_lines(self):
+        data = {'item_3': '2', 'item_4': '0', 'item_5': '', 'notes': 'x'}
+        self.assertEqual(parse_order_lines(data), {3: 2})
+        with self.assertRaises(ValidationError):
+            parse_order_lines({'item_x': '1'})
+
+
+class StoredTotalsTests(TestCase):
+    """Tests for the denormalized Order.total_amount and Order.item_count"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        cls.table = Table.objects.create(table_number='T1', seating_capacity=4)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('4.50'))
+        cls.steak = MenuItem.objects.create(name='Steak', category=MenuItem.Category.MAIN, price=Decimal('20.00'))
+
+    def test_totals_follow_item_changes(self):
+        order = place_order(table=self.table, waiter=self.waiter, lines={self.soup.pk: 2})
+        self.assertEqual((order.total_amount, order.item_count), (Decimal('9.00'), 1))
+
+        steak_line = OrderItem.objects.create(order=order, menu_item=self.steak, quantity=1)
+        soup_line = OrderItem.objects.get(order=order, menu_item=self.soup)
+        soup_line.update_quantity(3)
+        order.refresh_from_db()
+        self.assertEqual((order.total_amount, order.item_count), (Decimal('33.50'), 2))
+
+        steak_line.delete()
+        order.refresh_from_db()
+        self.assertEqual((order.total_amount, order.item_count), (Decimal('13.50'), 1))
+
+    def test_item_totals_are_computed_in_sql(self):
+        first = place_order(table=self.table, waiter=self.waiter, lines={self.soup.pk: 2, self.steak.pk: 1})
+        second = place_order(table=self.table, waiter=self.waiter, lines={self.steak.pk: 2})
+        with self.assertNumQueries(1):
+            self.assertEqual(first.calculate_total(), Decimal('29.00'))
+        with self.assertNumQueries(1):
+            totals = Order.objects.filter(pk__in=[first.pk, second.pk]).item_totals()
+        self.assertEqual(totals, {first.pk: Decimal('29.00'), second.pk: Decimal('40.00')})
+        with self.assertNumQueries(1):
+            annotated = {order.pk: (order.items_total, order.items_count) for order in Order.objects.with_item_totals()}
+        self.assertEqual(annotated[second.pk], (Decimal('40.00'), 1))
+
+    def test_full_order_save_keeps_totals(self):
+        order = place_order(table=self.table, waiter=self.waiter, lines={self.soup.pk: 2})
+        OrderItem.objects.create(order=order, menu_item=self.steak, quantity=1)
+        order.notes = 'No onions'
+        order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('29.00'))
+
+    def test_rebuild_command(self):
+        order = place_order(table=self.table, waiter=self.waiter, lines={self.soup.pk: 2})
+        Order.objects.filter(pk=order.pk).update(total_amount=0, item_count=0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_order_totals', '--verify', stdout=StringIO())
+
+        call_command('rebuild_order_totals', stdout=StringIO())
+        order.refresh_from_db()
+        self.assertEqual((order.total_amount, order.item_count), (Decimal('9.00'), 1))
+        call_command('rebuild_order_totals', '--verify', stdout=StringIO())
+
+
+class KitchenDisplayConsumerTests(TestCase):
+    """Tests for the kitchen display WebSocket stream (in-memory channel layer)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        cls.table = Table.objects.create(table_number='T1', seating_capacity=4)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('4.50'))
+
+    def test_anonymous_connection_is_rejected(self):
+        async def scenario():
+            communicator = WebsocketCommunicator(KitchenDisplayConsumer.as_asgi(), '/ws/kitchen/')
+            communicator.scope['user'] = AnonymousUser()
+            connected, _ = await communicator.connect()
+            return connected
+
+        self.assertFalse(async_to_sync(scenario)())
+
+    def test_new_order_and_status_change_are_pushed(self):
+        async def scenario():
+            communicator = WebsocketCommunicator(KitchenDisplayConsumer.as_asgi(), '/ws/kitchen/')
+            communicator.scope['user'] = self.waiter
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+
+            await sync_to_async(self._place_and_cook)()
+            created = await communicator.receive_json_from()
+            status = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return created, status
+
+        created, status = async_to_sync(scenario)()
+        self.assertEqual(created['event'], 'order.created')
+        self.assertEqual(created['data']['items'][0]['name'], 'Soup')
+        self.assertEqual(status['event'], 'order.status')
+        self.assertEqual(status['data']['status'], Order.Status.IN_KITCHEN)
+
+    def _place_and_cook(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = place_order(table=self.table, waiter=self.waiter, lines={self.soup.pk: 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.get(pk=order.pk).move_to_kitchen()
+
+
+class OrderTransitionTests(TestCase):
+    """Tests for compare-and-swap order status transitions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        cls.table = Table.objects.create(table_number='T1', seating_capacity=4)
+
+    def test_only_legal_edges_win(self):
+        order = Order.objects.create(table=self.table, waiter=self.waiter)
+        self.assertFalse(Order.transition(order.pk, Order.Status.SERVED))
+        self.assertTrue(Order.transition(order.pk, Order.Status.IN_KITCHEN))
+        self.assertFalse(Order.transition(order.pk, Order.Status.IN_KITCHEN))
+        self.assertFalse(Order.transition(order.pk, Order.Status.PLACED))
+        self.assertTrue(Order.transition(order.pk, Order.Status.SERVED))
+
+    def test_transition_does_not_read_first(self):
+        order = Order.objects.create(table=self.table, waiter=self.waiter)
+        with CaptureQueriesContext(connection) as ctx:
+            Order.transition(order.pk, Order.Status.IN_KITCHEN)
+        statements = [query['sql'].split()[0] for query in ctx.captured_queries]
+        self.assertNotIn('SELECT', statements)
+        self.assertEqual(statements.count('UPDATE'), 1)
+
+    def test_stale_instance_loses(self):
+        order = Order.objects.create(table=self.table, waiter=self.waiter)
+        first = Order.objects.get(pk=order.pk)
+        second = Order.objects.get(pk=order.pk)
+        self.assertTrue(first.move_to_kitchen())
+        self.assertTrue(first.mark_served())
+        self.assertFalse(second.move_to_kitchen())
+        self.assertEqual(Order.objects.get(pk=order.pk).status, Order.Status.SERVED)
+
+
+class OrderListCursorPagingTests(TestCase):
+    """Tests for opt-in keyset pagination on the order list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='x', role=User.Role.MANAGER)
+        table = Table.objects.create(table_number='T1', seating_capacity=4)
+        Order.objects.bulk_create([Order(table=table, waiter=cls.manager) for _ in range(45)])
+        # Force timestamp ties so the id tie-breaker matters
+        Order.objects.filter(pk__lte=Order.objects.order_by('pk')[20].pk).update(
+            created_at=Order.objects.order_by('pk').first().created_at
+        )
+
+    def _page(self, query):
+        response = self.client.get(f'/orders/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj'], [order.pk for order in response.context['orders']]
+
+    def test_walks_every_order_once_in_both_directions(self):
+        self.client.force_login(self.manager)
+        expected = list(Order.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+        seen, pages, query = [], [], 'paging=cursor'
+        while query:
+            page, pks = self._page(query)
+            pages.append(pks)
+            seen.extend(pks)
+            query = page.next_query
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(pks) for pks in pages], [20, 20, 5])
+
+        back, pks = self._page(page.previous_query)
+        self.assertEqual(pks, pages[1])
+        self.assertTrue(back.has_next())
+
+    def test_cursor_paging_skips_count(self):
+        self.client.force_login(self.manager)
+        with CaptureQueriesContext(connection) as ctx:
+            self._page('paging=cursor&status=PLACED')
+        self.assertFalse(any('COUNT(' in query['sql'] for query in ctx.captured_queries))
+
+
+class IdempotentOrderCreateTests(TestCase):
+    """Tests for idempotency keys on the order create endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        cls.table = Table.objects.create(table_number='T1', seating_capacity=4)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('4.50'))
+
+    def _submit(self, key, **extra):
+        data = {'table': self.table.pk, 'notes': '', f'item_{self.soup.pk}': '1', 'idempotency_key': key}
+        data.update(extra)
+        return self.client.post('/orders/create/', data)
+
+    def test_resubmitted_form_creates_one_order(self):
+        self.client.force_login(self.waiter)
+        first = self._submit('abc')
+        retry = self._submit('abc')
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(retry['Location'], first['Location'])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().result_id, Order.objects.get().pk)
+
+    def test_failed_request_releases_its_key(self):
+        self.client.force_login(self.waiter)
+        self._submit('abc', **{f'item_{self.soup.pk}': '0'})
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self._submit('abc')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_expired_key_can_be_reused(self):
+        self.client.force_login(self.waiter)
+        self._submit('abc')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        Table.objects.update(status=Table.Status.AVAILABLE)
+        self._submit('abc')
+        self.assertEqual(Order.objects.count(), 2)
+
+
+class DwellStatsTests(TestCase):
+    """Tests for status history and hourly dwell-time percentiles"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        cls.table = Table.objects.create(table_number='T1', seating_capacity=4)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('4.50'))
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 90), 7)
+
+    def test_transitions_are_recorded(self):
+        order = place_order(table=self.table, waiter=self.waiter, lines={self.soup.pk: 1})
+        Order.transition(order.pk, Order.Status.IN_KITCHEN)
+        Order.transition(order.pk, Order.Status.SERVED)
+        history = list(order.status_changes.order_by('changed_at', 'pk').values_list('from_status', 'to_status'))
+        self.assertEqual(history, [
+            ('', Order.Status.PLACED),
+            (Order.Status.PLACED, Order.Status.IN_KITCHEN),
+            (Order.Status.IN_KITCHEN, Order.Status.SERVED),
+        ])
+
+    def test_hourly_stats_per_status_and_category(self):
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+        order = place_order(table=self.table, waiter=self.waiter, lines={self.soup.pk: 1})
+        OrderStatusChange.objects.filter(order=order).update(changed_at=hour)
+        OrderStatusChange.objects.create(
+            order=order, from_status=Order.Status.PLACED, to_status=Order.Status.IN_KITCHEN,
+            changed_at=hour + timedelta(minutes=6),
+        )
+
+        self.assertEqual(compute_dwell_stats(hour), 3)
+        stat = OrderDwellStat.objects.get(dimension=OrderDwellStat.Dimension.CATEGORY)
+        self.assertEqual((stat.status, stat.key, stat.samples), (Order.Status.PLACED, MenuItem.Category.STARTER, 1))
+        self.assertEqual(stat.p90_seconds, 360)
+
+        # Recomputing the same hour replaces its rows
+        self.assertEqual(compute_dwell_stats(hour), 3)
+        self.assertEqual(OrderDwellStat.objects.count(), 3)
+
+
+class StationTicketTests(TestCase):
+    """Tests for routing order lines to per-station ticket queues"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        cls.table = Table.objects.create(table_number='T1', seating_capacity=4)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('4.50'))
+        cls.cola = MenuItem.objects.create(name='Cola', category=MenuItem.Category.DRINKS, price=Decimal('2.00'))
+
+    def _order(self, lines):
+        return place_order(table=self.table, waiter=self.waiter, lines=lines)
+
+    def test_order_is_split_into_station_tickets(self):
+        order = self._order({self.soup.pk: 1, self.cola.pk: 2})
+        self.assertEqual(
+            sorted(order.tickets.values_list('station', flat=True)),
+            [StationTicket.Station.BAR, StationTicket.Station.KITCHEN],
+        )
+
+    def test_queue_holds_only_station_lines_in_two_queries(self):
+        self._order({self.soup.pk: 1, self.cola.pk: 2})
+        self._order({self.soup.pk: 3})
+        with self.assertNumQueries(2):
+            tickets = list(StationTicket.queue(StationTicket.Station.BAR))
+            names = [[item.menu_item.name for item in ticket.order.station_items] for ticket in tickets]
+        self.assertEqual(names, [['Cola']])
+
+    def test_ready_tickets_leave_the_queue(self):
+        ticket = self._order({self.cola.pk: 1}).tickets.get()
+        self.assertTrue(StationTicket.transition(ticket.pk, StationTicket.State.IN_PROGRESS))
+        self.assertTrue(StationTicket.transition(ticket.pk, StationTicket.State.READY))
+        self.assertFalse(StationTicket.transition(ticket.pk, StationTicket.State.IN_PROGRESS))
+        self.assertFalse(StationTicket.queue(StationTicket.Station.BAR).exists())
+
+    def test_added_line_opens_or_reopens_its_station_ticket(self):
+        order = self._order({self.soup.pk: 1})
+        kitchen = order.tickets.get()
+        StationTicket.transition(kitchen.pk, StationTicket.State.READY)
+
+        OrderItem.objects.create(order=order, menu_item=self.cola, quantity=1)
+        OrderItem.objects.create(order=order, menu_item=self.soup, quantity=1)
+        states = dict(order.tickets.values_list('station', 'state'))
+        self.assertEqual(states, {
+            StationTicket.Station.KITCHEN: StationTicket.State.QUEUED,
+            StationTicket.Station.BAR: StationTicket.State.QUEUED,
+        })
+
+    def test_station_queue_view(self):
+        self._order({self.cola.pk: 1})
+        self.client.force_login(self.waiter)
+        response = self.client.get('/orders/kitchen/BAR/')
+        self.assertContains(response, 'Cola')
+        self.assertEqual(self.client.get('/orders/kitchen/GRILL/').status_code, 404)
+
+    def test_ticket_state_view_checks_role_and_station(self):
+        ticket = self._order({self.cola.pk: 1}).tickets.get()
+        cashier = User.objects.create_user('cashier', password='x', role=User.Role.CASHIER)
+        start = {'state': StationTicket.State.IN_PROGRESS}
+
+        self.client.force_login(cashier)
+        response = self.client.post(f'/orders/kitchen/BAR/tickets/{ticket.pk}/state/', start)
+        self.assertRedirects(response, '/dashboard/', fetch_redirect_response=False)
+        self.client.force_login(self.waiter)
+        self.assertEqual(self.client.post(f'/orders/kitchen/GRILL/tickets/{ticket.pk}/state/', start).status_code, 404)
+        self.assertEqual(self.client.post(f'/orders/kitchen/KITCHEN/tickets/{ticket.pk}/state/', start).status_code, 404)
+        self.assertEqual(StationTicket.objects.get(pk=ticket.pk).state, StationTicket.State.QUEUED)
+
+        self.client.post(f'/orders/kitchen/BAR/tickets/{ticket.pk}/state/', start)
+        self.assertEqual(StationTicket.objects.get(pk=ticket.pk).state, StationTicket.State.IN_PROGRESS)
+
+    def test_station_screen_only_receives_its_tickets(self):
+        async def scenario():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/kitchen/BAR/')
+            communicator.scope['user'] = self.waiter
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+
+            await sync_to_async(self._place_on_commit)()
+            created = await communicator.receive_json_from()
+            nothing_else = await communicator.receive_nothing()
+            await communicator.disconnect()
+            return created, nothing_else
+
+        created, nothing_else = async_to_sync(scenario)()
+        self.assertEqual(created['event'], 'ticket.created')
+        self.assertEqual([item['name'] for item in created['data']['items']], ['Cola'])
+        self.assertTrue(nothing_else)
+
+    def _place_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._order({self.soup.pk: 1, self.cola.pk: 1})
+
+
+class AmendOrderTests(TestCase):
+    """Tests for batched add/remove/change of lines on an open order"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        cls.table = Table.objects.create(table_number='T1', seating_capacity=4)
+        cls.soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('4.50'))
+        cls.steak = MenuItem.objects.create(name='Steak', category=MenuItem.Category.MAIN, price=Decimal('20.00'))
+        cls.cola = MenuItem.objects.create(name='Cola', category=MenuItem.Category.DRINKS, price=Decimal('2.00'))
+
+    def setUp(self):
+        self.order = place_order(table=self.table, waiter=self.waiter, lines={self.soup.pk: 2, self.steak.pk: 1})
+        self.lines = {item.menu_item_id: item.pk for item in self.order.items.all()}
+
+    def test_batch_is_applied_with_delta_totals(self):
+        order = amend_order(
+            order_id=self.order.pk,
+            add={self.cola.pk: 3, self.soup.pk: 1},
+            quantities={self.lines[self.steak.pk]: 0},
+        )
+        self.assertEqual((order.total_amount, order.item_count), (Decimal('19.50'), 2))
+        self.assertEqual(
+            dict(order.items.values_list('menu_item__name', 'quantity')),
+            {'Soup': 3, 'Cola': 3},
+        )
+        stored = order.total_amount
+        Order.rebuild_totals(Order.objects.filter(pk=order.pk))
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, stored)
+
+    def test_new_station_line_opens_a_ticket(self):
+        amend_order(order_id=self.order.pk, add={self.cola.pk: 1})
+        self.assertTrue(self.order.tickets.filter(station=StationTicket.Station.BAR).exists())
+
+    def test_removing_a_stations_last_line_drops_its_ticket(self):
+        amend_order(order_id=self.order.pk, add={self.cola.pk: 1})
+        cola = self.order.items.get(menu_item=self.cola).pk
+
+        amend_order(order_id=self.order.pk, quantities={cola: 0, self.lines[self.soup.pk]: 0})
+
+        # The steak still needs the kitchen; the bar has nothing left to make
+        self.assertEqual(list(self.order.tickets.values_list('station', flat=True)), [StationTicket.Station.KITCHEN])
+        self.assertFalse(StationTicket.queue(StationTicket.Station.BAR).exists())
+
+    def test_served_or_billed_orders_are_refused(self):
+        Order.transition(self.order.pk, Order.Status.IN_KITCHEN)
+        Bill.objects.create(
+            table=self.table, order=self.order, subtotal=Decimal('29.00'),
+            tax_amount=Decimal('1.45'), total_amount=Decimal('30.45'),
+        )
+        with self.assertRaises(ValidationError):
+            amend_order(order_id=self.order.pk, add={self.cola.pk: 1})
+
+        other = place_order(table=self.table, waiter=self.waiter, lines={self.soup.pk: 1})
+        Order.transition(other.pk, Order.Status.IN_KITCHEN)
+        Order.transition(other.pk, Order.Status.SERVED)
+        with self.assertRaises(ValidationError):
+            amend_order(order_id=other.pk, add={self.cola.pk: 1})
+        self.assertEqual(OrderItem.objects.filter(menu_item=self.cola).count(), 0)
+
+    def test_unknown_line_rolls_back_the_batch(self):
+        with self.assertRaises(ValidationError):
+            amend_order(order_id=self.order.pk, add={self.cola.pk: 1}, quantities={999999: 1})
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.total_amount, self.order.item_count), (Decimal('29.00'), 2))
 
-# Create your tests here.
+    def test_amend_endpoint(self):
+        self.client.force_login(self.waiter)
+        response = self.client.post(f'/orders/{self.order.pk}/amend/', {
+            f'qty_{self.lines[self.soup.pk]}': '1',
+            f'qty_{self.lines[self.steak.pk]}': '1',
+            f'add_{self.cola.pk}': '2',
+        })
+        self.assertRedirects(response, f'/orders/{self.order.pk}/', fetch_redirect_response=False)
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.total_amount, self.order.item_count), (Decimal('28.50'), 3))
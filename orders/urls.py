@@ -6,6 +6,10 @@ app_name = 'orders'
 urlpatterns = [
     path('', views.OrderListView.as_view(), name='list'),
     path('create/', views.OrderCreateView.as_view(), name='create'),
+    path('kitchen/', views.KitchenDisplayView.as_view(), name='kitchen'),
+    path('kitchen/<str:station>/', views.StationQueueView.as_view(), name='station_queue'),
+    path('kitchen/<str:station>/tickets/<int:pk>/state/', views.TicketUpdateStateView.as_view(), name='ticket_state'),
     path('<int:pk>/', views.OrderDetailView.as_view(), name='detail'),
+    path('<int:pk>/amend/', views.OrderAmendView.as_view(), name='amend'),
     path('<int:pk>/update-status/', views.OrderUpdateStatusView.as_view(), name='update_status'),
 ]
@@ -1,22 +1,30 @@
+import uuid
+
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
+from django.http import Http404
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, DetailView, UpdateView
+from django.views.generic import ListView, CreateView, DetailView, UpdateView, View
+from django.core.exceptions import ValidationError
 from django.db import transaction
 
-from .models import Order, OrderItem
+from . import idempotency
+from .models import IdempotencyKey, Order, StationTicket
+from .pagination import KeysetPaginationMixin
+from .services import amend_order, parse_order_lines, place_order
 from tables.models import Table
 from menu.models import MenuItem
 from accounts.decorators import role_required
 
 
-class OrderListView(LoginRequiredMixin, ListView):
-    """List all orders - filtered for waiters"""
+class OrderListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
+    """List all orders - filtered for waiters (``?paging=cursor`` for keyset paging)"""
     model = Order
     template_name = 'orders/order_list.html'
     context_object_name = 'orders'
     paginate_by = 20
+    cursor_field = 'created_at'
     
     def get_queryset(self):
         user = self.request.user
@@ -49,27 +57,44 @@ class OrderCreateView(LoginRequiredMixin, CreateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['available_tables'] = Table.objects.filter(status=Table.Status.AVAILABLE)
+        context['available_tables'] = Table.objects.filter(status__in=[Table.Status.AVAILABLE, Table.Status.RESERVED])
         context['menu_items'] = MenuItem.objects.filter(is_available=True).order_by('category', 'name')
+        context['idempotency_key'] = uuid.uuid4().hex
         return context
     
     def form_valid(self, form):
-        form.instance.waiter = self.request.user
+        try:
+            claim = idempotency.claim(
+                self.request.user,
+                IdempotencyKey.Scope.ORDER_CREATE,
+                idempotency.request_key(self.request),
+            )
+        except idempotency.DuplicateRequest as duplicate:
+            # Resubmitted form: answer like the original request without writing again
+            if duplicate.result_id:
+                messages.info(self.request, f"Order #{duplicate.result_id} was already created.")
+            else:
+                messages.warning(self.request, "This order is still being processed.")
+            return redirect(self.success_url)
         
-        with transaction.atomic():
-            self.object = form.save()
-            
-            # Add order items from POST data
-            for key, quantity in self.request.POST.items():
-                if key.startswith('item_') and int(quantity or 0) > 0:
-                    menu_item_id = key.replace('item_', '')
-                    menu_item = MenuItem.objects.get(id=menu_item_id)
-                    OrderItem.objects.create(
-                        order=self.object,
-                        menu_item=menu_item,
-                        quantity=int(quantity),
-                        price_at_order=menu_item.price
-                    )
+        try:
+            lines = parse_order_lines(self.request.POST)
+            with transaction.atomic():
+                self.object = place_order(
+                    table=form.cleaned_data['table'],
+                    waiter=self.request.user,
+                    lines=lines,
+                    notes=form.cleaned_data['notes'],
+                )
+                idempotency.complete(claim, self.object.pk)
+        except ValidationError as e:
+            idempotency.release(claim)
+            for error in e.messages:
+                messages.error(self.request, error)
+            return self.form_invalid(form)
+        except Exception:
+            idempotency.release(claim)
+            raise
         
         messages.success(self.request, f"Order created successfully for {self.object.table}")
         return redirect(self.success_url)
@@ -92,6 +117,121 @@ class OrderDetailView(LoginRequiredMixin, DetailView):
         return queryset
 
 
+class OrderAmendView(LoginRequiredMixin, DetailView):
+    """Add, remove or change items on an open order in one batch"""
+    model = Order
+    template_name = 'orders/order_amend.html'
+    context_object_name = 'order'
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not (request.user.is_waiter or request.user.is_manager):
+            messages.error(request, "You don't have permission to update orders.")
+            return redirect('dashboard:home')
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('table')
+        user = self.request.user
+        
+        # Waiters can only change their own orders
+        if user.is_waiter and not user.is_manager:
+            queryset = queryset.filter(waiter=user)
+        
+        return queryset
+    
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        if not self.object.is_amendable:
+            messages.error(request, "This order can no longer be changed.")
+            return redirect('orders:detail', pk=self.object.pk)
+        return self.render_to_response(self.get_context_data(object=self.object))
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['items'] = self.object.items.select_related('menu_item')
+        context['menu_items'] = MenuItem.objects.filter(is_available=True).order_by('category', 'name')
+        return context
+    
+    def post(self, request, *args, **kwargs):
+        order = self.get_object()
+        
+        try:
+            order = amend_order(
+                order_id=order.pk,
+                add=parse_order_lines(request.POST, prefix='add_'),
+                quantities=parse_order_lines(request.POST, prefix='qty_', keep_zero=True),
+            )
+        except ValidationError as e:
+            for error in e.messages:
+                messages.error(request, error)
+            return redirect('orders:detail', pk=order.pk)
+        
+        messages.success(request, f"Order updated. New total: ₹{order.total_amount}")
+        return redirect('orders:detail', pk=order.pk)
+
+
+class KitchenDisplayView(LoginRequiredMixin, ListView):
+    """Kitchen display - renders open orders once, then follows WebSocket deltas"""
+    model = Order
+    template_name = 'orders/kitchen_display.html'
+    context_object_name = 'orders'
+    
+    def get_queryset(self):
+        return Order.objects.filter(
+            status__in=[Order.Status.PLACED, Order.Status.IN_KITCHEN]
+        ).select_related('table').prefetch_related('items__menu_item').order_by('created_at')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['stations'] = StationTicket.Station.choices
+        return context
+
+
+class StationQueueView(LoginRequiredMixin, ListView):
+    """Open tickets for one kitchen station, oldest first, followed over WebSocket"""
+    model = StationTicket
+    template_name = 'orders/station_queue.html'
+    context_object_name = 'tickets'
+    
+    def dispatch(self, request, *args, **kwargs):
+        if kwargs['station'] not in StationTicket.Station.values:
+            raise Http404("Unknown station")
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get_queryset(self):
+        return StationTicket.queue(self.kwargs['station'])
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['station'] = StationTicket.Station(self.kwargs['station'])
+        context['stations'] = StationTicket.Station.choices
+        return context
+
+
+class TicketUpdateStateView(LoginRequiredMixin, View):
+    """Advance a station ticket (Start / Ready)"""
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not (request.user.is_waiter or request.user.is_manager):
+            messages.error(request, "You don't have permission to update kitchen tickets.")
+            return redirect('dashboard:home')
+        if kwargs['station'] not in StationTicket.Station.values:
+            raise Http404("Unknown station")
+        return super().dispatch(request, *args, **kwargs)
+    
+    def post(self, request, station, pk):
+        if not StationTicket.objects.filter(pk=pk, station=station).exists():
+            raise Http404("No such ticket at this station")
+        new_state = request.POST.get('state')
+        
+        if new_state not in StationTicket.State.values:
+            messages.error(request, "Invalid state")
+        elif not StationTicket.transition(pk, new_state):
+            messages.warning(request, "Ticket was already updated by another screen.")
+        
+        return redirect('orders:station_queue', station=station)
+
+
 class OrderUpdateStatusView(LoginRequiredMixin, UpdateView):
     """Update order status"""
     model = Order
@@ -105,14 +245,18 @@ class OrderUpdateStatusView(LoginRequiredMixin, UpdateView):
         return super().dispatch(request, *args, **kwargs)
     
     def post(self, request, *args, **kwargs):
-        self.object = self.get_object()
+        pk = kwargs['pk']
         new_status = request.POST.get('status')
         
-        if new_status in dict(Order.Status.choices):
-            self.object.status = new_status
-            self.object.save()
-            messages.success(request, f"Order status updated to {self.object.get_status_display()}")
-        else:
+        if new_status not in Order.Status.values:
             messages.error(request, "Invalid status")
+        elif Order.transition(pk, new_status):
+            messages.success(request, f"Order status updated to {Order.Status(new_status).label}")
+        else:
+            messages.warning(
+                request,
+                f"Order could not move to {Order.Status(new_status).label}; "
+                "it was already updated or that step is not allowed."
+            )
         
-        return redirect('orders:detail', pk=self.object.pk)
+        return redirect('orders:detail', pk=pk)
@@ -0,0 +1,178 @@
+// Kitchen display / station queue - renders once on the server, then follows WebSocket deltas
+//
+// The board element carries its settings as data attributes:
+//   data-socket-path  WebSocket path to follow (e.g. /ws/kitchen/ or /ws/kitchen/BAR/)
+//   data-action-url   (station queues) ticket state URL with 0 in place of the ticket id
+//   data-csrf         (station queues) CSRF token for the state forms
+
+(function () {
+    const board = document.getElementById('kitchen-orders');
+    if (!board) {
+        return;
+    }
+    const connection = document.getElementById('kitchen-connection');
+    const labels = {
+        PLACED: 'Placed', IN_KITCHEN: 'In Kitchen', SERVED: 'Served',
+        QUEUED: 'Queued', IN_PROGRESS: 'In Progress', READY: 'Ready',
+    };
+    // Next ticket state offered by the bump button on station queues
+    const nextState = {QUEUED: 'IN_PROGRESS', IN_PROGRESS: 'READY'};
+    const actionLabels = {IN_PROGRESS: 'Start', READY: 'Ready'};
+    const doneStates = ['SERVED', 'READY'];
+
+    function findOrder(orderId) {
+        return board.querySelector('[data-order-id="' + orderId + '"]');
+    }
+
+    function itemRow(item) {
+        const li = document.createElement('li');
+        li.dataset.itemId = item.item_id;
+        const qty = document.createElement('span');
+        qty.dataset.role = 'quantity';
+        qty.textContent = item.quantity;
+        li.append(qty, 'x ' + item.name);
+        return li;
+    }
+
+    function actionForm(ticketId) {
+        const form = document.createElement('form');
+        form.method = 'post';
+        form.action = board.dataset.actionUrl.replace('/0/', '/' + ticketId + '/');
+        form.style.cssText = 'padding: 0 1rem 1rem;';
+        const csrf = document.createElement('input');
+        csrf.type = 'hidden';
+        csrf.name = 'csrfmiddlewaretoken';
+        csrf.value = board.dataset.csrf;
+        const button = document.createElement('button');
+        button.type = 'submit';
+        button.name = 'state';
+        button.className = 'btn btn-primary';
+        button.dataset.role = 'action';
+        form.append(csrf, button);
+        return form;
+    }
+
+    function addOrder(order) {
+        if (findOrder(order.order_id)) {
+            return;
+        }
+        const empty = document.getElementById('kitchen-empty');
+        if (empty) {
+            empty.remove();
+        }
+        const card = document.createElement('div');
+        card.className = 'card kitchen-order';
+        card.dataset.orderId = order.order_id;
+        card.innerHTML = '<div class="card-header flex justify-between items-center">' +
+            '<strong></strong><span class="table-status-badge" data-role="status"></span></div>' +
+            '<ul data-role="items" style="padding: 0.5rem 1.5rem;"></ul>';
+        card.querySelector('strong').textContent = '#' + order.order_id + ' · ' + order.table;
+        const list = card.querySelector('[data-role="items"]');
+        order.items.forEach(item => list.append(itemRow(item)));
+        if (order.notes) {
+            const notes = document.createElement('p');
+            notes.style.cssText = 'padding: 0 1rem 1rem; color: #666;';
+            notes.textContent = order.notes;
+            card.append(notes);
+        }
+        if (order.ticket_id && board.dataset.actionUrl) {
+            card.append(actionForm(order.ticket_id));
+        }
+        board.append(card);
+        setStatus(card, order.status);
+    }
+
+    function setStatus(card, status) {
+        const badge = card.querySelector('[data-role="status"]');
+        badge.className = 'table-status-badge badge-' + status.toLowerCase();
+        badge.textContent = labels[status] || status;
+        const action = card.querySelector('[data-role="action"]');
+        if (action && nextState[status]) {
+            action.value = nextState[status];
+            action.textContent = actionLabels[nextState[status]];
+        }
+    }
+
+    function changeItem(item) {
+        const card = findOrder(item.order_id);
+        if (!card) {
+            return;
+        }
+        const row = card.querySelector('[data-item-id="' + item.item_id + '"]');
+        if (item.quantity === 0) {
+            if (row) {
+                row.remove();
+            }
+        } else if (row) {
+            row.querySelector('[data-role="quantity"]').textContent = item.quantity;
+        } else {
+            card.querySelector('[data-role="items"]').append(itemRow(item));
+        }
+    }
+
+    function changeStatus(change) {
+        const card = findOrder(change.order_id);
+        if (!card) {
+            return;
+        }
+        if (doneStates.includes(change.status)) {
+            card.remove();
+        } else {
+            setStatus(card, change.status);
+        }
+    }
+
+    function changeTicket(change) {
+        if (!findOrder(change.order_id) && !doneStates.includes(change.status)) {
+            // A finished ticket was reopened by new lines; its items are not on screen
+            window.location.reload();
+            return;
+        }
+        changeStatus(change);
+    }
+
+    function removeTicket(change) {
+        const card = findOrder(change.order_id);
+        if (card) {
+            card.remove();
+        }
+    }
+
+    const handlers = {
+        'order.created': addOrder,
+        'ticket.created': addOrder,
+        'item.changed': changeItem,
+        'order.status': changeStatus,
+        'ticket.state': changeTicket,
+        'ticket.removed': removeTicket,
+    };
+
+    function connect(isReconnect) {
+        const scheme = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+        const socket = new WebSocket(scheme + window.location.host + board.dataset.socketPath);
+
+        socket.onopen = function () {
+            if (isReconnect) {
+                // Deltas sent while disconnected are lost; start again from a fresh render
+                window.location.reload();
+                return;
+            }
+            connection.className = 'table-status-badge badge-available';
+            connection.textContent = 'Live';
+        };
+        socket.onmessage = function (event) {
+            const message = JSON.parse(event.data);
+            const handler = handlers[message.event];
+            if (handler) {
+                handler(message.data);
+            }
+        };
+        socket.onclose = function () {
+            connection.className = 'table-status-badge badge-closed';
+            connection.textContent = 'Reconnecting…';
+            setTimeout(() => connect(true), 3000);
+        };
+    }
+
+    connect(false);
+})();
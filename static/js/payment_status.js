@@ -0,0 +1,26 @@
+// Bill page - polls a settling payment and reloads once it succeeds or fails
+//
+// The status element carries the JSON status URL as data-status-url.
+
+(function () {
+    const panel = document.getElementById('payment-status');
+    if (!panel) {
+        return;
+    }
+    const interval = 1500;
+
+    function poll() {
+        fetch(panel.dataset.statusUrl, {credentials: 'same-origin', cache: 'no-store'})
+            .then(function (response) { return response.json(); })
+            .then(function (intent) {
+                if (intent.is_open) {
+                    window.setTimeout(poll, interval);
+                } else {
+                    window.location.reload();
+                }
+            })
+            .catch(function () { window.setTimeout(poll, interval * 2); });
+    }
+
+    window.setTimeout(poll, interval);
+})();
@@ -1,19 +1,19 @@
 from django.contrib import admin
-from .models import Table
+from .models import Reservation, Table
 
 
 @admin.register(Table)
 class TableAdmin(admin.ModelAdmin):
     """Admin interface for Table model"""
     
-    list_display = ('table_number', 'seating_capacity', 'status', 'last_activity')
-    list_filter = ('status',)
+    list_display = ('table_number', 'seating_capacity', 'section', 'position', 'status', 'last_activity')
+    list_filter = ('status', 'section')
     search_fields = ('table_number',)
     readonly_fields = ('last_activity', 'created_at')
     
     fieldsets = (
         ('Table Information', {
-            'fields': ('table_number', 'seating_capacity')
+            'fields': ('table_number', 'seating_capacity', 'section', 'position')
         }),
         ('Status', {
             'fields': ('status', 'last_activity')
@@ -23,3 +23,14 @@ class TableAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(Reservation)
+class ReservationAdmin(admin.ModelAdmin):
+    """Admin interface for Reservation model"""
+    
+    list_display = ('guest_name', 'party_size', 'table', 'starts_at', 'ends_at', 'status')
+    list_filter = ('status',)
+    search_fields = ('guest_name', 'guest_phone', 'table__table_number')
+    date_hierarchy = 'starts_at'
+    readonly_fields = ('created_by', 'created_at')
@@ -0,0 +1,95 @@
+"""
+Cached snapshot of the floor for the table status board
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+# Shared marker of the current floor state; every table or order change replaces it
+VERSION_KEY = 'tables:board:version'
+# (version, snapshot) of the last build, possibly stale
+SNAPSHOT_KEY = 'tables:board:snapshot'
+# Held by the one request rebuilding a version
+LOCK_KEY = 'tables:board:rebuild:{}'
+# How often a request without any snapshot checks whether the rebuild finished
+POLL_SECONDS = 0.05
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # First use, or the marker was evicted: start a new version everywhere
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Outdate the snapshot once the current transaction commits"""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def build():
+    """The floor state as plain data: every table with its current order, and the status counts"""
+    from .models import Table
+    tables = [
+        {
+            'id': table.pk,
+            'table_number': table.table_number,
+            'seating_capacity': table.seating_capacity,
+            'status': table.status,
+            'status_display': table.get_status_display(),
+            'current_order_id': table.current_order_id,
+            'current_order_status': table.current_order_status,
+            'current_waiter': table.current_waiter,
+            'current_order_total': table.current_order_total,
+            'current_order_created_at': table.current_order_created_at,
+        }
+        for table in Table.objects.with_current_order().order_by('table_number')
+    ]
+    return {
+        'tables': tables,
+        'status_counts': Table.objects.status_counts(),
+        'built_at': timezone.now(),
+    }
+
+
+def snapshot():
+    """
+    The board snapshot for the current version (its ``version`` key says
+    which one it was built for).
+
+    On a miss only the request that takes the rebuild lock queries the
+    database. The others serve the previous snapshot meanwhile, or wait for
+    the new one if there is none yet, and build it themselves only if the
+    rebuild takes longer than TABLE_BOARD_REBUILD_TIMEOUT.
+    """
+    version = current_version()
+    cached = cache.get(SNAPSHOT_KEY)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    timeout = settings.TABLE_BOARD_REBUILD_TIMEOUT
+    lock = LOCK_KEY.format(version)
+    if not cache.add(lock, 1, timeout):
+        if cached is not None:
+            return cached[1]
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_SECONDS)
+            cached = cache.get(SNAPSHOT_KEY)
+            if cached is not None:
+                return cached[1]
+
+    try:
+        data = dict(build(), version=version)
+        # Stored under the version read before building, so changes made
+        # meanwhile make it stale at once
+        cache.set(SNAPSHOT_KEY, (version, data), None)
+    finally:
+        cache.delete(lock)
+    return data
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tables', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='table',
+            name='position',
+            field=models.PositiveIntegerField(blank=True, help_text="Place in the section's row; tables at consecutive positions can be pushed together", null=True),
+        ),
+        migrations.AddField(
+            model_name='table',
+            name='section',
+            field=models.CharField(blank=True, help_text='Floor area, e.g. Patio', max_length=50),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tables', '0003_reservations'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='table',
+            index=models.Index(fields=['status', 'last_activity'], name='tables_status_activity_idx'),
+        ),
+    ]
@@ -1,6 +1,47 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.validators import MinValueValidator
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
 from django.utils import timezone
 
+from . import board, seating
+
+
+class TableQuerySet(models.QuerySet):
+    """Queries for the table status board"""
+    
+    def with_current_order(self):
+        """
+        Annotate each table with its current order (the one current_order
+        returns): ``current_order_id``, ``current_order_status``,
+        ``current_waiter``, ``current_order_total`` and
+        ``current_order_created_at``, as correlated subqueries of this one
+        query.
+        """
+        from orders.models import Order
+        active = Order.objects.filter(
+            table=OuterRef('pk'),
+            status__in=Table.ACTIVE_ORDER_STATUSES,
+        ).order_by('-created_at', '-id')
+        return self.annotate(**{
+            name: Subquery(active.values(field)[:1])
+            for name, field in (
+                ('current_order_id', 'pk'),
+                ('current_order_status', 'status'),
+                ('current_waiter', 'waiter__username'),
+                ('current_order_total', 'total_amount'),
+                ('current_order_created_at', 'created_at'),
+            )
+        })
+    
+    def status_counts(self):
+        """``{status: count}`` for every status, from one grouped query"""
+        counts = dict.fromkeys(Table.Status.values, 0)
+        counts.update(self.order_by().values_list('status').annotate(count=Count('pk')))
+        return counts
+
 
 class Table(models.Model):
     """Restaurant table model with status tracking"""
@@ -10,9 +51,28 @@ class Table(models.Model):
         OCCUPIED = 'OCCUPIED', 'Occupied'
         BILL_REQUESTED = 'BILL_REQUESTED', 'Bill Requested'
         CLOSED = 'CLOSED', 'Closed'
+        RESERVED = 'RESERVED', 'Reserved'
+    
+    # Legal status edges, applied by transition() as conditional UPDATEs
+    TRANSITIONS = {
+        Status.AVAILABLE: [Status.OCCUPIED, Status.RESERVED],
+        Status.RESERVED: [Status.OCCUPIED, Status.AVAILABLE],
+        Status.OCCUPIED: [Status.BILL_REQUESTED, Status.CLOSED],
+        Status.BILL_REQUESTED: [Status.AVAILABLE, Status.CLOSED],
+        Status.CLOSED: [Status.AVAILABLE],
+    }
+    
+    # Order statuses that make an order the table's current one
+    ACTIVE_ORDER_STATUSES = ['PLACED', 'IN_KITCHEN', 'SERVED']
     
     table_number = models.CharField(max_length=10, unique=True, db_index=True)
     seating_capacity = models.PositiveIntegerField()
+    section = models.CharField(max_length=50, blank=True, help_text="Floor area, e.g. Patio")
+    position = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Place in the section's row; tables at consecutive positions can be pushed together",
+    )
     status = models.CharField(
         max_length=20,
         choices=Status.choices,
@@ -22,29 +82,106 @@ class Table(models.Model):
     last_activity = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = TableQuerySet.as_manager()
+    
     class Meta:
         db_table = 'tables'
         ordering = ['table_number']
+        indexes = [
+            # Sweeps for tables left in a status too long (close_abandoned)
+            models.Index(fields=['status', 'last_activity'], name='tables_status_activity_idx'),
+        ]
         verbose_name = 'Table'
         verbose_name_plural = 'Tables'
     
     def __str__(self):
         return f"Table {self.table_number}"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        board.invalidate()
+        seating.invalidate()
+    
+    def delete(self, *args, **kwargs):
+        board.invalidate()
+        seating.invalidate()
+        return super().delete(*args, **kwargs)
+    
+    @classmethod
+    def transition(cls, pk, status):
+        """
+        Move a table to ``status`` with a single conditional UPDATE.
+        
+        The row only changes if it currently sits in a status with a legal
+        edge to ``status``; no read happens first. Returns True if this call
+        won the transition.
+        """
+        sources = [source for source, targets in cls.TRANSITIONS.items() if status in targets]
+        won = bool(sources) and cls.objects.filter(pk=pk, status__in=sources).update(
+            status=status,
+            last_activity=timezone.now(),
+        ) == 1
+        if won:
+            board.invalidate()
+        return won
+    
+    @classmethod
+    def transition_many(cls, pks, status):
+        """transition() for several tables in one UPDATE; returns how many moved"""
+        sources = [source for source, targets in cls.TRANSITIONS.items() if status in targets]
+        if not sources:
+            return 0
+        moved = cls.objects.filter(pk__in=pks, status__in=sources).update(
+            status=status,
+            last_activity=timezone.now(),
+        )
+        if moved:
+            board.invalidate()
+        return moved
+    
+    @classmethod
+    def close_abandoned(cls, before, statuses=(Status.OCCUPIED, Status.BILL_REQUESTED)):
+        """
+        Close every table in ``statuses`` with no activity since ``before``,
+        in one conditional UPDATE. Returns ``{id: table_number}`` of the
+        tables closed.
+        
+        A table that a concurrent transition moves or touches no longer
+        matches the WHERE clause, so it is left alone. The closed rows get
+        one shared timestamp, which finds them again inside the same
+        transaction.
+        """
+        sources = [status for status in statuses if cls.Status.CLOSED in cls.TRANSITIONS.get(status, [])]
+        stamp = timezone.now()
+        with transaction.atomic():
+            closed = cls.objects.filter(status__in=sources, last_activity__lt=before).update(
+                status=cls.Status.CLOSED,
+                last_activity=stamp,
+            )
+            if not closed:
+                return {}
+            board.invalidate()
+            return dict(cls.objects.filter(status=cls.Status.CLOSED, last_activity=stamp).values_list(
+                'pk', 'table_number'
+            ))
+    
+    def _transition(self, status):
+        won = self.transition(self.pk, status)
+        if won:
+            self.status = status
+        return won
+    
     def mark_as_occupied(self):
         """Mark table as occupied"""
-        self.status = self.Status.OCCUPIED
-        self.save()
+        return self._transition(self.Status.OCCUPIED)
     
     def mark_as_available(self):
         """Mark table as available"""
-        self.status = self.Status.AVAILABLE
-        self.save()
+        return self._transition(self.Status.AVAILABLE)
     
     def request_bill(self):
         """Mark table as waiting for bill"""
-        self.status = self.Status.BILL_REQUESTED
-        self.save()
+        return self._transition(self.Status.BILL_REQUESTED)
     
     @property
     def is_available(self):
@@ -60,5 +197,90 @@ class Table(models.Model):
         from orders.models import Order
         return Order.objects.filter(
             table=self,
-            status__in=[Order.Status.PLACED, Order.Status.IN_KITCHEN, Order.Status.SERVED]
-        ).first()
+            status__in=self.ACTIVE_ORDER_STATUSES
+        ).order_by('-created_at', '-id').first()
+
+
+class ReservationQuerySet(models.QuerySet):
+    """Interval queries over reservation windows"""
+    
+    def holding(self):
+        """Reservations that keep their table for the window"""
+        return self.filter(status__in=Reservation.HOLDING_STATUSES)
+    
+    def overlapping(self, start, end):
+        """
+        Holding reservations whose window overlaps ``start`` to ``end``.
+        
+        No window is longer than RESERVATION_MAX_DURATION_MINUTES, so both
+        ends of the scan over reservation_window_idx are bounded.
+        """
+        return self.holding().filter(
+            starts_at__lt=end,
+            starts_at__gt=start - timedelta(minutes=settings.RESERVATION_MAX_DURATION_MINUTES),
+            ends_at__gt=start,
+        )
+    
+    def open_at(self, moment):
+        """Booked reservations whose window has opened and not yet closed at ``moment``"""
+        return self.filter(
+            status=Reservation.Status.BOOKED,
+            starts_at__lte=moment,
+            starts_at__gt=moment - timedelta(minutes=settings.RESERVATION_MAX_DURATION_MINUTES),
+            ends_at__gt=moment,
+        )
+
+
+class Reservation(models.Model):
+    """A table booked for a party over a time window"""
+    
+    class Status(models.TextChoices):
+        BOOKED = 'BOOKED', 'Booked'
+        SEATED = 'SEATED', 'Seated'
+        CANCELLED = 'CANCELLED', 'Cancelled'
+        NO_SHOW = 'NO_SHOW', 'No Show'
+    
+    # Statuses that keep the table from other bookings
+    HOLDING_STATUSES = [Status.BOOKED, Status.SEATED]
+    
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name='reservations')
+    guest_name = models.CharField(max_length=100)
+    guest_phone = models.CharField(max_length=20, blank=True)
+    party_size = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.BOOKED)
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reservations'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = ReservationQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'reservations'
+        ordering = ['starts_at']
+        indexes = [
+            # Overlap checks for one table, and availability across all of them
+            models.Index(fields=['table', 'starts_at'], name='reservation_table_start_idx'),
+            models.Index(fields=['starts_at', 'ends_at'], name='reservation_window_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=Q(ends_at__gt=F('starts_at')), name='reservation_window_valid'),
+        ]
+        verbose_name = 'Reservation'
+        verbose_name_plural = 'Reservations'
+    
+    def __str__(self):
+        return f"{self.guest_name} ({self.party_size}) at {self.table} {self.starts_at:%Y-%m-%d %H:%M}"
+    
+    def clean(self):
+        """Apply the booking window rules to reservations edited outside book() (e.g. the admin)"""
+        from .reservations import validate_window
+        if self.starts_at and self.ends_at:
+            validate_window(self.starts_at, self.ends_at)
@@ -0,0 +1,119 @@
+"""
+Booking tables over time windows, and opening those windows on the floor
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Reservation, Table
+
+
+class ReservationConflict(Exception):
+    """The table is already booked for part of the requested window"""
+
+    def __init__(self, table):
+        super().__init__(f"{table} is already booked for part of that time")
+        self.table = table
+
+
+def validate_window(start, end):
+    """Raise ValidationError unless ``start`` to ``end`` is a bookable window"""
+    if end <= start:
+        raise ValidationError("The reservation must end after it starts.")
+    if end - start > timedelta(minutes=settings.RESERVATION_MAX_DURATION_MINUTES):
+        raise ValidationError(
+            f"A reservation can last at most {settings.RESERVATION_MAX_DURATION_MINUTES} minutes."
+        )
+
+
+def available_tables(party_size, start, end):
+    """
+    Tables seating ``party_size`` with no holding reservation overlapping
+    ``start`` to ``end``, smallest first, from one query. A window that has
+    already started also needs the table to be free right now.
+    """
+    validate_window(start, end)
+    tables = Table.objects.filter(seating_capacity__gte=party_size).exclude(
+        pk__in=Reservation.objects.overlapping(start, end).values('table_id')
+    )
+    if start <= timezone.now():
+        tables = tables.filter(status=Table.Status.AVAILABLE)
+    return tables.order_by('seating_capacity', 'table_number')
+
+
+def book(*, table, party_size, starts_at, ends_at, guest_name, guest_phone='', notes='', created_by=None):
+    """
+    Reserve ``table`` for a party. Bookings of one table are serialized on
+    its row, so two hosts cannot both take the same slot. Raises
+    ValidationError for a bad window or party, ReservationConflict if the
+    slot is taken.
+    """
+    validate_window(starts_at, ends_at)
+    if party_size > table.seating_capacity:
+        raise ValidationError(f"{table} seats at most {table.seating_capacity}.")
+
+    with transaction.atomic():
+        Table.objects.select_for_update().filter(pk=table.pk).exists()
+        if Reservation.objects.filter(table=table).overlapping(starts_at, ends_at).exists():
+            raise ReservationConflict(table)
+        reservation = Reservation.objects.create(
+            table=table,
+            party_size=party_size,
+            starts_at=starts_at,
+            ends_at=ends_at,
+            guest_name=guest_name,
+            guest_phone=guest_phone,
+            notes=notes,
+            created_by=created_by,
+        )
+        if starts_at <= timezone.now():
+            Table.transition(table.pk, Table.Status.RESERVED)
+    return reservation
+
+
+def release_tables(table_ids, now=None):
+    """Make RESERVED tables among ``table_ids`` available again unless a booking is still open"""
+    now = now or timezone.now()
+    held = Reservation.objects.open_at(now).filter(table_id__in=table_ids).values('table_id')
+    free = Table.objects.filter(pk__in=table_ids, status=Table.Status.RESERVED).exclude(pk__in=held)
+    return Table.transition_many(list(free.values_list('pk', flat=True)), Table.Status.AVAILABLE)
+
+
+def cancel(reservation):
+    """Cancel a booked reservation and free its table if it was being held; returns True if cancelled"""
+    with transaction.atomic():
+        cancelled = Reservation.objects.filter(pk=reservation.pk, status=Reservation.Status.BOOKED).update(
+            status=Reservation.Status.CANCELLED
+        )
+        if cancelled:
+            reservation.status = Reservation.Status.CANCELLED
+            release_tables([reservation.table_id])
+    return bool(cancelled)
+
+
+def seat(table_id, now=None):
+    """Mark the reservation open at a table as seated once its party orders"""
+    now = now or timezone.now()
+    return Reservation.objects.open_at(now).filter(table_id=table_id).update(status=Reservation.Status.SEATED)
+
+
+def open_windows(now=None):
+    """
+    Hold the tables of reservations whose window has opened, and mark
+    bookings whose window passed without the party ordering as no-shows,
+    freeing their tables. Returns ``(tables reserved, no-shows)``.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        due = set(Reservation.objects.open_at(now).values_list('table_id', flat=True))
+        reserved = Table.transition_many(due, Table.Status.RESERVED) if due else 0
+
+        lapsed = Reservation.objects.filter(status=Reservation.Status.BOOKED, ends_at__lte=now)
+        lapsed_tables = set(lapsed.values_list('table_id', flat=True))
+        no_shows = lapsed.update(status=Reservation.Status.NO_SHOW)
+        if lapsed_tables:
+            release_tables(lapsed_tables, now)
+    return reserved, no_shows
@@ -0,0 +1,213 @@
+"""
+Party seating: best-fitting free table, or run of adjacent tables, from a
+capacity index compiled once per floor layout
+"""
+import uuid
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import board
+
+# Shared marker of the current floor layout; every table edit replaces it
+VERSION_KEY = 'tables:seating:layout-version'
+
+# One way to seat a party: a single table, or adjacent tables pushed together
+Option = namedtuple('Option', ['capacity', 'table_ids', 'section'])
+
+# (layout version, CapacityIndex) compiled by this process
+_compiled = (None, None)
+# (board snapshot version, ids of the available tables)
+_available = (None, frozenset())
+
+
+class SeatingConflict(Exception):
+    """A suggested table was taken between the suggestion and seating the party"""
+
+    def __init__(self, table_ids):
+        super().__init__("One of the suggested tables is no longer free")
+        self.table_ids = table_ids
+
+
+class CapacityIndex:
+    """
+    Every seating option of the floor, sorted by capacity, so the smallest
+    one that fits a party is found with a binary search
+    """
+
+    def __init__(self, tables, max_combined):
+        self.tables = {}
+        rows = {}
+        options = []
+        for pk, table_number, capacity, section, position in tables:
+            self.tables[pk] = {
+                'id': pk,
+                'table_number': table_number,
+                'seating_capacity': capacity,
+                'section': section,
+            }
+            options.append(Option(capacity, (pk,), section))
+            if section and position is not None:
+                rows.setdefault(section, []).append((position, pk, capacity))
+
+        # Runs of up to max_combined tables at consecutive positions of a section
+        for section, row in rows.items():
+            row.sort()
+            for start in range(len(row)):
+                capacity = row[start][2]
+                for end in range(start + 1, min(start + max_combined, len(row))):
+                    if row[end][0] != row[end - 1][0] + 1:
+                        break
+                    capacity += row[end][2]
+                    options.append(Option(capacity, tuple(pk for _, pk, _ in row[start:end + 1]), section))
+
+        # Fewest seats left empty first, then fewest tables moved
+        options.sort(key=lambda option: (option.capacity, len(option.table_ids), option.table_ids))
+        self.lookup = {}
+        for combine in (True, False):
+            usable = [option for option in options if combine or len(option.table_ids) == 1]
+            self.lookup[None, combine] = self._sorted(usable)
+            for section in {option.section for option in usable if option.section}:
+                self.lookup[section, combine] = self._sorted(
+                    [option for option in usable if option.section == section]
+                )
+
+    @staticmethod
+    def _sorted(options):
+        return [option.capacity for option in options], options
+
+    def best(self, party_size, available, section=None, combine=True, exclude=()):
+        """The smallest option for ``party_size`` whose tables are all in ``available``"""
+        capacities, options = self.lookup.get((section or None, combine), ([], []))
+        for option in options[bisect_left(capacities, party_size):]:
+            if all(pk in available and pk not in exclude for pk in option.table_ids):
+                return option
+        return None
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # First use, or the marker was evicted: start a new version everywhere
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Make every process recompile its capacity index once the change commits"""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def capacity_index():
+    """
+    The CapacityIndex of the current layout. Compiled once per process and
+    rebuilt only after a table is added, edited or removed.
+    """
+    global _compiled
+    from .models import Table
+    version = current_version()
+    compiled_version, index = _compiled
+    if index is None or compiled_version != version:
+        index = CapacityIndex(
+            Table.objects.values_list('pk', 'table_number', 'seating_capacity', 'section', 'position'),
+            settings.SEATING_MAX_COMBINED_TABLES,
+        )
+        _compiled = (version, index)
+    return index
+
+
+def available_table_ids():
+    """Ids of the AVAILABLE tables, read from the table board snapshot"""
+    global _available
+    from .models import Table
+    version = board.current_version()
+    if _available[0] != version:
+        floor = board.snapshot()
+        ids = frozenset(table['id'] for table in floor['tables'] if table['status'] == Table.Status.AVAILABLE)
+        # A stale snapshot (served while another request rebuilds) is used once, not kept
+        _available = (floor['version'], ids)
+        return ids
+    return _available[1]
+
+
+def reserved_soon(now=None):
+    """
+    Ids of tables with a booking whose window opens (or has just opened)
+    within SEATING_EXPECTED_DURATION_MINUTES: a walk-in seated there now
+    would still be at the table when the reservation arrives.
+    """
+    from .models import Reservation
+    now = now or timezone.now()
+    horizon = now + timedelta(minutes=settings.SEATING_EXPECTED_DURATION_MINUTES)
+    return Reservation.objects.overlapping(now, horizon).filter(status=Reservation.Status.BOOKED).values('table_id')
+
+
+def free_table_ids():
+    """Available tables that no reservation needs within the expected seating time"""
+    return available_table_ids() - set(reserved_soon().values_list('table_id', flat=True))
+
+
+def _proposal(index, party_size, option):
+    if option is None:
+        return {'party_size': party_size, 'capacity': 0, 'tables': []}
+    return {
+        'party_size': party_size,
+        'capacity': option.capacity,
+        'tables': [index.tables[pk] for pk in option.table_ids],
+    }
+
+
+def suggest(party_size, section=None, combine=True):
+    """
+    The best free seating for one party: the table, or run of adjacent
+    tables in one section, with the fewest empty seats. ``tables`` is empty
+    if nothing fits.
+    """
+    index = capacity_index()
+    return _proposal(index, party_size, index.best(party_size, free_table_ids(), section, combine))
+
+
+def seat_waitlist(parties):
+    """
+    ``suggest()`` for each ``(party_size, section, combine)`` of a waitlist
+    in order, never offering the same table twice
+    """
+    index = capacity_index()
+    available = free_table_ids()
+    taken = set()
+    proposals = []
+    for party_size, section, combine in parties:
+        option = index.best(party_size, available, section, combine, exclude=taken)
+        if option is not None:
+            taken.update(option.table_ids)
+        proposals.append(_proposal(index, party_size, option))
+    return proposals
+
+
+def seat_party(table_ids):
+    """
+    Seat a walk-in party at the tables of a proposal. Suggestions come from
+    a snapshot that may be out of date, so one conditional UPDATE moves the
+    tables from AVAILABLE to OCCUPIED, all or none, skipping tables a
+    reservation needs soon; raises SeatingConflict if any of them is no
+    longer free.
+    """
+    from .models import Table
+    table_ids = sorted(set(table_ids))
+    with transaction.atomic():
+        moved = Table.objects.filter(pk__in=table_ids, status=Table.Status.AVAILABLE).exclude(
+            pk__in=reserved_soon()
+        ).update(
+            status=Table.Status.OCCUPIED,
+            last_activity=timezone.now(),
+        )
+        if moved != len(table_ids):
+            raise SeatingConflict(table_ids)
+        board.invalidate()
+    return table_ids
@@ -1,3 +1,327 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core import mail
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from menu.models import MenuItem
+from orders.services import place_order
+from . import board, reservations, seating
+from .models import Reservation, Table
+
+
+class TableTransitionTests(TestCase):
+    """Tests for compare-and-swap table status transitions"""
+
+    def setUp(self):
+        self.table = Table.objects.create(table_number='T1', seating_capacity=4)
+
+    def test_service_cycle(self):
+        self.assertTrue(self.table.mark_as_occupied())
+        self.assertTrue(self.table.request_bill())
+        self.assertTrue(self.table.mark_as_available())
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.status, Table.Status.AVAILABLE)
+
+    def test_illegal_edge_is_refused(self):
+        self.assertFalse(self.table.request_bill())
+        self.assertEqual(self.table.status, Table.Status.AVAILABLE)
+
+    def test_abandoned_tables_are_closed_in_one_update(self):
+        from notifications.tasks import auto_close_abandoned_tables
+        self.table.mark_as_occupied()
+        waiting = Table.objects.create(table_number='T2', seating_capacity=2)
+        waiting.mark_as_occupied()
+        waiting.request_bill()
+        busy = Table.objects.create(table_number='T3', seating_capacity=2)
+        busy.mark_as_occupied()
+        Table.objects.create(table_number='T4', seating_capacity=2)
+        stale = timezone.now() - timedelta(hours=4)
+        Table.objects.exclude(pk=busy.pk).update(last_activity=stale)
+
+        self.assertEqual(auto_close_abandoned_tables(), "Closed 2 abandoned tables")
+        self.assertEqual(
+            dict(Table.objects.values_list('table_number', 'status')),
+            {'T1': 'CLOSED', 'T2': 'CLOSED', 'T3': 'OCCUPIED', 'T4': 'AVAILABLE'},
+        )
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Table T1', mail.outbox[0].body)
+        self.assertIn('Table T2', mail.outbox[0].body)
+
+        # Nothing left to close: no second email
+        self.assertEqual(Table.close_abandoned(timezone.now() - timedelta(hours=3)), {})
+        auto_close_abandoned_tables()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_close_abandoned_returns_the_closed_ids(self):
+        self.table.mark_as_occupied()
+        Table.objects.filter(pk=self.table.pk).update(last_activity=timezone.now() - timedelta(hours=4))
+        # Another terminal touches the table first
+        self.table.request_bill()
+        self.assertEqual(Table.close_abandoned(timezone.now() - timedelta(hours=3)), {})
+
+        Table.objects.filter(pk=self.table.pk).update(last_activity=timezone.now() - timedelta(hours=4))
+        self.assertEqual(Table.close_abandoned(timezone.now() - timedelta(hours=3)), {self.table.pk: 'T1'})
+
+    def test_concurrent_terminals_do_not_both_win(self):
+        other = Table.objects.get(pk=self.table.pk)
+        self.assertTrue(self.table.mark_as_occupied())
+        self.assertFalse(other.mark_as_occupied())
+        self.assertEqual(other.status, Table.Status.AVAILABLE)
+
+
+class SeatingTests(TestCase):
+    """Tests for the party seating index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.two = Table.objects.create(table_number='T2', seating_capacity=2)
+        cls.six = Table.objects.create(table_number='T6', seating_capacity=6)
+        cls.patio = [
+            Table.objects.create(table_number=f'P{position}', seating_capacity=4, section='Patio', position=position)
+            for position in (1, 2, 4)
+        ]
+
+    def setUp(self):
+        keys = [board.VERSION_KEY, board.SNAPSHOT_KEY, seating.VERSION_KEY]
+        cache.delete_many(keys)
+        self.addCleanup(cache.delete_many, keys)
+
+    def _numbers(self, proposal):
+        return [table['table_number'] for table in proposal['tables']]
+
+    def test_smallest_fitting_table_is_proposed(self):
+        self.assertEqual(self._numbers(seating.suggest(2)), ['T2'])
+        self.assertEqual(self._numbers(seating.suggest(3)), ['P1'])
+        self.assertEqual(self._numbers(seating.suggest(5)), ['T6'])
+
+    def test_adjacent_tables_are_combined_for_large_parties(self):
+        proposal = seating.suggest(8)
+        self.assertEqual(self._numbers(proposal), ['P1', 'P2'])
+        self.assertEqual(proposal['capacity'], 8)
+        # P4 is not next to P2, so no run of three exists
+        self.assertEqual(seating.suggest(9)['tables'], [])
+        self.assertEqual(seating.suggest(8, combine=False)['tables'], [])
+
+    def test_busy_tables_and_sections_are_respected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.six.mark_as_occupied()
+        self.assertEqual(self._numbers(seating.suggest(5)), ['P1', 'P2'])
+        self.assertEqual(self._numbers(seating.suggest(2, section='Patio')), ['P1'])
+
+    def test_waitlist_never_offers_a_table_twice(self):
+        proposals = seating.seat_waitlist([(4, None, True), (4, None, True), (4, None, True), (4, None, True)])
+        self.assertEqual([self._numbers(proposal) for proposal in proposals], [['P1'], ['P2'], ['P4'], ['T6']])
+
+    def test_index_is_reused_until_the_layout_changes(self):
+        seating.suggest(2)
+        # Only the upcoming reservations are read; layout and floor come from the caches
+        with self.assertNumQueries(1):
+            seating.suggest(4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Table.objects.create(table_number='P3', seating_capacity=4, section='Patio', position=3)
+        self.assertEqual(self._numbers(seating.suggest(12)), ['P1', 'P2', 'P3'])
+
+    def test_endpoint(self):
+        waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        self.client.force_login(waiter)
+
+        response = self.client.get('/tables/seating/', {'party': [8, 2]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [self._numbers(proposal) for proposal in response.json()['proposals']],
+            [['P1', 'P2'], ['T2']],
+        )
+        self.assertEqual(self.client.get('/tables/seating/', {'party': 'x'}).status_code, 400)
+
+    def test_seating_rechecks_every_suggested_table(self):
+        proposal = seating.suggest(8)
+        table_ids = [table['id'] for table in proposal['tables']]
+        # Another host takes one of the tables before this party sits down
+        self.assertTrue(Table.transition(table_ids[1], Table.Status.OCCUPIED))
+
+        with self.assertRaises(seating.SeatingConflict):
+            seating.seat_party(table_ids)
+        self.assertEqual(Table.objects.get(pk=table_ids[0]).status, Table.Status.AVAILABLE)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(seating.seat_party([self.six.pk]), [self.six.pk])
+        self.assertEqual(Table.objects.get(pk=self.six.pk).status, Table.Status.OCCUPIED)
+        self.assertEqual(seating.suggest(5)['tables'], [])
+
+    def test_tables_booked_soon_are_not_suggested_or_seated(self):
+        now = timezone.now()
+        for table, starts_in in ((self.two, timedelta(minutes=30)), (self.six, timedelta(hours=3))):
+            reservations.book(
+                table=table,
+                party_size=2,
+                starts_at=now + starts_in,
+                ends_at=now + starts_in + timedelta(hours=2),
+                guest_name='Guest',
+            )
+
+        self.assertEqual(self._numbers(seating.suggest(2)), ['P1'])
+        self.assertEqual(self._numbers(seating.suggest(5)), ['T6'])
+        with self.assertRaises(seating.SeatingConflict):
+            seating.seat_party([self.two.pk])
+        self.assertEqual(seating.seat_party([self.six.pk]), [self.six.pk])
+
+    def test_reserved_tables_are_not_seated(self):
+        Table.transition(self.two.pk, Table.Status.RESERVED)
+        with self.assertRaises(seating.SeatingConflict):
+            seating.seat_party([self.two.pk])
+        self.assertEqual(Table.objects.get(pk=self.two.pk).status, Table.Status.RESERVED)
+
+    def test_seat_endpoint_offers_a_new_proposal_on_conflict(self):
+        waiter = User.objects.create_user('waiter', password='x', role=User.Role.WAITER)
+        self.client.force_login(waiter)
+        Table.transition(self.patio[1].pk, Table.Status.OCCUPIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/tables/seating/', {'table': [self.patio[0].pk, self.patio[1].pk], 'party': 8})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['proposals'][0]['tables'], [])
+
+        response = self.client.post('/tables/seating/', {'table': [self.two.pk], 'party': 2})
+        self.assertEqual(response.json(), {'seated': [self.two.pk]})
+        self.assertEqual(self.client.post('/tables/seating/', {'table': 'x'}).status_code, 400)
+
+
+class ReservationTests(TestCase):
+    """Tests for table reservations and their windows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user('host', password='x', role=User.Role.WAITER)
+        cls.two = Table.objects.create(table_number='T2', seating_capacity=2)
+        cls.four = Table.objects.create(table_number='T4', seating_capacity=4)
+        cls.six = Table.objects.create(table_number='T6', seating_capacity=6)
+        cls.evening = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def _book(self, table, start, hours=2, party_size=2):
+        return reservations.book(
+            table=table,
+            party_size=party_size,
+            starts_at=start,
+            ends_at=start + timedelta(hours=hours),
+            guest_name='Guest',
+        )
+
+    def test_overlapping_bookings_are_refused(self):
+        self._book(self.four, self.evening)
+        with self.assertRaises(reservations.ReservationConflict):
+            self._book(self.four, self.evening + timedelta(hours=1))
+        # Back to back is fine
+        self._book(self.four, self.evening + timedelta(hours=2))
+        self._book(self.six, self.evening + timedelta(hours=1))
+
+    def test_window_and_party_are_validated(self):
+        with self.assertRaises(ValidationError):
+            self._book(self.four, self.evening, hours=5)
+        with self.assertRaises(ValidationError):
+            self._book(self.two, self.evening, party_size=3)
+
+    def test_admin_enforces_the_window_rules(self):
+        admin_user = User.objects.create_superuser('admin', password='x', role=User.Role.MANAGER)
+        self.client.force_login(admin_user)
+        data = {
+            'table': self.four.pk,
+            'guest_name': 'Guest',
+            'party_size': 2,
+            'starts_at_0': self.evening.strftime('%Y-%m-%d'),
+            'starts_at_1': self.evening.strftime('%H:%M:%S'),
+            'ends_at_0': (self.evening + timedelta(hours=5)).strftime('%Y-%m-%d'),
+            'ends_at_1': (self.evening + timedelta(hours=5)).strftime('%H:%M:%S'),
+            'status': Reservation.Status.BOOKED,
+        }
+
+        response = self.client.post('/admin/tables/reservation/add/', data)
+        self.assertContains(response, 'A reservation can last at most 240 minutes.')
+        self.assertFalse(Reservation.objects.exists())
+
+        data['ends_at_1'] = (self.evening + timedelta(hours=2)).strftime('%H:%M:%S')
+        data['ends_at_0'] = (self.evening + timedelta(hours=2)).strftime('%Y-%m-%d')
+        self.assertEqual(self.client.post('/admin/tables/reservation/add/', data).status_code, 302)
+        self.assertTrue(Reservation.objects.filter(table=self.four).exists())
+
+    def test_availability_search(self):
+        self._book(self.four, self.evening)
+        Reservation.objects.create(
+            table=self.six, party_size=4, guest_name='Gone', status=Reservation.Status.CANCELLED,
+            starts_at=self.evening, ends_at=self.evening + timedelta(hours=2),
+        )
+        with self.assertNumQueries(1):
+            tables = list(reservations.available_tables(4, self.evening + timedelta(hours=1), self.evening + timedelta(hours=3)))
+        self.assertEqual(tables, [self.six])
+        self.assertEqual(
+            list(reservations.available_tables(2, self.evening + timedelta(hours=2), self.evening + timedelta(hours=3))),
+            [self.two, self.four, self.six],
+        )
+
+    def test_window_opening_reserves_the_table_until_the_party_orders(self):
+        now = timezone.now()
+        reservation = Reservation.objects.create(
+            table=self.four, party_size=4, guest_name='Early',
+            starts_at=now - timedelta(minutes=5), ends_at=now + timedelta(hours=2),
+        )
+        self.assertEqual(reservations.open_windows(now), (1, 0))
+        self.four.refresh_from_db()
+        self.assertEqual(self.four.status, Table.Status.RESERVED)
+        self.assertNotIn(self.four.pk, set(reservations.available_tables(2, now, now + timedelta(hours=1)).values_list('pk', flat=True)))
+
+        soup = MenuItem.objects.create(name='Soup', category=MenuItem.Category.STARTER, price=Decimal('5.00'))
+        place_order(table=self.four, waiter=self.waiter, lines={soup.pk: 1})
+        self.four.refresh_from_db()
+        reservation.refresh_from_db()
+        self.assertEqual(self.four.status, Table.Status.OCCUPIED)
+        self.assertEqual(reservation.status, Reservation.Status.SEATED)
+
+    def test_no_show_releases_the_table(self):
+        now = timezone.now()
+        reservation = Reservation.objects.create(
+            table=self.four, party_size=4, guest_name='Late',
+            starts_at=now - timedelta(hours=2), ends_at=now + timedelta(minutes=1),
+        )
+        reservations.open_windows(now)
+        self.assertEqual(reservations.open_windows(now + timedelta(minutes=2)), (0, 1))
+        self.four.refresh_from_db()
+        reservation.refresh_from_db()
+        self.assertEqual(self.four.status, Table.Status.AVAILABLE)
+        self.assertEqual(reservation.status, Reservation.Status.NO_SHOW)
+
+    def test_cancel_frees_a_held_table(self):
+        reservation = self._book(self.four, timezone.now() - timedelta(minutes=1))
+        self.four.refresh_from_db()
+        self.assertEqual(self.four.status, Table.Status.RESERVED)
+
+        self.assertTrue(reservations.cancel(reservation))
+        self.assertFalse(reservations.cancel(reservation))
+        self.four.refresh_from_db()
+        self.assertEqual(self.four.status, Table.Status.AVAILABLE)
+
+    def test_booking_page(self):
+        self.client.force_login(self.waiter)
+        window = {
+            'party_size': 4,
+            'date': f'{timezone.localtime(self.evening):%Y-%m-%d}',
+            'start': '19:00',
+            'end': '21:00',
+        }
+        response = self.client.get('/tables/reservations/new/', window)
+        self.assertEqual(list(response.context['tables']), [self.four, self.six])
+
+        response = self.client.post('/tables/reservations/new/', dict(window, table_id=self.four.pk, guest_name='Ana'))
+        self.assertEqual(response.status_code, 302)
+        reservation = Reservation.objects.get()
+        self.assertEqual((reservation.table, reservation.created_by), (self.four, self.waiter))
+        self.assertEqual(timezone.localtime(reservation.starts_at).hour, 19)
+        self.assertContains(self.client.get(response.url), 'Ana')
 
-# Create your tests here.
+        response = self.client.post('/tables/reservations/new/', dict(window, table_id=self.four.pk, guest_name='Bo'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Reservation.objects.count(), 1)
@@ -8,4 +8,8 @@ urlpatterns = [
     path('create/', views.TableCreateView.as_view(), name='create'),
     path('<int:pk>/edit/', views.TableUpdateView.as_view(), name='edit'),
     path('<int:pk>/delete/', views.TableDeleteView.as_view(), name='delete'),
+    path('seating/', views.SeatingSuggestionView.as_view(), name='seating'),
+    path('reservations/', views.ReservationListView.as_view(), name='reservations'),
+    path('reservations/new/', views.ReservationCreateView.as_view(), name='reservation_create'),
+    path('reservations/<int:pk>/cancel/', views.ReservationCancelView.as_view(), name='reservation_cancel'),
 ]
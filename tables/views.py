@@ -1,10 +1,17 @@
+from datetime import datetime, timedelta
+
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
-from django.shortcuts import redirect
-from django.urls import reverse_lazy
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.urls import reverse, reverse_lazy
+from django.views import View
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 
-from .models import Table
+from . import reservations, seating
+from .models import Reservation, Table
 
 
 class TableListView(LoginRequiredMixin, ListView):
@@ -21,7 +28,7 @@ class TableCreateView(LoginRequiredMixin, CreateView):
     """Create a new table (Manager only)"""
     model = Table
     template_name = 'tables/table_form.html'
-    fields = ['table_number', 'seating_capacity', 'status']
+    fields = ['table_number', 'seating_capacity', 'section', 'position', 'status']
     success_url = reverse_lazy('tables:list')
     
     def dispatch(self, request, *args, **kwargs):
@@ -39,7 +46,7 @@ class TableUpdateView(LoginRequiredMixin, UpdateView):
     """Update a table (Manager only)"""
     model = Table
     template_name = 'tables/table_form.html'
-    fields = ['table_number', 'seating_capacity', 'status']
+    fields = ['table_number', 'seating_capacity', 'section', 'position', 'status']
     success_url = reverse_lazy('tables:list')
     
     def dispatch(self, request, *args, **kwargs):
@@ -68,3 +75,167 @@ class TableDeleteView(LoginRequiredMixin, DeleteView):
     def form_valid(self, form):
         messages.success(self.request, f"Table {self.object.table_number} deleted successfully")
         return super().form_valid(form)
+
+
+class SeatingSuggestionView(LoginRequiredMixin, View):
+    """
+    Best free seating as JSON for ``?party=<size>``, optionally with
+    ``section`` and ``combine=0``. Repeat ``party`` to seat a waitlist in
+    order without offering a table twice.
+    
+    POST ``table`` ids (repeated) to seat a party at a proposal; answers
+    409 with a fresh proposal for ``party`` if a table was taken meanwhile.
+    """
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not (request.user.is_waiter or request.user.is_manager):
+            messages.error(request, "Only waiters and managers can seat guests.")
+            return redirect('dashboard:home')
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get(self, request):
+        try:
+            sizes = [int(size) for size in request.GET.getlist('party')]
+        except ValueError:
+            sizes = []
+        if not sizes or min(sizes) < 1:
+            return JsonResponse({'error': "party must be one or more positive numbers"}, status=400)
+        
+        section = request.GET.get('section') or None
+        combine = request.GET.get('combine') != '0'
+        if len(sizes) == 1:
+            proposals = [seating.suggest(sizes[0], section, combine)]
+        else:
+            proposals = seating.seat_waitlist([(size, section, combine) for size in sizes])
+        
+        response = JsonResponse({'proposals': proposals})
+        response['Cache-Control'] = 'no-store'
+        return response
+    
+    def post(self, request):
+        try:
+            table_ids = [int(pk) for pk in request.POST.getlist('table')]
+            party = int(request.POST.get('party') or 0)
+        except ValueError:
+            table_ids = []
+        if not table_ids:
+            return JsonResponse({'error': "table must be one or more table ids"}, status=400)
+        
+        try:
+            seated = seating.seat_party(table_ids)
+        except seating.SeatingConflict as exc:
+            payload = {'error': str(exc)}
+            if party > 0:
+                section = request.POST.get('section') or None
+                payload['proposals'] = [seating.suggest(party, section, request.POST.get('combine') != '0')]
+            return JsonResponse(payload, status=409)
+        return JsonResponse({'seated': seated})
+
+
+class ReservationAccessMixin(LoginRequiredMixin):
+    """Reservations are taken by waiters (hosts) and managers"""
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not (request.user.is_waiter or request.user.is_manager):
+            messages.error(request, "You don't have permission to manage reservations.")
+            return redirect('dashboard:home')
+        return super().dispatch(request, *args, **kwargs)
+
+
+def reservation_window(data):
+    """``(party size, start, end)`` from the search form, or None while it is incomplete"""
+    try:
+        party_size = int(data.get('party_size', ''))
+        day = datetime.strptime(data.get('date', ''), '%Y-%m-%d').date()
+        start = datetime.strptime(data.get('start', ''), '%H:%M').time()
+        end = datetime.strptime(data.get('end', ''), '%H:%M').time()
+    except ValueError:
+        return None
+    return (
+        party_size,
+        timezone.make_aware(datetime.combine(day, start)),
+        timezone.make_aware(datetime.combine(day, end)),
+    )
+
+
+class ReservationListView(ReservationAccessMixin, ListView):
+    """Reservations of one day (default: today)"""
+    template_name = 'tables/reservation_list.html'
+    context_object_name = 'reservations'
+    
+    def get_day(self):
+        try:
+            return datetime.strptime(self.request.GET.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return timezone.localdate()
+    
+    def get_queryset(self):
+        day = self.get_day()
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        return Reservation.objects.filter(
+            starts_at__gte=start,
+            starts_at__lt=start + timedelta(days=1),
+        ).select_related('table', 'created_by')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['day'] = self.get_day()
+        return context
+
+
+class ReservationCreateView(ReservationAccessMixin, View):
+    """Search free tables for a party and time window, then book one"""
+    template_name = 'tables/reservation_form.html'
+    
+    def render_search(self, request, data):
+        context = {'search': data, 'tables': None}
+        window = reservation_window(data)
+        if window:
+            party_size, start, end = window
+            try:
+                context['tables'] = reservations.available_tables(party_size, start, end)
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+        return render(request, self.template_name, context)
+    
+    def get(self, request):
+        return self.render_search(request, request.GET)
+    
+    def post(self, request):
+        window = reservation_window(request.POST)
+        table = Table.objects.filter(pk=request.POST.get('table_id') or None).first()
+        guest_name = request.POST.get('guest_name', '').strip()
+        if not (window and table and guest_name):
+            messages.error(request, "Choose a table and enter the guest's name.")
+            return self.render_search(request, request.POST)
+        
+        party_size, start, end = window
+        try:
+            reservation = reservations.book(
+                table=table,
+                party_size=party_size,
+                starts_at=start,
+                ends_at=end,
+                guest_name=guest_name,
+                guest_phone=request.POST.get('guest_phone', '').strip(),
+                notes=request.POST.get('notes', '').strip(),
+                created_by=request.user,
+            )
+        except (ValidationError, reservations.ReservationConflict) as e:
+            messages.error(request, e.messages[0] if isinstance(e, ValidationError) else str(e))
+            return self.render_search(request, request.POST)
+        
+        messages.success(request, f"{table} reserved for {reservation.guest_name}")
+        return redirect(f"{reverse('tables:reservations')}?date={timezone.localtime(start):%Y-%m-%d}")
+
+
+class ReservationCancelView(ReservationAccessMixin, View):
+    """Cancel a booked reservation"""
+    
+    def post(self, request, pk):
+        reservation = get_object_or_404(Reservation, pk=pk)
+        if reservations.cancel(reservation):
+            messages.success(request, f"Reservation for {reservation.guest_name} cancelled")
+        else:
+            messages.error(request, "Only booked reservations can be cancelled.")
+        return redirect(f"{reverse('tables:reservations')}?date={timezone.localtime(reservation.starts_at):%Y-%m-%d}")